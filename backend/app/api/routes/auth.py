@@ -1,14 +1,30 @@
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.core.security import decode_access_token
-from app.db.base import get_db
+from app.core.ws_manager import ws_manager
+from app.db.base import async_session_factory, get_async_db, get_db, transaction
 from app.db.models import User
-from app.repositories import user_repo
+from app.repositories import async_event_repo, user_repo
 from app.schemas.auth import (
     AdminResetPasswordRequest,
     AdminResetPasswordResponse,
@@ -27,14 +43,28 @@ from app.schemas.auth import (
     ChangeEmailRequest,
 )
 from app.schemas.event import (
+    AdmissionTicketResponse,
+    BulkImportResponse,
+    BulkParticipantsRequest,
+    BulkParticipantsResponse,
+    CatalogFreshnessResponse,
+    EventChangesResponse,
     EventCreateRequest,
+    EventPageResponse,
+    NearbyEventResponse,
+    EventFacetsResponse,
     EventResponse,
     EventUpdateRequest,
+    GroupCommitStatsResponse,
+    ParticipantResponse,
     ParticipationLogResponse,
+    WSStatsResponse,
 )
-from app.services import auth_service, event_service
+from app.services import admission_service, auth_service, event_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+# для эндпоинтов, доступных и гостям: без токена не отвечаем 401
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -117,21 +147,72 @@ def verify_reset_code(data: ResetCodeVerifyRequest, db: Session = Depends(get_db
     return {"message": "Код верен. Можно задать новый пароль."}
 
 
+def _token_user_id(token: str) -> UUID:
+    payload = decode_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=403, detail="Неверный или истекший токен")
+    user_id = payload.get("sub")
+    try:
+        return UUID(str(user_id))
+    except Exception:
+        raise HTTPException(status_code=401, detail="Неверный токен")
+
+
 # Роут для получения информации о текущем пользователе
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ) -> User:
+    user = user_repo.get_by_id(db, _token_user_id(token))
+    if not user or user.is_deleted:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user для async-роутов: тот же токен, запрос через AsyncSession."""
+    user = await async_event_repo.get_user(db, _token_user_id(token))
+    if not user or user.is_deleted:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    return user
+
+
+def _optional_token_user_id(token: Optional[str]) -> Optional[UUID]:
+    if not token:
+        return None
     payload = decode_access_token(token)
     if payload is None:
-        raise HTTPException(status_code=403, detail="Неверный или истекший токен")
-    user_id = payload.get("sub")
+        return None
     try:
-        user_uuid = UUID(str(user_id))
+        return UUID(str(payload.get("sub")))
     except Exception:
-        raise HTTPException(status_code=401, detail="Неверный токен")
+        return None
+
+
+def get_optional_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)
+) -> Optional[User]:
+    user_uuid = _optional_token_user_id(token)
+    if user_uuid is None:
+        return None
     user = user_repo.get_by_id(db, user_uuid)
     if not user or user.is_deleted:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
+        return None
+    return user
+
+
+async def get_optional_user_async(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+) -> Optional[User]:
+    """get_optional_user для async-роутов; сессия закрывается сразу после запроса."""
+    user_uuid = _optional_token_user_id(token)
+    if user_uuid is None:
+        return None
+    async with async_session_factory()() as db:
+        user = await async_event_repo.get_user(db, user_uuid)
+    if not user or user.is_deleted:
+        return None
     return user
 
 
@@ -156,7 +237,8 @@ def update_user_profile(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    user = user_repo.update_profile(db, user, data.full_name, data.about, data.avatar_url)
+    with transaction(db):
+        user = user_repo.update_profile(db, user, data.full_name, data.about, data.avatar_url)
     return ProfileResponse(
         id=user.id,
         full_name=user.full_name,
@@ -196,6 +278,28 @@ def require_admin(user: User = Depends(get_current_user)) -> User:
     return user
 
 
+@router.get("/events/{event_id}/participants", response_model=List[ParticipantResponse])
+def list_event_participants(
+    event_id: UUID,
+    response: Response,
+    after: Optional[UUID] = Query(None, description="id последнего участника предыдущей страницы"),
+    limit: int = Query(50, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    items, total, next_cursor, etag = event_service.list_participants(
+        db, event_id, after=after, limit=limit, if_none_match=if_none_match
+    )
+    # no-cache: браузер каждый раз перепроверяет ETag и получает 304, пока состав не изменился
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Total-Count": str(total)}
+    if items is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
 @router.get("/events/{event_id}/participation-log", response_model=ParticipationLogResponse)
 def participation_log(
     event_id: UUID,
@@ -258,13 +362,12 @@ def admin_update_user(
     user = user_repo.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    if data.full_name:
-        user.full_name = data.full_name
-    if data.role:
-        user.role = data.role
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    with transaction(db):
+        if data.full_name:
+            user.full_name = data.full_name
+        if data.role:
+            user.role = data.role
+        db.add(user)
     return UserListResponse(
         id=user.id,
         full_name=user.full_name,
@@ -286,7 +389,8 @@ def admin_soft_delete_user(
     user = user_repo.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    user = user_repo.soft_delete_user(db, user)
+    with transaction(db):
+        user = user_repo.soft_delete_user(db, user)
     return UserListResponse(
         id=user.id,
         full_name=user.full_name,
@@ -308,7 +412,8 @@ def admin_restore_user(
     user = user_repo.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
-    user = user_repo.restore_user(db, user)
+    with transaction(db):
+        user = user_repo.restore_user(db, user)
     return UserListResponse(
         id=user.id,
         full_name=user.full_name,
@@ -337,23 +442,176 @@ def admin_reset_password(
     )
 
 
+@router.get("/admin/catalog", response_model=CatalogFreshnessResponse)
+def admin_catalog_freshness(_: User = Depends(require_admin)):
+    """Свежесть снимка каталога событий в памяти этого воркера."""
+    return event_service.catalog_freshness()
+
+
+@router.get("/admin/participant-log", response_model=GroupCommitStatsResponse)
+def admin_participant_log_stats(_: User = Depends(require_admin)):
+    """Group commit журнала участия: очередь, размер пачек, время сброса."""
+    return event_service.participant_log_writer.stats()
+
+
+@router.get("/admin/ws", response_model=WSStatsResponse)
+async def admin_ws_stats(_: User = Depends(require_admin)):
+    """Соединения /ws/events этого воркера: число, по IP, буферы отправки."""
+    return ws_manager.stats()
+
+
 # ---------------------- События ----------------------
 @router.get("/events", response_model=List[EventResponse])
-def get_events(
+async def get_events(
+    response: Response,
     status: Optional[str] = Query(None, description="active|upcoming|past"),
+    city: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None, alias="from", description="события, идущие после этого момента"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="события, начавшиеся до этого момента"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # с этого курсора клиент продолжает через /events/changes
+    response.headers["X-Change-Cursor"] = str(await event_service.change_cursor_async(db))
+    return await event_service.list_events_async(
+        db, status=status, city=city, category=category, date_from=date_from, date_to=date_to
+    )
+
+
+@router.get("/events/changes", response_model=EventChangesResponse)
+async def get_event_changes(
+    since: int = Query(0, ge=0, description="next_since предыдущего ответа или X-Change-Cursor"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await event_service.list_changes_async(db, since, limit)
+
+
+@router.get("/events/stream")
+async def stream_event_updates(
+    event_id: UUID = Query(...),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events: обновления участников одного события для страниц,
+    которым не нужно ничего отправлять серверу (легче, чем /ws/events).
+    Браузер сам переподключается с Last-Event-ID и получает пропущенное.
+    """
+    conn = ws_manager.sse_subscribe(str(event_id), last_event_id)
+    if conn is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Слишком много подписчиков, повторите позже",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        ws_manager.sse_frames(conn),
+        media_type="text/event-stream",
+        # без буферизации в nginx и кэшей по пути
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events/calendar/{city}.ics")
+def get_city_calendar(
+    city: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    body, etag = event_service.get_city_calendar(db, city)
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+@router.get("/events/search", response_model=List[EventResponse])
+def search_events(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
 ):
-    return event_service.list_events(db, status=status)
+    events, total = event_service.search_events(db, q, limit=limit, offset=offset)
+    response.headers["X-Total-Count"] = str(total)
+    return events
+
+
+@router.get("/events/recommended", response_model=List[EventResponse])
+def recommended_events(
+    city: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
+):
+    return event_service.recommend_events(db, user=user, city=city, limit=limit)
+
+
+@router.get("/events/nearby", response_model=List[NearbyEventResponse])
+def get_nearby_events(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=20000, description="без радиуса — limit ближайших"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    return event_service.nearby_events(db, lat, lon, radius_km=radius_km, limit=limit)
+
+
+@router.get("/events/facets", response_model=EventFacetsResponse)
+def get_event_facets(
+    status: Optional[str] = Query(None, description="active|upcoming|past"),
+    db: Session = Depends(get_db),
+):
+    return event_service.get_event_facets(db, status=status)
+
+
+# объявлен до /events/{event_id}, иначе "my" разбирается как UUID
+@router.get("/events/my", response_model=List[EventResponse])
+async def list_my_events(
+    response: Response,
+    section: Optional[str] = Query(None, description="upcoming|past"),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="значение X-Next-Cursor предыдущей страницы"),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    events, next_cursor = await event_service.list_user_events_async(
+        db, user, section=section, limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return events
 
 
 @router.get("/events/{event_id}", response_model=EventResponse)
-def get_event(event_id: UUID, db: Session = Depends(get_db)):
-    event = event_service.get_event(db, event_id)
+async def get_event(event_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    event = await event_service.get_event_async(db, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Событие не найдено")
     return event
 
 
+@router.get("/events/{event_id}/page", response_model=EventPageResponse)
+async def get_event_page(
+    event_id: UUID,
+    response: Response,
+    participants_limit: int = Query(10, ge=1, le=50),
+    related_limit: int = Query(3, ge=0, le=12),
+    user: Optional[User] = Depends(get_optional_user_async),
+):
+    page = await event_service.get_event_page_async(
+        event_id, user=user, participants_limit=participants_limit, related_limit=related_limit
+    )
+    # анонимный ответ одинаков для всех, его можно недолго держать в HTTP-кэшах
+    if user is None:
+        response.headers["Cache-Control"] = f"public, max-age={settings.EVENT_PAGE_CACHE_TTL}"
+    else:
+        response.headers["Cache-Control"] = "private, no-store"
+    return page
+
+
 @router.post("/events", response_model=EventResponse)
 def create_event(
     event_data: EventCreateRequest,
@@ -363,6 +621,31 @@ def create_event(
     return event_service.create_event(db, event_data)
 
 
+@router.post("/events/bulk", response_model=BulkImportResponse)
+def bulk_import_events(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson|csv (по умолчанию — по имени файла)"),
+    db: Session = Depends(get_db),
+    _: User = Depends(require_admin),
+):
+    if format is None:
+        is_csv = (file.filename or "").lower().endswith(".csv") or file.content_type == "text/csv"
+        format = "csv" if is_csv else "ndjson"
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Поддерживаются только форматы ndjson и csv")
+    rows = event_service.iter_import_rows(file.file, format)
+    return event_service.bulk_import_events(db, rows)
+
+
+@router.post("/events/participants/bulk", response_model=BulkParticipantsResponse)
+def bulk_assign_participants(
+    data: BulkParticipantsRequest,
+    db: Session = Depends(get_db),
+    _: User = Depends(require_admin),
+):
+    return event_service.bulk_assign_participants(db, data.items)
+
+
 @router.put("/events/{event_id}", response_model=EventResponse)
 def update_event(
     event_id: UUID,
@@ -388,27 +671,40 @@ def delete_event(
     return event
 
 
-@router.post("/events/{event_id}/join", response_model=EventResponse)
+@router.post(
+    "/events/{event_id}/join",
+    response_model=EventResponse,
+    responses={202: {"model": AdmissionTicketResponse}},
+)
 def join_event(
     event_id: UUID,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
+    # событие с высоким спросом: билет в очередь допуска вместо записи
+    ticket = admission_service.try_enqueue(db, event_id, user)
+    if ticket is not None:
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder(admission_service.ticket_response(ticket)),
+        )
     return event_service.join_event(db, event_id, user)
 
 
-@router.post("/events/{event_id}/leave", response_model=EventResponse)
-def leave_event(
+@router.get("/events/{event_id}/queue/{ticket}", response_model=AdmissionTicketResponse)
+def get_admission_ticket(
     event_id: UUID,
-    db: Session = Depends(get_db),
+    ticket: str,
     user: User = Depends(get_current_user),
 ):
-    return event_service.leave_event(db, event_id, user)
+    return admission_service.get_ticket(event_id, ticket, user)
 
 
-@router.get("/events/my", response_model=List[EventResponse])
-def list_my_events(
+@router.post("/events/{event_id}/leave", response_model=EventResponse)
+def leave_event(
+    event_id: UUID,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    return event_service.list_user_events(db, user)
+    return event_service.leave_event(db, event_id, user)
+
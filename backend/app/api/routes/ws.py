@@ -1,15 +1,44 @@
+import json
+from typing import Optional
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.core.ws_manager import ws_manager
+from app.services import admission_service
 
 router = APIRouter(prefix="/ws", tags=["ws"])
 
 
 @router.websocket("/events")
-async def events_ws(websocket: WebSocket):
-    await ws_manager.connect(websocket)
+async def events_ws(
+    websocket: WebSocket,
+    stream: Optional[str] = None,
+    since: Optional[int] = None,
+    token: Optional[str] = None,
+):
+    # переподключение: ?stream=...&since=<последний seq> — досылаются только
+    # пропущенные сообщения или {"type": "resync_required"}.
+    # ?token=<JWT> необязателен: с ним подписки ограничены билетами владельца
+    conn = await ws_manager.connect(websocket, stream, since, token)
+    if conn is None:
+        return
     try:
         while True:
-            # держим соединение живым; сообщения от клиента игнорируем
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            # от клиента понимаем pong на ping сервера и подписку на билет
+            # очереди допуска: {"type": "queue.subscribe", "ticket": "..."}
+            text = await websocket.receive_text()
+            ws_manager.touch(conn)
+            try:
+                data = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(data, dict) or data.get("type") != "queue.subscribe":
+                continue
+            state = admission_service.subscribe(str(data.get("ticket")), websocket, conn.user_id)
+            if state is not None:
+                ws_manager.send(websocket, state)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError — сокет уже закрыт сервером (простой, переполнение буфера)
+        pass
+    finally:
         ws_manager.disconnect(websocket)
+        admission_service.unsubscribe(websocket)
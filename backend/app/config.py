@@ -5,6 +5,21 @@ from pydantic import AnyUrl
 class Settings(BaseSettings):
     # База по умолчанию — локальный SQLite, можно переопределить в .env
     DATABASE_URL: str = "sqlite:///./app.db"
+    # Применять миграции на старте воркера. На проде лучше выключить и
+    # запускать `python -m app.db.migrations` отдельным шагом деплоя.
+    AUTO_MIGRATE: bool = True
+    # Сколько соединений пула открыть заранее в lifespan
+    DB_POOL_PREWARM: int = 2
+    # Пул async-движка (read-путь событий): при тысяче соединений корутины
+    # ждут соединение в очереди пула, а не свободный поток threadpool
+    DB_ASYNC_POOL_SIZE: int = 10
+    DB_ASYNC_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_TIMEOUT: float = 30.0
+    # Бюджет SQL-запросов на один HTTP-запрос (0 — не считать). При превышении
+    # пишем warning; фактическое число отдаётся в заголовке X-DB-Statements.
+    # Это диагностика; сами бюджеты горячих эндпоинтов проверяет
+    # tests/test_statement_budget.py.
+    DB_STATEMENT_BUDGET: int = 0
     # JWT
     JWT_SECRET_KEY: str = "CHANGE_ME_SECRET"
     JWT_ALGORITHM: str = "HS256"
@@ -17,6 +32,89 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = "pjyp guwp qkfl hlaq"  # Пароль приложения
     SMTP_USE_TLS: bool = True  # Используем TLS для безопасности
 
+    # Время жизни кэша «мои события» в памяти воркера, сек (0 — выключен)
+    MY_EVENTS_CACHE_TTL: int = 30
+    # Как часто (сек) счётчики фасетов перестраиваются из БД целиком
+    FACETS_REBUILD_INTERVAL: int = 300
+    # Как часто (сек) пересчитываются признаки для рекомендаций
+    RECOMMENDATIONS_REFRESH_INTERVAL: int = 300
+    # Как часто (сек) ICS-лента города перечитывается из БД целиком
+    CALENDAR_REBUILD_INTERVAL: int = 300
+    # Как часто (сек) гео-индекс событий перестраивается из БД целиком
+    GEO_INDEX_REBUILD_INTERVAL: int = 300
+    # Outbox: размер пакета, период опроса (сек), число попыток и аренда пакета (сек)
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_LEASE_SECONDS: int = 60
+    # Сколько часов хранить доставленные сообщения outbox
+    OUTBOX_RETENTION_HOURS: int = 24
+    # Лента изменений событий: курсор не обгоняет записи моложе SAFETY_LAG сек
+    # (seq выдаётся до commit, и более ранняя транзакция может закоммититься
+    # позже), записи старше RETENTION_HOURS удаляются — такой since получит 410
+    CHANGE_FEED_SAFETY_LAG: float = 5.0
+    CHANGE_FEED_RETENTION_HOURS: int = 24 * 7
+    # Реплика каталога в памяти воркера: максимальный возраст снимка (сек),
+    # после которого чтение догоняет его по ленте изменений, и размер пачки
+    CATALOG_MAX_STALENESS: float = 2.0
+    CATALOG_REFRESH_BATCH: int = 1000
+    # Очередь допуска для событий high_demand: допусков в секунду на событие,
+    # предел длины очереди, сколько (сек) хранить итог билета для опроса
+    ADMISSION_RATE: float = 20.0
+    ADMISSION_MAX_WAITING: int = 10000
+    ADMISSION_TICKET_TTL: int = 300
+    # Как часто (сек) подписчикам /ws/events рассылается их позиция
+    ADMISSION_NOTIFY_INTERVAL: float = 1.0
+    # Счётчик участников горячего события разбит на столько строк-шардов;
+    # сумма шардов кэшируется на PARTICIPANT_COUNTER_CACHE_TTL сек
+    PARTICIPANT_COUNTER_SHARDS: int = 16
+    PARTICIPANT_COUNTER_CACHE_TTL: float = 1.0
+    # Сколько мест горячего события воркер резервирует за одно обращение
+    # к строке события (остаток возвращается при остановке). Резерв — аренда
+    # на SEAT_LEASE_SECONDS, продлеваемая каждые SEAT_LEASE_SECONDS / 3:
+    # места упавшего воркера возвращаются в лимит, когда аренда истечёт
+    SEAT_RESERVATION_BATCH: int = 20
+    SEAT_LEASE_SECONDS: int = 60
+    # Idempotency-Key для register/create/join/leave: хранилище (memory — в
+    # памяти воркера, db — общая таблица), сколько (сек) помнить ответ,
+    # аренда ключа незавершённого запроса, предел числа ключей в памяти
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LEASE_SECONDS: int = 60
+    IDEMPOTENCY_MAX_KEYS: int = 100_000
+    # Сколько последних рассылок /ws/events хранить для переподключения
+    # с ?stream=&since= (клиент получает только пропущенное)
+    WS_REPLAY_BUFFER: int = 1000
+    # /ws/events: ping раз в WS_PING_INTERVAL сек, отключение клиента,
+    # молчащего дольше WS_IDLE_TIMEOUT; лимиты соединений на воркер и на IP;
+    # сколько байт может скопиться в очереди отправки медленного клиента
+    WS_PING_INTERVAL: float = 20.0
+    WS_IDLE_TIMEOUT: float = 60.0
+    WS_MAX_CONNECTIONS: int = 5000
+    WS_MAX_CONNECTIONS_PER_IP: int = 20
+    WS_MAX_BUFFERED_BYTES: int = 1_048_576
+    # Бинарный подпротокол events.bin.v1: рассылки копятся не дольше
+    # WS_BINARY_BATCH_INTERVAL сек и уходят одним кадром (0 — в пределах
+    # одной итерации event loop); False — подпротокол не предлагается
+    WS_BINARY_ENABLED: bool = True
+    WS_BINARY_BATCH_INTERVAL: float = 0.05
+    # Лимит подписчиков /auth/events/stream (SSE) на воркер; keep-alive
+    # раз в WS_PING_INTERVAL, буфер медленного клиента — WS_MAX_BUFFERED_BYTES
+    SSE_MAX_CONNECTIONS: int = 20000
+    # Журнал участия: transaction — строка пишется в транзакции join/leave,
+    # group — копится в памяти и spool-файле и пишется пачками (group commit):
+    # до PARTICIPANT_LOG_BATCH строк или раз в PARTICIPANT_LOG_INTERVAL сек.
+    # PARTICIPANT_LOG_FSYNC — fsync spool на каждую запись (переживает падение ОС;
+    # в group строки пишутся в spool до commit транзакции join/leave)
+    PARTICIPANT_LOG_MODE: str = "transaction"
+    PARTICIPANT_LOG_BATCH: int = 500
+    PARTICIPANT_LOG_INTERVAL: float = 0.2
+    PARTICIPANT_LOG_FSYNC: bool = True
+    # Каталог spool-файлов group commit (сегменты упавших воркеров досылаются при старте)
+    SPOOL_DIR: str = "./spool"
+    # Время жизни кэша страницы события для анонимных запросов, сек (0 — выключен)
+    EVENT_PAGE_CACHE_TTL: int = 10
+
     FRONTEND_BASE_URL: str = "http://localhost:3000"
 
     class Config:
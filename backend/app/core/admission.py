@@ -0,0 +1,227 @@
+# app/core/admission.py
+"""
+Очередь допуска к записи на события с высоким спросом (в памяти воркера).
+
+Запрос на join получает билет с порядковым номером; take() выдаёт билеты
+из головы очереди не быстрее rate в секунду на событие (token bucket).
+Счётчик оставшихся мест позволяет отказать сразу, без похода в БД, когда
+мест уже не хватит на всех стоящих в очереди (check() — до чтения события,
+пока счётчик не старше remaining_ttl). Позиция в очереди — разность
+номеров, O(1).
+"""
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from uuid import UUID
+
+WAITING = "waiting"
+ADMITTED = "admitted"
+JOINED = "joined"
+REJECTED = "rejected"
+
+_KEEP = object()
+
+
+class AdmissionRejected(Exception):
+    """Отказ без постановки в очередь (мест нет или очередь переполнена)."""
+
+
+class Ticket:
+    __slots__ = ("id", "event_id", "user_id", "number", "status", "detail", "finished_at")
+
+    def __init__(self, event_id: UUID, user_id: UUID, number: int):
+        self.id = secrets.token_urlsafe(16)
+        self.event_id = event_id
+        self.user_id = user_id
+        self.number = number
+        self.status = WAITING
+        self.detail: Optional[str] = None
+        self.finished_at: Optional[float] = None
+
+
+class _EventQueue:
+    __slots__ = (
+        "remaining", "counted_at", "waiting", "by_user", "next_number", "tokens", "updated_at", "active"
+    )
+
+    def __init__(self, remaining: Optional[int]):
+        # None — без лимита участников; counted_at — когда remaining взят из БД
+        self.remaining = remaining
+        self.counted_at = time.monotonic()
+        self.waiting: Deque[Ticket] = deque()
+        self.by_user: Dict[UUID, Ticket] = {}
+        self.next_number = 1
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        # время последней активности — простаивающие очереди удаляются
+        self.active = self.updated_at
+
+
+class AdmissionQueue:
+    def __init__(self, rate: float, max_waiting: int, ticket_ttl: float, remaining_ttl: float = 1.0):
+        self.rate = rate
+        self.max_waiting = max_waiting
+        self.ticket_ttl = ticket_ttl
+        self.remaining_ttl = remaining_ttl
+        self._queues: Dict[UUID, _EventQueue] = {}
+        self._tickets: Dict[str, Ticket] = {}
+        self._lock = threading.Lock()
+
+    def check(self, event_id: UUID, user_id: UUID) -> Optional[Ticket]:
+        """
+        Проверка до чтения БД: живой билет пользователя, если он есть, или
+        AdmissionRejected, если по свежему (не старше remaining_ttl) счётчику
+        очереди мест уже нет. None — решит enqueue с remaining из БД.
+        """
+        with self._lock:
+            queue = self._queues.get(event_id)
+            if queue is None:
+                return None
+            ticket = queue.by_user.get(user_id)
+            if ticket is not None and ticket.status in (WAITING, ADMITTED):
+                return ticket
+            if (
+                queue.remaining is not None
+                and queue.remaining - len(queue.waiting) <= 0
+                and time.monotonic() - queue.counted_at <= self.remaining_ttl
+            ):
+                raise AdmissionRejected("Достигнут максимальный лимит участников")
+            return None
+
+    def enqueue(self, event_id: UUID, user_id: UUID, remaining: Optional[int]) -> Ticket:
+        """
+        Билет в очередь события. remaining — свободные места по счётчикам
+        участников (None — без лимита); каждый новый билет обновляет им
+        счётчик очереди, так что места, освободившиеся в других воркерах,
+        снова становятся доступны.
+        """
+        with self._lock:
+            queue = self._queues.get(event_id)
+            if queue is None:
+                queue = self._queues[event_id] = _EventQueue(remaining)
+            queue.remaining = remaining
+            queue.counted_at = time.monotonic()
+            ticket = queue.by_user.get(user_id)
+            if ticket is not None and ticket.status in (WAITING, ADMITTED):
+                return ticket
+            if queue.remaining is not None and queue.remaining - len(queue.waiting) <= 0:
+                raise AdmissionRejected("Достигнут максимальный лимит участников")
+            if len(queue.waiting) >= self.max_waiting:
+                raise AdmissionRejected("Очередь переполнена, попробуйте позже")
+            ticket = Ticket(event_id, user_id, queue.next_number)
+            queue.next_number += 1
+            queue.waiting.append(ticket)
+            queue.by_user[user_id] = ticket
+            queue.active = time.monotonic()
+            self._tickets[ticket.id] = ticket
+            return ticket
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        return self._tickets.get(ticket_id)
+
+    def position(self, ticket: Ticket) -> Optional[int]:
+        """Место в очереди (1 — следующий на допуск); None, если билет уже не ждёт."""
+        with self._lock:
+            if ticket.status != WAITING:
+                return None
+            queue = self._queues.get(ticket.event_id)
+            if queue is None or not queue.waiting:
+                return None
+            return ticket.number - queue.waiting[0].number + 1
+
+    def has_waiting(self) -> bool:
+        with self._lock:
+            return any(queue.waiting for queue in self._queues.values())
+
+    def take(self) -> List[Ticket]:
+        """Билеты, допущенные к записи сейчас: не больше rate в секунду на событие."""
+        now = time.monotonic()
+        admitted: List[Ticket] = []
+        with self._lock:
+            for queue in self._queues.values():
+                if not queue.waiting:
+                    queue.tokens = 0.0
+                    queue.updated_at = now
+                    continue
+                # запас не больше секунды — без всплеска после простоя
+                queue.tokens = min(self.rate, queue.tokens + (now - queue.updated_at) * self.rate)
+                queue.updated_at = now
+                while queue.waiting and queue.tokens >= 1:
+                    ticket = queue.waiting.popleft()
+                    ticket.status = ADMITTED
+                    queue.tokens -= 1
+                    queue.active = now
+                    admitted.append(ticket)
+        return admitted
+
+    def _reject_waiting(self, queue: _EventQueue, detail: str, now: float) -> List[Ticket]:
+        rejected = list(queue.waiting)
+        for ticket in rejected:
+            ticket.status = REJECTED
+            ticket.detail = detail
+            ticket.finished_at = now
+        queue.waiting.clear()
+        return rejected
+
+    def finish(self, ticket: Ticket, status: str, detail: Optional[str] = None, remaining=_KEEP) -> List[Ticket]:
+        """
+        Итог допуска билета; remaining — точное число свободных мест после
+        записи. Если мест не осталось, остальным отказываем сразу —
+        возвращает список таких билетов.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ticket.status = status
+            ticket.detail = detail
+            ticket.finished_at = now
+            queue = self._queues.get(ticket.event_id)
+            if queue is None:
+                return []
+            queue.active = now
+            if remaining is not _KEEP:
+                queue.remaining = remaining
+                queue.counted_at = now
+            if queue.remaining is not None and queue.remaining <= 0:
+                return self._reject_waiting(queue, "Достигнут максимальный лимит участников", now)
+            return []
+
+    def credit(self, event_id: UUID, seats: int = 1) -> None:
+        """Место освободилось (выход участника) — вернуть его очереди."""
+        with self._lock:
+            queue = self._queues.get(event_id)
+            if queue is not None and queue.remaining is not None:
+                queue.remaining += seats
+
+    def reject_all(self, event_id: UUID, detail: str) -> List[Ticket]:
+        """Событие недоступно (удалено, прошло) — отказываем всей очереди."""
+        with self._lock:
+            queue = self._queues.get(event_id)
+            if queue is None:
+                return []
+            queue.remaining = 0
+            return self._reject_waiting(queue, detail, time.monotonic())
+
+    def purge(self) -> None:
+        """Удаляет завершённые билеты старше ticket_ttl и простаивающие очереди."""
+        now = time.monotonic()
+        with self._lock:
+            for ticket_id, ticket in list(self._tickets.items()):
+                if ticket.finished_at is not None and now - ticket.finished_at > self.ticket_ttl:
+                    del self._tickets[ticket_id]
+                    queue = self._queues.get(ticket.event_id)
+                    if queue is not None and queue.by_user.get(ticket.user_id) is ticket:
+                        del queue.by_user[ticket.user_id]
+            for event_id, queue in list(self._queues.items()):
+                # счётчик мест перечитается из каталога при следующем билете
+                if not queue.waiting and now - queue.active > self.ticket_ttl:
+                    del self._queues[event_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": len(self._queues),
+                "waiting": sum(len(queue.waiting) for queue in self._queues.values()),
+                "tickets": len(self._tickets),
+            }
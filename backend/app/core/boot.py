@@ -0,0 +1,49 @@
+# app/core/boot.py
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class BootTimer:
+    """Замеры времени старта воркера: импорт приложения и шаги lifespan."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        """Фиксирует время, прошедшее с предыдущей отметки."""
+        now = time.perf_counter()
+        self.phases[name] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases[name] = round((now - started) * 1000, 2)
+            self._last = now
+
+    def report(self) -> Dict[str, float]:
+        return {
+            **self.phases,
+            "total": round((self._last - self.started) * 1000, 2),
+        }
+
+    def log(self) -> None:
+        report = self.report()
+        logger.info(
+            "[BOOT] готов за %.1f мс (%s)",
+            report["total"],
+            ", ".join(f"{k}={v} мс" for k, v in self.phases.items()),
+        )
+
+
+boot_timer = BootTimer()
@@ -0,0 +1,149 @@
+# app/core/calendar.py
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from app.config import settings
+
+_CRLF = "\r\n"
+
+
+def _escape(value: str) -> str:
+    """Экранирование TEXT-значений по RFC 5545."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Строки длиннее 75 октетов переносим с пробелом в начале продолжения (UTF-8 не режем)."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + _CRLF
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74  # первая позиция продолжения занята пробелом
+    return (_CRLF + " ").join(parts) + _CRLF
+
+
+def _stamp(value: datetime) -> str:
+    # даты в БД хранятся как наивное UTC-время
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_vevent(event) -> bytes:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event.id}@afisha",
+        f"DTSTAMP:{_stamp(event.updated_at)}",
+        f"DTSTART:{_stamp(event.start_date)}",
+        f"DTEND:{_stamp(event.end_date)}",
+        f"SUMMARY:{_escape(event.title)}",
+        f"DESCRIPTION:{_escape(event.short_description or event.description)}",
+        f"LOCATION:{_escape(event.city)}",
+        f"CATEGORIES:{_escape(event.category)}",
+        f"URL:{settings.FRONTEND_BASE_URL}/events/{event.id}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines).encode("utf-8")
+
+
+def _header(city: str) -> bytes:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Afisha//Events//RU",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape(f'Афиша — {city}')}",
+    ]
+    return "".join(_fold(line) for line in lines).encode("utf-8")
+
+
+_FOOTER = ("END:VCALENDAR" + _CRLF).encode("utf-8")
+
+
+class CalendarFeed:
+    """
+    ICS-ленты по городам. Для каждого города держим готовые VEVENT-блоки
+    (bytes) по id события; запись одного события перерисовывает только его
+    блок, а тело ленты склеивается заново лишь при первом чтении после
+    изменения. Раз в rebuild_interval город перечитывается из БД целиком,
+    чтобы подтянуть записи других воркеров. Храним только города, где есть
+    события: город из URL без событий получает пустую ленту мимо кэша.
+    """
+
+    def __init__(self, rebuild_interval: float):
+        self.rebuild_interval = rebuild_interval
+        # city -> (время загрузки, {event_id: VEVENT})
+        self._cities: Dict[str, Tuple[float, Dict[UUID, bytes]]] = {}
+        # city -> (тело ленты, etag); сбрасывается при любом изменении города
+        self._bodies: Dict[str, Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def needs_load(self, city: str) -> bool:
+        item = self._cities.get(city)
+        return item is None or time.monotonic() - item[0] > self.rebuild_interval
+
+    def load(self, city: str, events: Iterable) -> None:
+        blocks = {event.id: render_vevent(event) for event in events}
+        with self._lock:
+            self._bodies.pop(city, None)
+            if not blocks:
+                self._cities.pop(city, None)
+                return
+            self._cities[city] = (time.monotonic(), blocks)
+
+    def upsert(self, event) -> None:
+        block = render_vevent(event)
+        with self._lock:
+            item = self._cities.get(event.city)
+            if item is None:
+                return
+            item[1][event.id] = block
+            self._bodies.pop(event.city, None)
+
+    def remove(self, city: str, event_id: UUID) -> None:
+        with self._lock:
+            item = self._cities.get(city)
+            if item is None or item[1].pop(event_id, None) is None:
+                return
+            self._bodies.pop(city, None)
+            if not item[1]:
+                self._cities.pop(city, None)
+
+    def invalidate(self, city: Optional[str] = None) -> None:
+        """Массовые изменения — город (или все) перечитаем при следующем запросе."""
+        with self._lock:
+            if city is None:
+                self._cities.clear()
+                self._bodies.clear()
+            else:
+                self._cities.pop(city, None)
+                self._bodies.pop(city, None)
+
+    def body(self, city: str) -> Tuple[bytes, str]:
+        """Тело ленты и её ETag."""
+        with self._lock:
+            cached = self._bodies.get(city)
+            if cached is not None:
+                return cached
+            item = self._cities.get(city)
+            blocks = item[1].values() if item is not None else ()
+            body = b"".join([_header(city), *blocks, _FOOTER])
+            cached = (body, f'"{hashlib.md5(body).hexdigest()}"')
+            if item is not None:
+                self._bodies[city] = cached
+            return cached
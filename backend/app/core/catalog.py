@@ -0,0 +1,248 @@
+# app/core/catalog.py
+"""
+Реплика каталога событий в памяти воркера для публичного чтения.
+
+Снимок (CatalogSnapshot) неизменяем: обновление собирает новый снимок из
+старого и изменённых записей и подменяет ссылку одним присваиванием —
+читатели не берут блокировок и не видят наполовину обновлённых индексов.
+Записи, не менявшиеся между снимками, переиспользуются. Если у изменённых
+записей не сдвинулись ключи индексов (join/leave, правка текста), индексы
+не пересобираются: в копиях кортежей подменяется только сама запись.
+"""
+import bisect
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+_EVENT_FIELDS = (
+    "id",
+    "title",
+    "short_description",
+    "description",
+    "start_date",
+    "end_date",
+    "image_url",
+    "city",
+    "category",
+    "latitude",
+    "longitude",
+    "payment_info",
+    "max_participants",
+    "high_demand",
+    "status",
+    "is_deleted",
+)
+
+
+class CatalogRecord:
+    """Неизменяемая копия строки события и id её участников."""
+
+    __slots__ = _EVENT_FIELDS + ("participants", "response")
+
+    def __init__(self, event, participants: Iterable[UUID]):
+        for name in _EVENT_FIELDS:
+            setattr(self, name, getattr(event, name))
+        self.participants: Tuple[UUID, ...] = tuple(participants)
+        # готовый ответ API, строится при первом чтении (см. event_service)
+        self.response = None
+
+
+# записи по start_date и их start_date для bisect
+_Sorted = Tuple[Tuple[CatalogRecord, ...], List[datetime]]
+_EMPTY: _Sorted = ((), [])
+
+
+# при большем числе изменений дешевле пересобрать индексы целиком
+PATCH_LIMIT = 64
+
+
+def _sorted_index(records: List[CatalogRecord]) -> _Sorted:
+    return tuple(records), [r.start_date for r in records]
+
+
+def _index_key(record: CatalogRecord) -> tuple:
+    return record.start_date, record.status, record.city, record.is_deleted
+
+
+def _replace(index: _Sorted, old: CatalogRecord, new: CatalogRecord) -> _Sorted:
+    """Копия индекса с new на месте old; список start_date общий — он не меняется."""
+    records, starts = index
+    position = bisect.bisect_left(starts, old.start_date)
+    while records[position] is not old:
+        position += 1
+    return records[:position] + (new,) + records[position + 1:], starts
+
+
+class CatalogSnapshot:
+    """Записи по id (включая удалённые) и индексы неудалённых по статусу и городу."""
+
+    __slots__ = ("records", "seq", "_all", "_by_status", "_by_city")
+
+    def __init__(self, records: Dict[UUID, CatalogRecord], seq: int):
+        self.records = records
+        # seq ленты изменений, до которого снимок полон
+        self.seq = seq
+        live = sorted((r for r in records.values() if not r.is_deleted), key=lambda r: r.start_date)
+        by_status: Dict[str, List[CatalogRecord]] = {}
+        by_city: Dict[str, List[CatalogRecord]] = {}
+        for record in live:
+            by_status.setdefault(record.status, []).append(record)
+            by_city.setdefault(record.city, []).append(record)
+        self._all = _sorted_index(live)
+        self._by_status = {key: _sorted_index(items) for key, items in by_status.items()}
+        self._by_city = {key: _sorted_index(items) for key, items in by_city.items()}
+
+    def patched(self, records: List[CatalogRecord], seq: int) -> Optional["CatalogSnapshot"]:
+        """
+        Снимок с заменёнными записями без пересборки индексов — если все
+        записи уже были в снимке с теми же start_date, статусом, городом и
+        is_deleted. Иначе None: нужен новый CatalogSnapshot.
+        """
+        if len(records) > PATCH_LIMIT:
+            return None
+        records = list({record.id: record for record in records}.values())
+        olds = [self.records.get(record.id) for record in records]
+        if any(old is None or _index_key(old) != _index_key(new) for old, new in zip(olds, records)):
+            return None
+        clone = CatalogSnapshot.__new__(CatalogSnapshot)
+        clone.records = dict(self.records)
+        clone._all = self._all
+        clone._by_status, clone._by_city = dict(self._by_status), dict(self._by_city)
+        clone.seq = seq
+        for old, new in zip(olds, records):
+            clone.records[new.id] = new
+            if new.is_deleted:
+                continue
+            clone._all = _replace(clone._all, old, new)
+            clone._by_status[new.status] = _replace(clone._by_status[new.status], old, new)
+            clone._by_city[new.city] = _replace(clone._by_city[new.city], old, new)
+        return clone
+
+    def with_seq(self, seq: int) -> "CatalogSnapshot":
+        """Тот же снимок с новым seq — без перестройки индексов."""
+        clone = CatalogSnapshot.__new__(CatalogSnapshot)
+        clone.records, clone._all = self.records, self._all
+        clone._by_status, clone._by_city = self._by_status, self._by_city
+        clone.seq = seq
+        return clone
+
+    def __len__(self) -> int:
+        return len(self._all[0])
+
+    def get(self, event_id: UUID) -> Optional[CatalogRecord]:
+        return self.records.get(event_id)
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        city: Optional[str] = None,
+        category: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> List[CatalogRecord]:
+        """
+        Те же условия, что у event_repo.list_events_stmt: неудалённые, по start_date,
+        пересекающиеся с окном [date_from, date_to]. Начинаем с самого
+        короткого индекса и отрезаем по date_to бинарным поиском.
+        """
+        candidates = self._all
+        if status:
+            candidates = self._by_status.get(status, _EMPTY)
+        if city:
+            by_city = self._by_city.get(city, _EMPTY)
+            if len(by_city[0]) < len(candidates[0]):
+                candidates = by_city
+        records, starts = candidates
+        if date_to is not None:
+            records = records[:bisect.bisect_right(starts, date_to)]
+        return [
+            r
+            for r in records
+            if (not status or r.status == status)
+            and (not city or r.city == city)
+            and (not category or r.category == category)
+            and (date_from is None or r.end_date >= date_from)
+        ]
+
+
+class EventCatalog:
+    """
+    Держатель текущего снимка. Снимок считается устаревшим через
+    max_staleness секунд после обновления или сразу после mark_dirty()
+    (запись в этом воркере) — тогда его догоняют по ленте изменений.
+    """
+
+    def __init__(self, max_staleness: float):
+        self.max_staleness = max_staleness
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._refreshed_at: Optional[float] = None
+        self._dirty = False
+        self.refreshes = 0
+        self.full_loads = 0
+        self.patches = 0
+        self.last_refresh_ms = 0.0
+        self.last_changed = 0
+
+    def needs_refresh(self) -> bool:
+        refreshed_at = self._refreshed_at
+        return (
+            self.snapshot is None
+            or self._dirty
+            or time.monotonic() - refreshed_at > self.max_staleness
+        )
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    def begin_refresh(self) -> None:
+        """Сбрасываем флаг до чтения БД: запись во время обновления снова его поднимет."""
+        self._dirty = False
+
+    def _swap(self, snapshot: CatalogSnapshot, changed: int, took: float) -> None:
+        self.snapshot = snapshot
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+        self.last_changed = changed
+        self.last_refresh_ms = took * 1000
+
+    def load(self, records: Iterable[CatalogRecord], seq: int, took: float) -> None:
+        records = {record.id: record for record in records}
+        self.full_loads += 1
+        self._swap(CatalogSnapshot(records, seq), len(records), took)
+
+    def apply(self, records: List[CatalogRecord], seq: int, took: float) -> None:
+        """
+        Копия текущего снимка с заменёнными записями; без изменений — только
+        сдвиг seq. Индексы пересобираются, только если записи в них сдвинулись.
+        """
+        current = self.snapshot
+        if not records:
+            snapshot = current if seq == current.seq else current.with_seq(seq)
+        else:
+            snapshot = current.patched(records, seq)
+            if snapshot is not None:
+                self.patches += 1
+            else:
+                merged = dict(current.records)
+                merged.update((record.id, record) for record in records)
+                snapshot = CatalogSnapshot(merged, seq)
+        self._swap(snapshot, len(records), took)
+
+    def freshness(self) -> dict:
+        snapshot = self.snapshot
+        refreshed_at = self._refreshed_at
+        return {
+            "loaded": snapshot is not None,
+            "events": len(snapshot.records) if snapshot else 0,
+            "live_events": len(snapshot) if snapshot else 0,
+            "seq": snapshot.seq if snapshot else None,
+            "age_seconds": round(time.monotonic() - refreshed_at, 3) if refreshed_at else None,
+            "max_staleness_seconds": self.max_staleness,
+            "dirty": self._dirty,
+            "refreshes": self.refreshes,
+            "full_loads": self.full_loads,
+            "patches": self.patches,
+            "last_refresh_ms": round(self.last_refresh_ms, 2),
+            "last_changed": self.last_changed,
+        }
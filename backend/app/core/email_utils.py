@@ -1,195 +1,124 @@
+import base64
 import logging
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 
 from app.config import settings
+from app.core.templates import email_templates
 
 logger = logging.getLogger(__name__)
 
-def send_confirmation_code(email: str, code: str):
-    """Отправка письма с кодом подтверждения"""
-    subject = "Подтверждение регистрации"
-    body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
-      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
-        <tr>
-          <td style="padding-bottom: 20px;">
-            <div style="display: flex; align-items: center; gap: 5px;">
-              <div style="width: 50px; height: 50px; border-radius: 50%; background: linear-gradient(90deg, #3b82f6, #9333ea);"></div>
-              <span style="font-size: 24px; font-weight: bold; color: #fff; line-height: 50px; margin-left: 5px;">Афиша+</span>
-            </div>
-          </td>
-        </tr>
-        <tr>
-          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
-            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Здравствуйте!</h2>
-            <p style="font-size: 16px; color: #b0b0b0;">Для завершения регистрации на сайте Афиша+, используйте следующий код:</p>
-            <h3 style="font-size: 28px; font-weight: bold; color: #fff;">{code}</h3>
-            <p style="font-size: 16px; color: #b0b0b0;">Код действует в течение 24 часов. Не передавайте этот код третьим лицам!</p>
-            <p style="font-size: 16px; margin-top: 20px; color: #b0b0b0;">С наилучшими пожеланиями,<br> Команда Афиша+</p>
-          </td>
-        </tr>
-        <tr>
-          <td style="padding-top: 20px;">
-            <p style="font-size: 12px; color: #b0b0b0;">Если у вас возникли вопросы, не стесняйтесь обращаться в нашу службу поддержки.</p>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
-    """
-    send_email(email, subject, body)
-
-
-def send_reset_code(email: str, code: str):
-    """Отправка письма с кодом для сброса пароля"""
-    subject = "Сброс пароля"
-    body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
-      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
-        <tr>
-          <td style="padding-bottom: 20px;">
-            <div style="display: flex; align-items: center; gap: 5px;">
-              <div style="width: 50px; height: 50px; border-radius: 50%; background: linear-gradient(90deg, #3b82f6, #9333ea);"></div>
-              <span style="font-size: 24px; font-weight: bold; color: #fff; line-height: 50px; margin-left: 5px;">Афиша+</span>
-            </div>
-          </td>
-        </tr>
-        <tr>
-          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
-            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Здравствуйте!</h2>
-            <p style="font-size: 16px; color: #b0b0b0;">Для сброса пароля на сайте Афиша+, используйте следующий код:</p>
-            <h3 style="font-size: 28px; font-weight: bold; color: #fff;">{code}</h3>
-            <p style="font-size: 16px; color: #b0b0b0;">Код действует в течение 24 часов. Не передавайте этот код третьим лицам!</p>
-            <p style="font-size: 16px; margin-top: 20px; color: #b0b0b0;">С наилучшими пожеланиями,<br> Команда Афиша+</p>
-          </td>
-        </tr>
-        <tr>
-          <td style="padding-top: 20px;">
-            <p style="font-size: 12px; color: #b0b0b0;">Если у вас возникли вопросы, не стесняйтесь обращаться в нашу службу поддержки.</p>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
-    """
-    send_email(email, subject, body)
-
-
-def send_welcome_email(email: str, full_name: str):
-    """Отправка письма с приветствием после подтверждения почты"""
-    subject = "Добро пожаловать!"
-    body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
-      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
-        <tr>
-          <td style="padding-bottom: 20px;">
-            <div style="display: flex; align-items: center; gap: 5px;">
-              <div style="width: 50px; height: 50px; border-radius: 50%; background: linear-gradient(90deg, #3b82f6, #9333ea);"></div>
-              <span style="font-size: 24px; font-weight: bold; color: #fff; line-height: 50px; margin-left: 5px;">Афиша+</span>
-            </div>
-          </td>
-        </tr>
-        <tr>
-          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
-            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Здравствуйте, {full_name}!</h2>
-            <p style="font-size: 16px; color: #b0b0b0;">Вы успешно подтвердили почту и зарегистрировались на Афиша+.</p>
-            <p style="font-size: 16px; color: #b0b0b0;">Добро пожаловать!</p>
-          </td>
-        </tr>
-        <tr>
-          <td style="padding-top: 20px;">
-            <p style="font-size: 12px; color: #b0b0b0;">Если у вас возникли вопросы, напишите в поддержку.</p>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
-    """
-    send_email(email, subject, body)
-
+# (адрес, готовое к отправке письмо целиком: заголовки + тело в base64)
+Payload = Tuple[str, bytes]
 
 def send_password_changed(email: str, new_password: str | None = None):
     """Отправка уведомления об успешной смене пароля"""
-    subject = "Пароль изменён"
-    new_pass_block = ""
+    block = ""
     if new_password:
-        new_pass_block = f"<p style='font-size: 16px; color: #b0b0b0;'>Новый пароль: <strong>{new_password}</strong></p>"
-    body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
-      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
-        <tr>
-          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
-            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Ваш пароль изменён</h2>
-            {new_pass_block}
-            <p style="font-size: 16px; color: #b0b0b0;">Если это были не вы — срочно смените пароль и свяжитесь с поддержкой.</p>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
+        block = email_templates.get("new_password").render(new_password=new_password).decode("utf-8")
+    send_template("password_changed", [(email, {"new_password_block": block})])
+
+
+def event_values(event) -> dict:
+    return {
+        "title": event.title,
+        "start_date": str(event.start_date),
+        "end_date": str(event.end_date),
+        "summary": event.short_description or event.description[:150],
+    }
+
+
+@lru_cache(maxsize=1)
+def _static_headers() -> bytes:
+    return (
+        f"From: {settings.EMAIL_FROM}\r\n"
+        "MIME-Version: 1.0\r\n"
+        'Content-Type: text/html; charset="utf-8"\r\n'
+        "Content-Transfer-Encoding: base64\r\n"
+    ).encode("ascii")
+
+
+def _encode_subject(subject: str) -> bytes:
+    from email.header import Header
+
+    return Header(subject, "utf-8").encode().encode("ascii")
+
+
+def _encode_body(body: bytes) -> bytes:
+    return base64.encodebytes(body).replace(b"\n", b"\r\n")
+
+
+def _date_header() -> bytes:
+    from email.utils import formatdate
+
+    return formatdate(usegmt=True).encode("ascii")
+
+
+def _payload(to_email: str, subject: bytes, body: bytes, date: bytes) -> bytes:
+    return b"".join(
+        (_static_headers(), b"To: ", to_email.encode("utf-8"), b"\r\nSubject: ", subject,
+         b"\r\nDate: ", date, b"\r\n\r\n", body)
+    )
+
+
+def render_payloads(name: str, recipients: Iterable[Tuple[str, dict]]) -> List[Payload]:
+    """
+    Готовые письма для пакета получателей. Тема и тело (вместе с base64)
+    считаются один раз на каждый уникальный набор значений — при рассылке
+    одного приглашения многим адресатам на письмо остаётся склейка заголовков.
+    """
+    template = email_templates.get(name)
+    date = _date_header()
+    encoded: dict = {}
+    payloads = []
+    for to_email, values in recipients:
+        key = tuple(sorted((k, str(v)) for k, v in values.items()))
+        parts = encoded.get(key)
+        if parts is None:
+            parts = encoded[key] = (
+                _encode_subject(template.subject(**values) or ""),
+                _encode_body(template.render(**values)),
+            )
+        payloads.append((to_email, _payload(to_email, parts[0], parts[1], date)))
+    return payloads
+
+
+def send_template(name: str, recipients: Iterable[Tuple[str, dict]]) -> None:
+    send_payloads(render_payloads(name, recipients))
+
+
+def send_payloads(payloads: List[Payload]) -> List[int]:
     """
-    send_email(email, subject, body)
-
-
-def send_event_notification(emails: list[str], event):
-    """Уведомление участников о событии."""
-    if not emails:
-        return
-    subject = f"Приглашение на событие «{event.title}»"
-    body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
-      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
-        <tr>
-          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
-            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Вас пригласили на событие</h2>
-            <p style="font-size: 16px; color: #b0b0b0;">Название: <strong>{event.title}</strong></p>
-            <p style="font-size: 16px; color: #b0b0b0;">Начало: {event.start_date}</p>
-            <p style="font-size: 16px; color: #b0b0b0;">Окончание: {event.end_date}</p>
-            <p style="font-size: 16px; color: #b0b0b0;">Описание: {event.short_description or event.description[:150]}</p>
-          </td>
-        </tr>
-      </table>
-    </body>
-    </html>
+    Отправка готовых писем через одно SMTP-соединение.
+    Возвращает номера писем (индексы в payloads), которые отправить не удалось.
     """
-    for email in emails:
-        send_email(email, subject, body)
-
-def send_email(to_email: str, subject: str, body: str):
-    """Отправка письма"""
-    from_email = settings.EMAIL_FROM
-    smtp_host = settings.SMTP_HOST
-    smtp_port = settings.SMTP_PORT
-    smtp_user = settings.SMTP_USER
-    smtp_password = settings.SMTP_PASSWORD
-    use_tls = settings.SMTP_USE_TLS
-
-    # Создаём объект сообщения
-    msg = MIMEMultipart()
-    msg['From'] = from_email
-    msg['To'] = to_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'html'))
-
-    if not smtp_user or not smtp_password:
+    if not payloads:
+        return []
+    if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
         logger.error("[EMAIL ERROR] SMTP_USER/SMTP_PASSWORD не заданы")
-        return
+        return list(range(len(payloads)))
+    # smtplib подтягиваем только при реальной отправке,
+    # чтобы не тратить на него время при старте воркера.
+    import smtplib
 
+    failed: List[int] = []
+    position = 0
     try:
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
+        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=10) as server:
             server.ehlo()
-            if use_tls:
+            if settings.SMTP_USE_TLS:
                 server.starttls()
                 server.ehlo()
-            server.login(smtp_user, smtp_password)
-            server.sendmail(from_email, to_email, msg.as_string())
-        logger.info("[EMAIL] Письмо отправлено на %s", to_email)
-    except Exception as e:
-        logger.exception("[EMAIL ERROR] Не удалось отправить письмо на %s", to_email)
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            for position, (to_email, payload) in enumerate(payloads):
+                try:
+                    server.sendmail(settings.EMAIL_FROM, to_email, payload)
+                    logger.info("[EMAIL] Письмо отправлено на %s", to_email)
+                except smtplib.SMTPRecipientsRefused:
+                    logger.exception("[EMAIL ERROR] Не удалось отправить письмо на %s", to_email)
+                    failed.append(position)
+            position = len(payloads)
+    except Exception:
+        logger.exception("[EMAIL ERROR] Не удалось отправить %d писем", len(payloads) - position)
+        failed.extend(range(position, len(payloads)))
+    return failed
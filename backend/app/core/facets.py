@@ -0,0 +1,76 @@
+# app/core/facets.py
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+# (status, city, category)
+FacetKey = Tuple[str, str, str]
+
+
+class FacetIndex:
+    """
+    Счётчики событий по (status, city, category) в памяти воркера.
+    Строится одним GROUP BY при первом обращении, дальше обновляется
+    инкрементально из create/update/delete. Раз в rebuild_interval
+    перестраивается целиком, чтобы подтянуть записи других воркеров.
+    """
+
+    def __init__(self, rebuild_interval: float):
+        self.rebuild_interval = rebuild_interval
+        self._counts: Counter = Counter()
+        self._loaded_at: Optional[float] = None
+        self._views: Dict[Optional[str], dict] = {}
+        self._lock = threading.Lock()
+
+    def needs_load(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.rebuild_interval
+
+    def load(self, rows: Iterable[Tuple[str, str, str, int]]) -> None:
+        counts = Counter({(status, city, category): n for status, city, category, n in rows})
+        with self._lock:
+            self._counts = counts
+            self._views = {}
+            self._loaded_at = time.monotonic()
+
+    def reset(self) -> None:
+        """Массовые изменения без списка затронутых событий — перестроим при следующем чтении."""
+        with self._lock:
+            self._loaded_at = None
+
+    def apply(self, old: Optional[FacetKey], new: Optional[FacetKey]) -> None:
+        """Переносит событие из одной ячейки в другую (None — события нет/удалено)."""
+        if old == new:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            if old is not None:
+                self._counts[old] -= 1
+                if self._counts[old] <= 0:
+                    del self._counts[old]
+            if new is not None:
+                self._counts[new] += 1
+            self._views = {}
+
+    def counts(self, status: Optional[str] = None) -> dict:
+        with self._lock:
+            view = self._views.get(status)
+            if view is None:
+                cities: Counter = Counter()
+                categories: Counter = Counter()
+                statuses: Counter = Counter()
+                for (ev_status, city, category), n in self._counts.items():
+                    statuses[ev_status] += n
+                    if status and ev_status != status:
+                        continue
+                    cities[city] += n
+                    categories[category] += n
+                view = {
+                    "cities": dict(cities.most_common()),
+                    "categories": dict(categories.most_common()),
+                    "statuses": dict(statuses),
+                }
+                self._views[status] = view
+            return view
@@ -0,0 +1,183 @@
+# app/core/geo.py
+import heapq
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# (event_id, latitude, longitude, end_date)
+GeoRow = Tuple[UUID, float, float, datetime]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """
+    Сетка cell_deg×cell_deg градусов по координатам событий в памяти воркера.
+    Запрос по радиусу обходит только ячейки, покрывающие окружность, k-NN —
+    расширяющийся радиус. Обновляется инкрементально из create/update/delete,
+    раз в rebuild_interval перестраивается целиком (записи других воркеров).
+    """
+
+    def __init__(self, rebuild_interval: float, cell_deg: float = 0.25):
+        self.rebuild_interval = rebuild_interval
+        self.cell_deg = cell_deg
+        self._columns = int(math.ceil(360 / cell_deg))
+        self._points: Dict[UUID, Tuple[float, float, datetime]] = {}
+        self._cells: Dict[Tuple[int, int], Set[UUID]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        x = int((lon + 180) // self.cell_deg) % self._columns
+        y = int((lat + 90) // self.cell_deg)
+        return x, y
+
+    def needs_load(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.rebuild_interval
+
+    def reset(self) -> None:
+        self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def load(self, rows: Iterable[GeoRow]) -> None:
+        points: Dict[UUID, Tuple[float, float, datetime]] = {}
+        cells: Dict[Tuple[int, int], Set[UUID]] = {}
+        for event_id, lat, lon, end_date in rows:
+            points[event_id] = (lat, lon, end_date)
+            cells.setdefault(self._cell(lat, lon), set()).add(event_id)
+        with self._lock:
+            self._points = points
+            self._cells = cells
+            self._loaded_at = time.monotonic()
+
+    def _discard(self, event_id: UUID) -> None:
+        point = self._points.pop(event_id, None)
+        if point is None:
+            return
+        cell = self._cell(point[0], point[1])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(event_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def put(
+        self,
+        event_id: UUID,
+        lat: Optional[float],
+        lon: Optional[float],
+        end_date: datetime,
+    ) -> None:
+        """Добавляет/перемещает событие; без координат — убирает из индекса."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._discard(event_id)
+            if lat is None or lon is None:
+                return
+            self._points[event_id] = (lat, lon, end_date)
+            self._cells.setdefault(self._cell(lat, lon), set()).add(event_id)
+
+    def remove(self, event_id: UUID) -> None:
+        with self._lock:
+            self._discard(event_id)
+
+    def _span(self, lat: float, lon: float, radius_km: float) -> Tuple[Iterable[int], int, int]:
+        """Колонки и диапазон строк сетки, покрывающие круг."""
+        dlat = radius_km / KM_PER_DEGREE
+        y_min = max(0, int((lat - dlat + 90) // self.cell_deg))
+        y_max = int((min(lat + dlat, 90.0) + 90) // self.cell_deg)
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-9 else 360.0
+        if dlon >= 180:
+            return range(self._columns), y_min, y_max
+        x_min = int((lon - dlon + 180) // self.cell_deg)
+        x_max = int((lon + dlon + 180) // self.cell_deg)
+        return {x % self._columns for x in range(x_min, x_max + 1)}, y_min, y_max
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = None,
+        not_ended_before: Optional[datetime] = None,
+    ) -> List[Tuple[float, UUID]]:
+        """(расстояние, id) в радиусе radius_km от точки, ближайшие первыми."""
+        xs, y_min, y_max = self._span(lat, lon, radius_km)
+        found: List[Tuple[float, UUID]] = []
+        with self._lock:
+            cells, points = self._cells, self._points
+            for x in xs:
+                for y in range(y_min, y_max + 1):
+                    for event_id in cells.get((x, y), ()):
+                        p_lat, p_lon, end_date = points[event_id]
+                        if not_ended_before is not None and end_date < not_ended_before:
+                            continue
+                        distance = haversine_km(lat, lon, p_lat, p_lon)
+                        if distance <= radius_km:
+                            found.append((distance, event_id))
+        if limit is not None:
+            return heapq.nsmallest(limit, found)
+        found.sort()
+        return found
+
+    def _scan(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        not_ended_before: Optional[datetime],
+    ) -> List[Tuple[float, UUID]]:
+        """k ближайших полным просмотром точек — без обхода пустых ячеек."""
+        with self._lock:
+            points = list(self._points.items())
+        return heapq.nsmallest(
+            k,
+            (
+                (haversine_km(lat, lon, p_lat, p_lon), event_id)
+                for event_id, (p_lat, p_lon, end_date) in points
+                if not_ended_before is None or end_date >= not_ended_before
+            ),
+        )
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        not_ended_before: Optional[datetime] = None,
+        start_km: float = 10.0,
+    ) -> List[Tuple[float, UUID]]:
+        """
+        k ближайших: радиус удваивается, пока в круг не попадёт k точек —
+        всё, что снаружи круга, заведомо дальше k-й найденной. Когда ячеек
+        в круге становится больше, чем точек в индексе (редкий индекс,
+        радиус порядка полушария), дешевле просмотреть все точки сразу.
+        """
+        radius = start_km
+        max_radius = math.pi * EARTH_RADIUS_KM
+        while True:
+            total = len(self._points)
+            xs, y_min, y_max = self._span(lat, lon, radius)
+            if len(xs) * (y_max - y_min + 1) >= total:
+                return self._scan(lat, lon, k, not_ended_before)
+            found = self.within(lat, lon, radius, limit=k, not_ended_before=not_ended_before)
+            if len(found) >= k or len(found) == total or radius >= max_radius:
+                return found
+            radius = min(radius * 2, max_radius)
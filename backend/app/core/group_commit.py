@@ -0,0 +1,308 @@
+# app/core/group_commit.py
+"""
+Group commit для append-only записей (журнал участия, аудит).
+
+append() не ходит в БД: строка дописывается в локальный spool-файл и в
+буфер памяти, а фоновый поток сбрасывает буфер одним многострочным INSERT
+(write_rows) — когда набралось max_batch строк или прошло interval сек.
+Одна транзакция на пачку вместо commit (fsync) на каждую запись.
+
+Сохранность: spool пишется до возврата из append(), так что падение
+процесса не теряет записи — при следующем start() осиротевшие сегменты
+(их владелец мёртв и не держит flock) досылаются в БД. С fsync=True
+(по умолчанию) записи переживают и падение ОС. Повторная отправка
+сегмента возможна (упали между commit и удалением файла), поэтому
+write_rows обязан быть идемпотентным — например, INSERT ... ON CONFLICT
+DO NOTHING по id, который вызывающий присваивает строке сам.
+
+Строки, порождённые транзакцией, пишутся в spool до её commit (stage) и
+попадают в пачку после него (confirm) или отбрасываются при rollback
+(discard) — между commit и spool нет окна, в котором падение теряет
+строку. Ещё не подтверждённые строки при смене сегмента переписываются в
+новый. Строки транзакций, не дошедших до commit, остаются в файле; при
+досылке после падения их отсеивает committed — вызывающий проверяет по
+БД, какие транзакции закоммичены.
+
+Сегмент spool — файл <name>-<pid>-<n>.spool, по строке JSON на запись;
+строки должны сериализоваться в JSON.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировок, осиротевшими считаются чужие pid
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Segment:
+    __slots__ = ("path", "fd", "rows", "staged")
+
+    def __init__(self, path: str, fd: Optional[int], rows: List[dict]):
+        self.path = path
+        self.fd = fd
+        self.rows = rows
+        # строки stage(), ещё не подтверждённые и не отброшенные: id -> строка
+        self.staged: Dict = {}
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        name: str,
+        write_rows: Callable[[List[dict]], None],
+        max_batch: int = 500,
+        interval: float = 0.2,
+        spool_dir: Optional[str] = None,
+        fsync: bool = True,
+        committed: Optional[Callable[[List[dict]], List[dict]]] = None,
+    ):
+        self.name = name
+        self.write_rows = write_rows
+        self.max_batch = max_batch
+        self.interval = interval
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+        self.committed = committed
+        self._lock = threading.Lock()
+        # пачка, которая копится сейчас, и ещё не записанные в БД прошлые
+        # (неудачный сброс повторяется на следующем тике)
+        self._current: Optional[_Segment] = None
+        self._sealed: List[_Segment] = []
+        self._counter = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.metrics = {
+            "appended": 0,
+            "written": 0,
+            "batches": 0,
+            "failures": 0,
+            "recovered": 0,
+            "max_batch": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    # ---------------------- spool ----------------------
+    def _open_segment(self) -> _Segment:
+        if not self.spool_dir:
+            return _Segment("", None, [])
+        self._counter += 1
+        path = os.path.join(self.spool_dir, f"{self.name}-{os.getpid()}-{self._counter}.spool")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if fcntl is not None:
+            # пока сегмент открыт, чужой start() не примет его за осиротевший
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return _Segment(path, fd, [])
+
+    @staticmethod
+    def _drop_segment(segment: _Segment) -> None:
+        if segment.fd is None:
+            return
+        try:
+            os.unlink(segment.path)
+        except FileNotFoundError:
+            pass
+        os.close(segment.fd)
+        segment.fd = None
+
+    def _orphans(self) -> List[Tuple[str, int]]:
+        """Сегменты упавших процессов: (путь, fd под нашей блокировкой)."""
+        found = []
+        own = f"{self.name}-{os.getpid()}-"
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, f"{self.name}-*.spool"))):
+            if fcntl is None and os.path.basename(path).startswith(own):
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)  # владелец жив
+                    continue
+            found.append((path, fd))
+        return found
+
+    def recover(self) -> int:
+        """Досылает в БД сегменты упавших процессов; возвращает число строк."""
+        if not self.spool_dir:
+            return 0
+        total = 0
+        for path, fd in self._orphans():
+            rows = []
+            with os.fdopen(os.dup(fd), "rb") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # оборванная последняя строка: процесс упал посреди write
+                        break
+            try:
+                if rows and self.committed is not None:
+                    rows = self.committed(rows)
+                if rows:
+                    self.write_rows(rows)
+            except Exception:
+                logger.exception("[GROUP-COMMIT] %s: не удалось дослать %s", self.name, path)
+                os.close(fd)
+                continue
+            self._drop_segment(_Segment(path, fd, rows))
+            total += len(rows)
+        if total:
+            self.metrics["recovered"] += total
+            logger.info("[GROUP-COMMIT] %s: дослано %s записей из spool", self.name, total)
+        return total
+
+    # ---------------------- запись ----------------------
+    def _segment(self) -> _Segment:
+        if self._current is None:
+            self._current = self._open_segment()
+        return self._current
+
+    def _spool(self, segment: _Segment, rows: List[dict]) -> None:
+        if segment.fd is None or not rows:
+            return
+        data = b"".join(json.dumps(row, separators=(",", ":")).encode() + b"\n" for row in rows)
+        os.write(segment.fd, data)
+        if self.fsync:
+            os.fsync(segment.fd)
+
+    def _add(self, segment: _Segment, rows: List[dict]) -> None:
+        segment.rows.extend(rows)
+        self.metrics["appended"] += len(rows)
+        if len(segment.rows) >= self.max_batch:
+            self._wakeup.set()
+
+    def append(self, row: dict) -> None:
+        with self._lock:
+            segment = self._segment()
+            self._spool(segment, [row])
+            self._add(segment, [row])
+
+    def stage(self, rows: List[dict]) -> None:
+        """Строки транзакции — в spool до её commit; в пачку их добавит confirm()."""
+        with self._lock:
+            segment = self._segment()
+            self._spool(segment, rows)
+            segment.staged.update((row["id"], row) for row in rows)
+
+    def confirm(self, rows: List[dict]) -> None:
+        """После commit: строки из stage() — в пачку."""
+        with self._lock:
+            segment = self._segment()
+            for row in rows:
+                segment.staged.pop(row["id"], None)
+            self._add(segment, rows)
+
+    def discard(self, rows: List[dict]) -> None:
+        """После rollback: строки из stage() в пачку не попадут."""
+        with self._lock:
+            if self._current is not None:
+                for row in rows:
+                    self._current.staged.pop(row["id"], None)
+
+    def _seal(self) -> None:
+        # неподтверждённые строки переезжают в новый сегмент: старый файл
+        # удалится после записи пачки, а их транзакции ещё могут закоммититься
+        segment = self._current
+        self._sealed.append(segment)
+        self._current = None
+        if segment.staged:
+            current = self._segment()
+            self._spool(current, list(segment.staged.values()))
+            current.staged, segment.staged = segment.staged, {}
+
+    def flush(self) -> int:
+        """Сбрасывает накопленное в БД (из потока writer'а или при остановке)."""
+        with self._lock:
+            if self._current is not None and self._current.rows:
+                self._seal()
+            pending = self._sealed
+            self._sealed = []
+        written = 0
+        for index, segment in enumerate(pending):
+            started = time.perf_counter()
+            try:
+                self.write_rows(segment.rows)
+            except Exception:
+                self.metrics["failures"] += 1
+                logger.exception("[GROUP-COMMIT] %s: ошибка записи пачки", self.name)
+                with self._lock:
+                    self._sealed[:0] = pending[index:]
+                break
+            elapsed = (time.perf_counter() - started) * 1000
+            self._drop_segment(segment)
+            written += len(segment.rows)
+            metrics = self.metrics
+            metrics["written"] += len(segment.rows)
+            metrics["batches"] += 1
+            metrics["max_batch"] = max(metrics["max_batch"], len(segment.rows))
+            metrics["last_flush_ms"] = elapsed
+            metrics["max_flush_ms"] = max(metrics["max_flush_ms"], elapsed)
+            metrics["total_flush_ms"] += elapsed
+        return written
+
+    # ---------------------- поток ----------------------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            try:
+                self.recover()
+            except Exception:
+                logger.exception("[GROUP-COMMIT] %s: ошибка восстановления spool", self.name)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"group-commit-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # остаток — сразу; что не записалось, останется в spool до следующего старта
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("[GROUP-COMMIT] %s: ошибка сброса", self.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(segment.rows) for segment in self._sealed)
+            if self._current is not None:
+                pending += len(self._current.rows)
+            segments = len(self._sealed) + int(self._current is not None and self._current.fd is not None)
+        metrics = dict(self.metrics)
+        batches = metrics.pop("batches")
+        total_ms = metrics.pop("total_flush_ms")
+        return {
+            "name": self.name,
+            "pending": pending,
+            "spool_segments": segments,
+            "batches": batches,
+            "avg_batch": round(metrics["written"] / batches, 1) if batches else 0.0,
+            "avg_flush_ms": round(total_ms / batches, 2) if batches else 0.0,
+            **metrics,
+            "last_flush_ms": round(metrics["last_flush_ms"], 2),
+            "max_flush_ms": round(metrics["max_flush_ms"], 2),
+        }
@@ -0,0 +1,226 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key для неидемпотентных POST (регистрация, создание события,
+join/leave).
+
+Клиент, повторяющий запрос после таймаута, присылает тот же заголовок
+Idempotency-Key — IdempotencyMiddleware отвечает сохранённым ответом, не
+доходя до роутов и сервисов (ни bcrypt, ни SMTP, ни повторной вставки).
+Хранится отпечаток запроса (sha256 метода, пути, query и тела) и сам
+ответ; тот же ключ с другим телом — 422, с ещё выполняющимся запросом — 409.
+Ответы 5xx не сохраняются: повтор выполнится заново.
+
+Хранилище — MemoryIdempotencyStore (в памяти воркера) или общее для всех
+воркеров с тем же интерфейсом (см. idempotency_service).
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyRecord:
+    """Запись хранилища: status_code None — запрос ещё выполняется."""
+
+    __slots__ = ("fingerprint", "status_code", "content_type", "body", "expires_at")
+
+    def __init__(
+        self,
+        fingerprint: str,
+        expires_at: float,
+        status_code: Optional[int] = None,
+        content_type: Optional[str] = None,
+        body: bytes = b"",
+    ):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.status_code = status_code
+        self.content_type = content_type
+        self.body = body
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+class MemoryIdempotencyStore:
+    """
+    Ключи в памяти воркера: ответ хранится ttl секунд, незавершённый
+    запрос держит ключ не дольше lease (воркер мог упасть). При maxsize
+    вытесняются самые старые записи.
+    """
+
+    def __init__(self, ttl: float, lease: float, maxsize: int = 100_000):
+        self.ttl = ttl
+        self.lease = lease
+        self.maxsize = maxsize
+        self._records: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # записи упорядочены по вставке/завершению — просроченные в начале
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at > now and len(self._records) < self.maxsize:
+                return
+            del self._records[key]
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        """Занимает ключ под новый запрос (None) или возвращает существующую запись."""
+        now = time.monotonic()
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record.expires_at > now:
+                return record
+            self._records.pop(key, None)
+            self._evict(now)
+            self._records[key] = IdempotencyRecord(fingerprint, now + self.lease)
+            return None
+
+    async def complete(self, key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        with self._lock:
+            record = self._records.pop(key, None)
+            if record is None:
+                return
+            record.status_code = status_code
+            record.content_type = content_type
+            record.body = body
+            record.expires_at = time.monotonic() + self.ttl
+            self._records[key] = record
+
+    async def release(self, key: str) -> None:
+        with self._lock:
+            self._records.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._records), "maxsize": self.maxsize}
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(len(part).to_bytes(4, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Чистое ASGI-middleware (без BaseHTTPMiddleware): тело запроса читается
+    один раз, отдаётся приложению как есть, ответ пересылается клиенту
+    потоком и параллельно копится для сохранения.
+    """
+
+    def __init__(self, app, store, routes: Sequence[Tuple[str, str]]):
+        self.app = app
+        self.store = store
+        # (метод, регулярное выражение пути)
+        self.routes: List[Tuple[str, Pattern]] = [(method, re.compile(path)) for method, path in routes]
+
+    def _matches(self, scope) -> bool:
+        method, path = scope["method"], scope["path"]
+        return any(method == m and pattern.fullmatch(path) for m, pattern in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._matches(scope):
+            await self.app(scope, receive, send)
+            return
+        raw_key = _header(scope, IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Некорректный Idempotency-Key"})
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        method, path = scope["method"].encode(), scope["path"].encode()
+        fingerprint = _digest(method, path, scope.get("query_string", b""), body)
+        # ключ действует в пределах пользователя (токена) и маршрута
+        key = _digest(_header(scope, b"authorization") or b"", method, path, raw_key)
+
+        record = await self.store.claim(key, fingerprint)
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                await _send_json(send, 422, {"detail": "Idempotency-Key уже использован с другим запросом"})
+            elif not record.completed:
+                await _send_json(send, 409, {"detail": "Запрос с этим Idempotency-Key ещё выполняется"})
+            else:
+                await _replay(send, record)
+            return
+
+        replayed_body = False
+
+        async def replay_receive():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response: Dict[str, object] = {"status": None, "content_type": None, "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        status_code = response["status"]
+        if status_code is None or status_code >= 500:
+            await self.store.release(key)
+            return
+        await self.store.complete(key, status_code, response["content_type"], b"".join(response["body"]))
+
+
+async def _send_json(send, status_code: int, payload: dict) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, record: IdempotencyRecord) -> None:
+    headers = [(b"content-length", str(len(record.body)).encode()), (REPLAYED_HEADER, b"true")]
+    if record.content_type:
+        headers.append((b"content-type", record.content_type.encode("latin-1")))
+    await send({"type": "http.response.start", "status": record.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": record.body})
@@ -0,0 +1,135 @@
+# app/core/recommendations.py
+import bisect
+import heapq
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+# (event_id, city, category, participants_count)
+CandidateRow = Tuple[UUID, str, str, int]
+
+CITY_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+POPULARITY_WEIGHT = 1.0
+
+
+class RecommendationIndex:
+    """
+    Предрасчитанные признаки для рекомендаций: актуальные события,
+    отсортированные по популярности глобально, по городам и по категориям.
+    Запрос — выборка top-K из нескольких коротких списков, а не обход
+    каталога. Обновляется инкрементально из create/update/delete, раз в
+    refresh_interval перестраивается целиком (участники, записи других воркеров).
+    """
+
+    def __init__(self, refresh_interval: float, pool_factor: int = 5):
+        self.refresh_interval = refresh_interval
+        self.pool_factor = pool_factor
+        self._loaded_at: Optional[float] = None
+        # event_id -> (город в нижнем регистре, категория, число участников)
+        self._features: Dict[UUID, Tuple[str, str, int]] = {}
+        self._norm = 1.0
+        self._top: List[UUID] = []
+        self._by_city: Dict[str, List[UUID]] = {}
+        self._by_category: Dict[str, List[UUID]] = {}
+        self._lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval
+
+    def reset(self) -> None:
+        self._loaded_at = None
+
+    def load(self, rows: Iterable[CandidateRow]) -> None:
+        rows = sorted(rows, key=lambda r: r[3], reverse=True)
+        max_count = rows[0][3] if rows else 0
+        features: Dict[UUID, Tuple[str, str, int]] = {}
+        by_city: Dict[str, List[UUID]] = {}
+        by_category: Dict[str, List[UUID]] = {}
+        for event_id, city, category, count in rows:
+            features[event_id] = (city.lower(), category, count)
+            by_city.setdefault(city.lower(), []).append(event_id)
+            by_category.setdefault(category, []).append(event_id)
+        with self._lock:
+            self._features = features
+            self._norm = math.log1p(max_count) or 1.0
+            self._top = [r[0] for r in rows]
+            self._by_city = by_city
+            self._by_category = by_category
+            self._loaded_at = time.monotonic()
+
+    def _popularity(self, event_id: UUID) -> int:
+        # ключ для bisect: списки отсортированы по убыванию числа участников
+        return -self._features[event_id][2]
+
+    def _unlink(self, ids: List[UUID], event_id: UUID) -> None:
+        index = bisect.bisect_left(ids, self._popularity(event_id), key=self._popularity)
+        while ids[index] != event_id:
+            index += 1
+        del ids[index]
+
+    def _discard(self, event_id: UUID) -> None:
+        feature = self._features.get(event_id)
+        if feature is None:
+            return
+        city, category, _ = feature
+        self._unlink(self._top, event_id)
+        for groups, key in ((self._by_city, city), (self._by_category, category)):
+            self._unlink(groups[key], event_id)
+            if not groups[key]:
+                del groups[key]
+        del self._features[event_id]
+
+    def put(self, event_id: UUID, city: str, category: str, count: int) -> None:
+        """Добавляет/обновляет актуальное событие (до первой загрузки — no-op)."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._discard(event_id)
+            self._features[event_id] = (city.lower(), category, count)
+            self._norm = max(self._norm, math.log1p(count))
+            bisect.insort(self._top, event_id, key=self._popularity)
+            bisect.insort(self._by_city.setdefault(city.lower(), []), event_id, key=self._popularity)
+            bisect.insort(self._by_category.setdefault(category, []), event_id, key=self._popularity)
+
+    def remove(self, event_id: UUID) -> None:
+        with self._lock:
+            self._discard(event_id)
+
+    def top(
+        self,
+        limit: int,
+        city: Optional[str] = None,
+        affinity: Optional[Dict[str, int]] = None,
+        exclude: Optional[Set[UUID]] = None,
+    ) -> List[UUID]:
+        """
+        score = город совпал * CITY_WEIGHT + доля категории в истории
+        пользователя * CATEGORY_WEIGHT + нормированная популярность.
+        """
+        affinity = affinity or {}
+        exclude = exclude or set()
+        total = sum(affinity.values()) or 1
+        city_key = city.lower() if city else None
+        pool_size = limit * self.pool_factor + len(exclude)
+        with self._lock:
+            pool = set(self._top[:pool_size])
+            if city_key:
+                pool.update(self._by_city.get(city_key, [])[:pool_size])
+            for category, _ in heapq.nlargest(3, affinity.items(), key=lambda kv: kv[1]):
+                pool.update(self._by_category.get(category, [])[:pool_size])
+            features = {event_id: self._features[event_id] for event_id in pool}
+            norm = self._norm
+
+        def score(event_id: UUID) -> float:
+            ev_city, category, count = features[event_id]
+            return (
+                CITY_WEIGHT * (ev_city == city_key)
+                + CATEGORY_WEIGHT * affinity.get(category, 0) / total
+                + POPULARITY_WEIGHT * math.log1p(count) / norm
+            )
+
+        return heapq.nlargest(limit, (eid for eid in pool if eid not in exclude), key=score)
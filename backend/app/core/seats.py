@@ -0,0 +1,71 @@
+# app/core/seats.py
+"""
+Пул мест горячих событий, заранее зарезервированных воркером.
+
+Вместо проверки и обновления строки события на каждую запись воркер
+забирает партию мест одним условным UPDATE (events.seats_reserved, см.
+event_repo.reserve_seats) и дальше раздаёт их из памяти. Сумма
+participants_count + seats_reserved никогда не превышает
+max_participants, поэтому лимит соблюдается при любом числе воркеров;
+места, оставшиеся в пуле, возвращаются в БД при остановке воркера.
+
+Неизрасходованные места пула записаны в аренду воркера (event_seat_leases,
+ключ — owner) со сроком: если воркер упал, не вернув их, аренда истекает
+и места снимаются с seats_reserved (event_repo.reclaim_expired_leases).
+"""
+import os
+import socket
+import threading
+import uuid
+from typing import Dict, Optional
+from uuid import UUID
+
+
+class SeatPool:
+    def __init__(self, batch: int):
+        self.batch = batch
+        # владелец аренд в БД: уникален для процесса даже при повторе pid
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._seats: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+        self.reservations = 0
+
+    def take(self, event_id: UUID) -> bool:
+        """Одно место из пула; False — пул события пуст, нужна новая партия."""
+        with self._lock:
+            left = self._seats.get(event_id, 0)
+            if left <= 0:
+                return False
+            self._seats[event_id] = left - 1
+            return True
+
+    def put(self, event_id: UUID, count: int = 1) -> None:
+        """Места обратно в пул: остаток партии или освобождённые выходом участника."""
+        if count <= 0:
+            return
+        with self._lock:
+            self._seats[event_id] = self._seats.get(event_id, 0) + count
+
+    def reserved(self, event_id: UUID, granted: int) -> None:
+        """Учёт новой партии: одно место сразу уходит вызывающему."""
+        with self._lock:
+            self.reservations += 1
+        self.put(event_id, granted - 1)
+
+    def drain(self, event_id: Optional[UUID] = None) -> Dict[UUID, int]:
+        """Забирает места из пула (одного события или всех) для возврата в БД."""
+        with self._lock:
+            if event_id is not None:
+                left = self._seats.pop(event_id, 0)
+                return {event_id: left} if left else {}
+            drained = {key: left for key, left in self._seats.items() if left}
+            self._seats.clear()
+            return drained
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": len(self._seats),
+                "seats": sum(self._seats.values()),
+                "reservations": self.reservations,
+            }
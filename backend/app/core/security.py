@@ -1,21 +1,37 @@
 # app/core/security.py
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Union
 
 import jwt
-try:
-    import bcrypt  # type: ignore
-    # passlib expects bcrypt.__about__.__version__, а в некоторых сборках его нет
-    if hasattr(bcrypt, "__version__") and not hasattr(bcrypt, "__about__"):
-        bcrypt.__about__ = type("about", (), {"__version__": bcrypt.__version__})()
-except Exception:
-    bcrypt = None  # fallback; passlib будет сам ругаться, если backend не найден
-from passlib.context import CryptContext
 
 from app.config import settings
 
-# Используем bcrypt_sha256, чтобы убрать жёсткий лимит 72 байта на пароль
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+
+@lru_cache(maxsize=1)
+def _pwd_context():
+    """
+    passlib и bcrypt тяжёлые при импорте, поэтому грузим их при первом
+    хэшировании/проверке пароля, а не на старте воркера.
+    """
+    try:
+        import bcrypt  # type: ignore
+        # passlib expects bcrypt.__about__.__version__, а в некоторых сборках его нет
+        if hasattr(bcrypt, "__version__") and not hasattr(bcrypt, "__about__"):
+            bcrypt.__about__ = type("about", (), {"__version__": bcrypt.__version__})()
+    except Exception:
+        pass  # fallback; passlib будет сам ругаться, если backend не найден
+    from passlib.context import CryptContext
+
+    # Используем bcrypt_sha256, чтобы убрать жёсткий лимит 72 байта на пароль
+    return CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+
+
+@lru_cache(maxsize=1)
+def _jwt_key():
+    """Подготовленный ключ JWT: разбираем секрет один раз, а не на каждый токен."""
+    algorithm = jwt.get_algorithm_by_name(settings.JWT_ALGORITHM)
+    return algorithm.prepare_key(settings.JWT_SECRET_KEY)
 
 
 def _prepare_password(password: Union[str, bytes]) -> str:
@@ -28,11 +44,11 @@ def _prepare_password(password: Union[str, bytes]) -> str:
 
 
 def hash_password(password: Union[str, bytes]) -> str:
-    return pwd_context.hash(_prepare_password(password))
+    return _pwd_context().hash(_prepare_password(password))
 
 
 def verify_password(plain_password: Union[str, bytes], hashed_password: str) -> bool:
-    return pwd_context.verify(_prepare_password(plain_password), hashed_password)
+    return _pwd_context().verify(_prepare_password(plain_password), hashed_password)
 
 
 def create_access_token(user_id: str, role: str) -> str:
@@ -42,7 +58,7 @@ def create_access_token(user_id: str, role: str) -> str:
         "role": role,
         "exp": expire,
     }
-    token = jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    token = jwt.encode(payload, _jwt_key(), algorithm=settings.JWT_ALGORITHM)
     return token
 
 
@@ -50,9 +66,14 @@ def decode_access_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(
             token,
-            settings.JWT_SECRET_KEY,
+            _jwt_key(),
             algorithms=[settings.JWT_ALGORITHM],
         )
         return payload
     except jwt.PyJWTError:
         return None
+
+
+def warm_up_jwt() -> None:
+    """Прогреваем ключ и кодек JWT, чтобы первый запрос не платил за инициализацию."""
+    decode_access_token(create_access_token("warmup", "USER"))
@@ -0,0 +1,136 @@
+# app/core/templates.py
+"""
+Минимальный шаблонизатор для писем.
+
+Синтаксис:
+    {{ name }}    — подстановка с HTML-экранированием
+    {{{ name }}}  — подстановка как есть (заранее отрендеренный фрагмент)
+    {{> name }}   — вставка партиала _name.html на этапе компиляции
+
+Шаблон компилируется один раз: партиалы раскрываются, соседние статические
+куски склеиваются и кодируются в UTF-8, так что рендер — это один
+b"".join статических bytes и закодированных значений слотов.
+Первая строка вида "Subject: ..." (с теми же слотами) задаёт тему письма.
+"""
+import html
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+_TOKEN_RE = re.compile(r"\{\{\{\s*(\w+)\s*\}\}\}|\{\{>\s*(\w+)\s*\}\}|\{\{\s*(\w+)\s*\}\}")
+
+# bytes — статический кусок, (имя, экранировать?) — слот
+Part = Union[bytes, Tuple[str, bool]]
+
+
+def _expand(source: str, partials: Dict[str, str], depth: int = 0) -> str:
+    if depth > 5:
+        raise ValueError("Слишком глубокая вложенность партиалов")
+
+    def include(match: re.Match) -> str:
+        name = match.group(2)
+        if name is None:
+            return match.group(0)
+        if name not in partials:
+            raise ValueError(f"Партиал не найден: {name}")
+        return _expand(partials[name], partials, depth + 1)
+
+    return _TOKEN_RE.sub(include, source)
+
+
+def _compile_parts(source: str) -> Tuple[Part, ...]:
+    parts: List[Part] = []
+    static: List[str] = []
+    position = 0
+    for match in _TOKEN_RE.finditer(source):
+        static.append(source[position:match.start()])
+        position = match.end()
+        raw_name, _, name = match.groups()
+        if static:
+            parts.append("".join(static).encode("utf-8"))
+            static = []
+        parts.append((raw_name, False) if raw_name else (name, True))
+    static.append(source[position:])
+    if "".join(static):
+        parts.append("".join(static).encode("utf-8"))
+    return tuple(p for p in parts if p != b"")
+
+
+def _render_parts(parts: Tuple[Part, ...], values: dict) -> bytes:
+    out = []
+    for part in parts:
+        if part.__class__ is bytes:
+            out.append(part)
+            continue
+        name, escape = part
+        try:
+            value = values[name]
+        except KeyError:
+            raise KeyError(f"Не передан слот шаблона: {name}") from None
+        value = "" if value is None else str(value)
+        out.append((html.escape(value) if escape else value).encode("utf-8"))
+    return b"".join(out)
+
+
+class Template:
+    __slots__ = ("name", "_subject", "_parts", "slots")
+
+    def __init__(self, name: str, source: str, partials: Dict[str, str]):
+        self.name = name
+        subject = None
+        if source.startswith("Subject:"):
+            first_line, _, source = source.partition("\n")
+            subject = first_line[len("Subject:"):].strip()
+            source = source.lstrip("\n")
+        self._subject = _compile_parts(subject) if subject is not None else None
+        self._parts = _compile_parts(_expand(source, partials))
+        self.slots = frozenset(p[0] for p in self._parts if p.__class__ is not bytes)
+
+    def subject(self, **values) -> Optional[str]:
+        if self._subject is None:
+            return None
+        # тема — заголовок письма, не HTML: экранирование отменяем
+        return html.unescape(_render_parts(self._subject, values).decode("utf-8"))
+
+    def render(self, **values) -> bytes:
+        return _render_parts(self._parts, values)
+
+
+class TemplateRegistry:
+    """Шаблоны каталога directory; компилируются один раз при первом обращении (или в load())."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._templates: Optional[Dict[str, Template]] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        files = sorted(self.directory.glob("*.html"))
+        partials = {
+            path.stem[1:]: path.read_text(encoding="utf-8")
+            for path in files
+            if path.stem.startswith("_")
+        }
+        templates = {
+            path.stem: Template(path.stem, path.read_text(encoding="utf-8"), partials)
+            for path in files
+            if not path.stem.startswith("_")
+        }
+        with self._lock:
+            self._templates = templates
+
+    def get(self, name: str) -> Template:
+        if self._templates is None:
+            self.load()
+        return self._templates[name]
+
+    def __len__(self) -> int:
+        if self._templates is None:
+            self.load()
+        return len(self._templates)
+
+
+email_templates = TemplateRegistry(TEMPLATES_DIR / "email")
@@ -0,0 +1,40 @@
+# app/core/timer_wheel.py
+"""
+Хешированное колесо таймеров для периодических проверок соединений.
+
+schedule() кладёт элемент в слот через нужное число тиков — O(1);
+advance() на каждом тике разбирает только текущий слот, а не перебирает
+все соединения. Задержки длиннее оборота колеса хранятся с числом
+оставшихся оборотов. Не потокобезопасно: вызывается из event loop.
+"""
+import math
+from typing import Any, List
+
+
+class TimerWheel:
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self._slots: List[List[list]] = [[] for _ in range(slots)]
+        self._cursor = 0
+        self.size = 0
+
+    def schedule(self, item: Any, delay: float) -> None:
+        ticks = max(1, math.ceil(delay / self.tick))
+        slots = len(self._slots)
+        # [оставшиеся обороты, элемент]
+        self._slots[(self._cursor + ticks) % slots].append([(ticks - 1) // slots, item])
+        self.size += 1
+
+    def advance(self) -> List[Any]:
+        """Сдвиг на один тик; возвращает элементы, чей срок наступил."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        due, waiting = [], []
+        for entry in self._slots[self._cursor]:
+            if entry[0]:
+                entry[0] -= 1
+                waiting.append(entry)
+            else:
+                due.append(entry[1])
+        self._slots[self._cursor] = waiting
+        self.size -= len(due)
+        return due
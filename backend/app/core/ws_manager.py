@@ -1,38 +1,490 @@
 import asyncio
-from typing import List, Optional
+import itertools
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple, Union
+from uuid import UUID
 from fastapi import WebSocket
 
+from app.config import settings
+from app.core import ws_codec
+from app.core.security import decode_access_token
+from app.core.timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# Коды закрытия: лимит соединений, неверный токен, нет ответа на ping,
+# клиент не успевает читать (переполнен буфер отправки)
+CLOSE_TRY_LATER = 1013
+CLOSE_POLICY = 1008
+CLOSE_IDLE = 4408
+CLOSE_SLOW = 4413
+
+# Тик колеса таймеров (сек) и число слотов
+WHEEL_TICK = 1.0
+WHEEL_SLOTS = 64
+
+_PING = json.dumps({"type": "ping"})
+
+
+class ReplayBuffer:
+    """
+    Последние рассылки (seq, текст с seq, исходное сообщение) для догоняющих
+    клиентов. seq идут подряд, поэтому сообщения после since находятся
+    срезом по смещению.
+    """
+
+    def __init__(self, size: int):
+        self._items: Deque[Tuple[int, str, str]] = deque(maxlen=size)
+        self.seq = 0
+
+    def append(self, text: str, message: str) -> int:
+        """Сообщение со следующим seq (текст уже содержит его, см. WSManager)."""
+        self.seq += 1
+        self._items.append((self.seq, text, message))
+        return self.seq
+
+    def since(self, seq: int) -> Optional[List[Tuple[int, str, str]]]:
+        """Сообщения после seq; None — часть их уже вытеснена из буфера."""
+        if seq >= self.seq:
+            return []
+        if not self._items or seq < self._items[0][0] - 1:
+            return None
+        start = seq - self._items[0][0] + 1
+        return list(itertools.islice(self._items, start, None))
+
+
+class WSConnection:
+    """
+    Соединение /ws/events: исходящие сообщения идут через очередь и
+    отдельную задачу-писателя, так что медленный клиент не тормозит
+    рассылку остальным, а buffered показывает, сколько байт он не забрал.
+    binary — клиент выбрал подпротокол events.bin.v1: рассылки приходят
+    пачками в бинарных кадрах, служебные сообщения — текстом, как обычно.
+    """
+
+    __slots__ = ("websocket", "ip", "user_id", "binary", "queue", "buffered", "last_seen", "writer", "closed")
+
+    def __init__(self, websocket: WebSocket, ip: str, user_id: Optional[UUID], binary: bool = False):
+        self.websocket = websocket
+        self.ip = ip
+        self.user_id = user_id
+        self.binary = binary
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.buffered = 0
+        self.last_seen = time.monotonic()
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+
+class SSEConnection:
+    """
+    Подписчик /auth/events/stream на одно событие: deque готовых кадров и
+    future, которого ждёт генератор ответа. Писателем служит сам генератор —
+    ни задачи-писателя, ни цикла приёма, ни asyncio.Queue и таймера на
+    соединение, как у WSConnection; keep-alive общий, из heartbeat.
+    """
+
+    __slots__ = ("event_id", "frames", "waiter", "buffered", "closed")
+
+    def __init__(self, event_id: str):
+        self.event_id = event_id
+        self.frames: Deque[Optional[bytes]] = deque()
+        self.waiter: Optional[asyncio.Future] = None
+        self.buffered = 0
+        self.closed = False
+
+    def put(self, frame: Optional[bytes]) -> None:
+        self.frames.append(frame)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+def _event_of(message: str) -> Optional[str]:
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    return str(data.get("event_id")) if isinstance(data, dict) else None
+
 
 class WSManager:
     def __init__(self):
-        self.active: List[WebSocket] = []
+        self.active: Dict[WebSocket, WSConnection] = {}
+        self.by_ip: Dict[str, int] = {}
+        self.binary = 0
+        # подписчики SSE по event_id: рассылка уходит только подписчикам события
+        self.sse: Dict[str, Set[SSEConnection]] = {}
+        self.sse_count = 0
+        self._sse_keepalive = time.monotonic()
         self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # seq уникальны в пределах процесса: после рестарта или при
+        # переподключении к другому воркеру поток другой — нужен resync
+        self.stream = secrets.token_hex(8)
+        self.replay = ReplayBuffer(settings.WS_REPLAY_BUFFER)
+        # ping и проверка простоя каждого соединения раз в WS_PING_INTERVAL
+        self.wheel = TimerWheel(WHEEL_TICK, WHEEL_SLOTS)
+        self._heartbeat: Optional[asyncio.Task] = None
+        # записи бинарной пачки, ещё не отправленные, и seq первой из них
+        self._batch: List[bytes] = []
+        self._batch_seq = 0
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self.counters = {
+            "pings": 0,
+            "reaped_idle": 0,
+            "dropped_slow": 0,
+            "rejected_worker": 0,
+            "rejected_ip": 0,
+            "rejected_token": 0,
+            "binary_frames": 0,
+            "binary_bytes": 0,
+            "rejected_sse": 0,
+        }
 
     def set_loop(self, loop: asyncio.AbstractEventLoop):
         self.loop = loop
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active.append(websocket)
+    def start(self) -> None:
+        """Задача heartbeat в event loop воркера; вызывается из lifespan."""
+        if self._heartbeat is not None and not self._heartbeat.done():
+            return
+        self._heartbeat = asyncio.get_running_loop().create_task(self._run(), name="ws-heartbeat")
+
+    async def stop(self) -> None:
+        if self._heartbeat is None:
+            return
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat = None
+
+    def _control(self, kind: str) -> str:
+        return json.dumps({"type": kind, "stream": self.stream, "seq": self.replay.seq})
+
+    def _admit(self, ip: str, token: Optional[str]) -> Tuple[Optional[int], Optional[UUID]]:
+        """(код отказа или None, user_id из токена)."""
+        if len(self.active) >= settings.WS_MAX_CONNECTIONS:
+            self.counters["rejected_worker"] += 1
+            return CLOSE_TRY_LATER, None
+        if self.by_ip.get(ip, 0) >= settings.WS_MAX_CONNECTIONS_PER_IP:
+            self.counters["rejected_ip"] += 1
+            return CLOSE_TRY_LATER, None
+        if token is None:
+            return None, None
+        payload = decode_access_token(token)
+        try:
+            return None, UUID(str(payload["sub"]))
+        except (TypeError, KeyError, ValueError):
+            self.counters["rejected_token"] += 1
+            return CLOSE_POLICY, None
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        stream: Optional[str] = None,
+        since: Optional[int] = None,
+        token: Optional[str] = None,
+    ) -> Optional[WSConnection]:
+        """
+        Подключение с проверкой лимитов и токена (None — отказ, сокет закрыт).
+        Если клиент передал (stream, since) — сначала досылаем пропущенные
+        сообщения, иначе hello или resync_required с текущим seq.
+        """
+        ip = websocket.client.host if websocket.client else ""
+        code, user_id = self._admit(ip, token)
+        if code == CLOSE_TRY_LATER:
+            # отказ до accept — дешёвый 403 на рукопожатие
+            await websocket.close(code=code)
+            return None
+        binary = settings.WS_BINARY_ENABLED and ws_codec.SUBPROTOCOL in websocket.scope.get("subprotocols", ())
+        await websocket.accept(subprotocol=ws_codec.SUBPROTOCOL if binary else None)
+        if code is not None:
+            # неверный токен закрываем после accept: браузер увидит код 1008
+            # и переподключится без токена
+            await websocket.close(code=code)
+            return None
+        # дальше без await: очередь заполняется и соединение регистрируется
+        # атомарно относительно broadcast, порядок seq не нарушается
+        conn = WSConnection(websocket, ip, user_id, binary)
+        if binary:
+            # накопленная пачка уже в replay: отправляем её прежним
+            # получателям, чтобы новому не пришли те же seq дважды
+            self._flush()
+        if stream is None or since is None:
+            self._push(conn, self._control("hello"))
+        else:
+            gap = self.replay.since(since) if stream == self.stream else None
+            if gap is None:
+                self._push(conn, self._control("resync_required"))
+            elif binary:
+                for start in range(0, len(gap), ws_codec.MAX_BATCH):
+                    chunk = gap[start:start + ws_codec.MAX_BATCH]
+                    records = [ws_codec.encode_record(message) for _, _, message in chunk]
+                    self._push(conn, ws_codec.encode_batch(self.stream, chunk[0][0], records))
+            else:
+                for _, text, _ in gap:
+                    self._push(conn, text)
+        self.active[websocket] = conn
+        self.by_ip[ip] = self.by_ip.get(ip, 0) + 1
+        self.binary += binary
+        conn.writer = asyncio.get_running_loop().create_task(self._write(conn))
+        self.wheel.schedule(conn, settings.WS_PING_INTERVAL)
+        return conn
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active:
-            self.active.remove(websocket)
+        conn = self.active.pop(websocket, None)
+        if conn is None:
+            return
+        conn.closed = True
+        self.binary -= conn.binary
+        left = self.by_ip.get(conn.ip, 1) - 1
+        if left > 0:
+            self.by_ip[conn.ip] = left
+        else:
+            self.by_ip.pop(conn.ip, None)
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    async def close(self, conn: WSConnection, code: int) -> None:
+        self.disconnect(conn.websocket)
+        try:
+            await conn.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def touch(self, conn: WSConnection) -> None:
+        """Любое сообщение клиента (в том числе pong) — признак жизни."""
+        conn.last_seen = time.monotonic()
+
+    def _push(self, conn: WSConnection, data: Union[str, bytes]) -> None:
+        # один и тот же объект str/bytes кладётся в очереди всех получателей
+        if conn.closed:
+            return
+        if conn.buffered + len(data) > settings.WS_MAX_BUFFERED_BYTES:
+            # клиент не читает — отключаем, после переподключения он догонит по seq
+            self.counters["dropped_slow"] += 1
+            conn.closed = True
+            asyncio.get_running_loop().create_task(self.close(conn, CLOSE_SLOW))
+            return
+        conn.buffered += len(data)
+        conn.queue.put_nowait(data)
+
+    async def _write(self, conn: WSConnection) -> None:
+        try:
+            while True:
+                data = await conn.queue.get()
+                if isinstance(data, bytes):
+                    await conn.websocket.send_bytes(data)
+                else:
+                    await conn.websocket.send_text(data)
+                conn.buffered -= len(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(conn.websocket)
+
+    def _sequenced(self, message: str) -> str:
+        # seq вписываем в начало JSON-объекта строкой, без повторного разбора
+        seq = self.replay.seq + 1
+        prefix = f'{{"seq": {seq}, "stream": "{self.stream}"'
+        body = message.strip()
+        if body.startswith("{") and body[1:].strip() != "}":
+            text = f"{prefix}, {body[1:]}"
+        elif body.startswith("{"):
+            text = prefix + "}"
+        else:
+            text = f'{prefix}, "data": {json.dumps(message)}}}'
+        self.replay.append(text, message)
+        return text
 
     async def broadcast(self, message: str):
-        dead = []
-        for ws in self.active:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect(ws)
+        # текст (и бинарная запись) кодируются один раз на рассылку
+        text = self._sequenced(message)
+        for conn in list(self.active.values()):
+            if not conn.binary:
+                self._push(conn, text)
+        if self.binary:
+            self._enqueue_binary(message)
+        if self.sse:
+            subscribers = self.sse.get(_event_of(message))
+            if subscribers:
+                frame = self._sse_frame(self.replay.seq, text)
+                for conn in list(subscribers):
+                    self._push_sse(conn, frame)
 
-    def broadcast_from_thread(self, message: str):
+    def _enqueue_binary(self, message: str) -> None:
+        if not self._batch:
+            self._batch_seq = self.replay.seq
+        self._batch.append(ws_codec.encode_record(message))
+        if len(self._batch) >= ws_codec.MAX_BATCH:
+            self._flush()
+        elif self._batch_timer is None:
+            loop = asyncio.get_running_loop()
+            if settings.WS_BINARY_BATCH_INTERVAL > 0:
+                self._batch_timer = loop.call_later(settings.WS_BINARY_BATCH_INTERVAL, self._flush)
+            else:
+                self._batch_timer = loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        """Накопленная пачка — один кадр, общий для всех бинарных клиентов."""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        if not self._batch:
+            return
+        frame = ws_codec.encode_batch(self.stream, self._batch_seq, self._batch)
+        self._batch = []
+        self.counters["binary_frames"] += 1
+        self.counters["binary_bytes"] += len(frame)
+        for conn in list(self.active.values()):
+            if conn.binary:
+                self._push(conn, frame)
+
+    def send(self, websocket: WebSocket, message: str):
+        conn = self.active.get(websocket)
+        if conn is not None:
+            self._push(conn, message)
+
+    def send_from_thread(self, websocket: WebSocket, message: str):
+        """Сообщение одному соединению из фонового потока."""
         if not self.loop:
             return
-        asyncio.run_coroutine_threadsafe(self.broadcast(message), self.loop)
+        self.loop.call_soon_threadsafe(self.send, websocket, message)
+
+    # ---------------------- SSE ----------------------
+    def _sse_frame(self, seq: int, text: Optional[str] = None) -> bytes:
+        # id — позиция в потоке; браузер вернёт её в Last-Event-ID при
+        # переподключении. Кадр без data только сдвигает эту позицию
+        frame = f"id: {self.stream}:{seq}\n"
+        if text is not None:
+            frame += f"data: {text}\n"
+        return (frame + "\n").encode()
+
+    def _push_sse(self, conn: SSEConnection, frame: Optional[bytes]) -> None:
+        if conn.closed:
+            return
+        if frame is not None and conn.buffered + len(frame) > settings.WS_MAX_BUFFERED_BYTES:
+            self.counters["dropped_slow"] += 1
+            frame = None
+        if frame is None:
+            # None завершает генератор ответа
+            conn.closed = True
+            conn.put(None)
+            return
+        conn.buffered += len(frame)
+        conn.put(frame)
+
+    def sse_subscribe(self, event_id: str, last_event_id: Optional[str] = None) -> Optional[SSEConnection]:
+        """
+        Подписка на обновления события (None — лимит соединений воркера).
+        Last-Event-ID вида "<stream>:<seq>" — досылаем пропущенное по этому
+        событию из replay, иначе hello или resync_required.
+        """
+        if self.sse_count >= settings.SSE_MAX_CONNECTIONS:
+            self.counters["rejected_sse"] += 1
+            return None
+        conn = SSEConnection(event_id)
+        if not last_event_id:
+            self._push_sse(conn, self._sse_frame(self.replay.seq, self._control("hello")))
+        else:
+            stream, _, since = last_event_id.partition(":")
+            gap = self.replay.since(int(since)) if stream == self.stream and since.isdigit() else None
+            if gap is None:
+                self._push_sse(conn, self._sse_frame(self.replay.seq, self._control("resync_required")))
+            else:
+                for seq, text, message in gap:
+                    if _event_of(message) == event_id:
+                        self._push_sse(conn, self._sse_frame(seq, text))
+        self.sse.setdefault(event_id, set()).add(conn)
+        self.sse_count += 1
+        return conn
+
+    def sse_unsubscribe(self, conn: SSEConnection) -> None:
+        subscribers = self.sse.get(conn.event_id)
+        if subscribers is None or conn not in subscribers:
+            return
+        conn.closed = True
+        subscribers.discard(conn)
+        if not subscribers:
+            del self.sse[conn.event_id]
+        self.sse_count -= 1
+
+    async def sse_frames(self, conn: SSEConnection) -> AsyncIterator[bytes]:
+        """Тело ответа text/event-stream; при обрыве клиента генератор отменяется."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                if not conn.frames:
+                    conn.waiter = asyncio.get_running_loop().create_future()
+                    await conn.waiter
+                    conn.waiter = None
+                    continue
+                frame = conn.frames.popleft()
+                if frame is None:
+                    return
+                conn.buffered -= len(frame)
+                yield frame
+        finally:
+            self.sse_unsubscribe(conn)
+
+    def _sse_beat(self) -> None:
+        # подписчикам с пустой очередью всё до replay.seq уже отдано: кадр
+        # без data сдвигает их Last-Event-ID и держит соединение живым
+        frame = self._sse_frame(self.replay.seq)
+        for subscribers in list(self.sse.values()):
+            for conn in subscribers:
+                if not conn.frames:
+                    self._push_sse(conn, frame)
+
+    async def _beat(self) -> None:
+        now = time.monotonic()
+        if now - self._sse_keepalive >= settings.WS_PING_INTERVAL:
+            self._sse_keepalive = now
+            self._sse_beat()
+        for conn in self.wheel.advance():
+            if conn.closed:
+                continue
+            if now - conn.last_seen > settings.WS_IDLE_TIMEOUT:
+                self.counters["reaped_idle"] += 1
+                await self.close(conn, CLOSE_IDLE)
+                continue
+            self.counters["pings"] += 1
+            self._push(conn, _PING)
+            self.wheel.schedule(conn, settings.WS_PING_INTERVAL)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            try:
+                await self._beat()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[WS] ошибка heartbeat")
+
+    def stats(self) -> dict:
+        """Мгновенные значения для /auth/admin/ws."""
+        buffered = [conn.buffered for conn in self.active.values()]
+        top_ips = sorted(self.by_ip.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "connections": len(self.active),
+            "authenticated": sum(1 for conn in self.active.values() if conn.user_id is not None),
+            "binary": self.binary,
+            "sse": self.sse_count,
+            "sse_events": len(self.sse),
+            "ips": len(self.by_ip),
+            "top_ips": dict(top_ips),
+            "buffered_bytes": sum(buffered),
+            "max_buffered_bytes": max(buffered, default=0),
+            "replay_seq": self.replay.seq,
+            "timers": self.wheel.size,
+            **self.counters,
+        }
 
 
 ws_manager = WSManager()
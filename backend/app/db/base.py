@@ -1,6 +1,12 @@
 # app/db/base.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.engine import URL
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from app.config import settings
 
@@ -10,11 +16,53 @@ engine = create_engine(
 )
 
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: после commit объекты не перечитываются из БД —
+# все значения по умолчанию вычисляются в Python и уже есть после flush.
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+)
 
 Base = declarative_base()
 
 
+@contextmanager
+def transaction(db: Session):
+    """
+    Единица работы: транзакцией владеет сервис, репозитории внутри
+    только делают flush. Commit — один раз на выходе, rollback — при ошибке.
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+_statement_counter: ContextVar[Optional[list]] = ContextVar("statement_counter", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statement_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@contextmanager
+def count_statements():
+    """Считает SQL-запросы внутри блока: `with count_statements() as c: ...; c[0]`."""
+    counter = [0]
+    token = _statement_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _statement_counter.reset(token)
+
+
 # dependency для FastAPI
 def get_db():
     db = SessionLocal()
@@ -22,3 +70,69 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _async_url(url: str) -> URL:
+    """Тот же DATABASE_URL, но с async-драйвером (aiosqlite / asyncpg)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        query = dict(url.query)
+        # asyncpg не понимает sslmode из libpq-строки
+        sslmode = query.pop("sslmode", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url
+
+
+@lru_cache(maxsize=1)
+def async_engine():
+    """
+    Async-движок для read-пути событий. Создаётся при первом обращении:
+    драйвер (aiosqlite/asyncpg) импортируется только если async-путь используется.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine_ = create_async_engine(
+        _async_url(str(settings.DATABASE_URL)),
+        echo=False,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        pool_timeout=settings.DB_ASYNC_POOL_TIMEOUT,
+    )
+    event.listen(engine_.sync_engine, "before_cursor_execute", _count_statement)
+    return engine_
+
+
+@lru_cache(maxsize=1)
+def async_session_factory():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(async_engine(), autoflush=False, expire_on_commit=False)
+
+
+# async-dependency для FastAPI
+async def get_async_db():
+    async with async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if async_engine.cache_info().currsize:
+        await async_engine().dispose()
+
+
+def warm_up_pool(size: int) -> None:
+    """Заранее открываем соединения пула, чтобы первые запросы не ждали коннекта к БД."""
+    connections = []
+    try:
+        for _ in range(max(size, 0)):
+            conn = engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,402 @@
+# app/db/migrations.py
+"""
+Версионированные миграции схемы (без Alembic).
+
+Применённая версия хранится в таблице schema_version. Запуск вручную
+(например, в release-шаге деплоя):
+
+    python -m app.db.migrations
+
+Таблицы в миграциях описаны здесь же, а не берутся из app.db.models:
+модели меняются, а уже выпущенная миграция должна создавать ровно ту
+схему, что и в момент выпуска. Одновременно стартующие воркеры
+(AUTO_MIGRATE) мигрируют по очереди — см. _migration_lock.
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    inspect,
+    text,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.base import engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: без файловой блокировки
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет (старые базы создавались через create_all)."""
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# ключ pg_advisory_lock миграций (любая константа, общая для всех воркеров)
+MIGRATION_LOCK_ID = 0x61666973
+
+
+def _initial(conn: Connection) -> None:
+    """Схема на момент введения миграций (раньше её создавал create_all)."""
+    meta = MetaData()
+    Table(
+        "users",
+        meta,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("full_name", String(255), nullable=False),
+        Column("email", String(255), unique=True, nullable=False, index=True),
+        Column("password_hash", String(255), nullable=False),
+        Column("role", String(50), nullable=False),
+        Column("is_active", Boolean),
+        Column("avatar_url", String(500), nullable=True),
+        Column("about", String(1000), nullable=True),
+        Column("is_deleted", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Column("updated_at", DateTime, nullable=False),
+    )
+    Table(
+        "events",
+        meta,
+        Column("id", UUID(as_uuid=True), primary_key=True),
+        Column("title", String(255), nullable=False),
+        Column("short_description", String(500), nullable=True),
+        Column("description", String(2000), nullable=False),
+        Column("start_date", DateTime, nullable=False),
+        Column("end_date", DateTime, nullable=False),
+        Column("image_url", String(500), nullable=False),
+        Column("payment_info", String(1000), nullable=True),
+        Column("max_participants", Integer, nullable=True),
+        Column("city", String(255), nullable=False),
+        Column("status", String(50), nullable=False),
+        Column("is_deleted", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Column("updated_at", DateTime, nullable=False),
+    )
+    Table(
+        "event_participants",
+        meta,
+        Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True),
+        Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True),
+    )
+    Table(
+        "event_participant_logs",
+        meta,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), nullable=False),
+        Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+        Column("action", String(10), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+    )
+    Table(
+        "email_verification_codes",
+        meta,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+        Column("code", String(10), nullable=False),
+        Column("expires_at", DateTime, nullable=False),
+        Column("is_used", Boolean, nullable=False),
+    )
+    Table(
+        "password_reset_tokens",
+        meta,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), nullable=False),
+        Column("token", String(255), nullable=False, unique=True),
+        Column("expires_at", DateTime, nullable=False),
+        Column("is_used", Boolean, nullable=False),
+    )
+    # базы, созданные до миграций, уже содержат эти таблицы
+    meta.create_all(bind=conn, checkfirst=True)
+
+
+def _participants_user_index(conn: Connection) -> None:
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_event_participants_user_id ON event_participants (user_id)")
+    )
+
+
+def _event_category(conn: Connection) -> None:
+    _add_column(conn, "events", "category", "VARCHAR(100) NOT NULL DEFAULT 'прочее'")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_category ON events (category)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_city ON events (city)"))
+
+
+def _event_search(conn: Connection) -> None:
+    # PostgreSQL: генерируемый tsvector + GIN; SQLite: FTS5-таблица events_fts
+    # с rowid из первых 8 байт UUID события (см. search_repo._fts_rowid)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(short_description, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), 'C')"
+            ") STORED"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)"
+        ))
+    elif conn.dialect.name == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+            "event_id UNINDEXED, title, short_description, description, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text("DELETE FROM events_fts"))
+        existing = conn.execute(text(
+            "SELECT id, title, short_description, description FROM events WHERE is_deleted = 0"
+        )).mappings().all()
+        rows = []
+        for row in existing:
+            event_id = uuid.UUID(str(row["id"]))
+            rows.append({
+                "rowid": int.from_bytes(event_id.bytes[:8], "big", signed=True),
+                "event_id": event_id.hex,
+                "title": row["title"],
+                "short_description": row["short_description"] or "",
+                "description": row["description"],
+            })
+        if rows:
+            conn.execute(
+                text(
+                    "INSERT INTO events_fts (rowid, event_id, title, short_description, description) "
+                    "VALUES (:rowid, :event_id, :title, :short_description, :description)"
+                ),
+                rows,
+            )
+
+
+def _participants_count(conn: Connection) -> None:
+    _add_column(conn, "events", "participants_count", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(text(
+        "UPDATE events SET participants_count = "
+        "(SELECT count(*) FROM event_participants WHERE event_participants.event_id = events.id)"
+    ))
+
+
+def _event_period_index(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_start_end ON events (start_date, end_date)"))
+    if conn.dialect.name == "postgresql":
+        # пересечение интервалов (&&) по GiST — см. event_repo.list_events_stmt
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_events_period ON events "
+            "USING GIST (tsrange(start_date, end_date, '[]'))"
+        ))
+
+
+def _event_coordinates(conn: Connection) -> None:
+    _add_column(conn, "events", "latitude", "FLOAT")
+    _add_column(conn, "events", "longitude", "FLOAT")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_lat_lon ON events (latitude, longitude)"))
+
+
+def _outbox(conn: Connection) -> None:
+    Table(
+        "outbox",
+        MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("kind", String(20), nullable=False),
+        Column("idempotency_key", String(200), nullable=False, unique=True),
+        Column("payload", Text, nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("attempts", Integer, nullable=False),
+        Column("available_at", DateTime, nullable=False),
+        Column("claim", String(36), nullable=True),
+        Column("last_error", String(500), nullable=True),
+        Column("created_at", DateTime, nullable=False),
+        Column("processed_at", DateTime, nullable=True),
+        Index("ix_outbox_status_available_at", "status", "available_at"),
+    ).create(bind=conn, checkfirst=True)
+
+
+def _event_changes(conn: Connection) -> None:
+    meta = MetaData()
+    Table("events", meta, Column("id", UUID(as_uuid=True), primary_key=True))
+    Table(
+        "event_changes",
+        meta,
+        Column("seq", Integer, primary_key=True, autoincrement=True),
+        Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index("ix_event_changes_created_at", "created_at"),
+    ).create(bind=conn, checkfirst=True)
+    # начальная точка ленты: since=0 отдаёт все существующие события
+    conn.execute(
+        text(
+            "INSERT INTO event_changes (event_id, created_at) "
+            "SELECT id, :now FROM events ORDER BY created_at"
+        ),
+        {"now": datetime.utcnow()},
+    )
+
+
+def _event_high_demand(conn: Connection) -> None:
+    _add_column(conn, "events", "high_demand", "BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+def _counter_shards(conn: Connection) -> None:
+    _add_column(conn, "events", "seats_reserved", "INTEGER NOT NULL DEFAULT 0")
+    meta = MetaData()
+    Table("events", meta, Column("id", UUID(as_uuid=True), primary_key=True))
+    Table(
+        "event_counter_shards",
+        meta,
+        Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True),
+        Column("shard", Integer, primary_key=True),
+        Column("count", Integer, nullable=False),
+        Column("updates", Integer, nullable=False),
+    ).create(bind=conn, checkfirst=True)
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    Table(
+        "idempotency_keys",
+        MetaData(),
+        Column("key", String(64), primary_key=True),
+        Column("fingerprint", String(64), nullable=False),
+        Column("status_code", Integer, nullable=True),
+        Column("content_type", String(100), nullable=True),
+        Column("body", LargeBinary, nullable=True),
+        Column("expires_at", DateTime, nullable=False, index=True),
+    ).create(bind=conn, checkfirst=True)
+
+
+def _participant_log_bigint(conn: Connection) -> None:
+    # в SQLite INTEGER PRIMARY KEY уже 64-битный
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE event_participant_logs ALTER COLUMN id TYPE BIGINT"))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS event_participant_logs_id_seq AS BIGINT"))
+
+
+def _seat_leases(conn: Connection) -> None:
+    meta = MetaData()
+    Table("events", meta, Column("id", UUID(as_uuid=True), primary_key=True))
+    Table(
+        "event_seat_leases",
+        meta,
+        Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True),
+        Column("owner", String(100), primary_key=True),
+        Column("seats", Integer, nullable=False),
+        Column("expires_at", DateTime, nullable=False, index=True),
+    ).create(bind=conn, checkfirst=True)
+
+
+# (версия, описание, функция) — только добавляем в конец, старые не меняем
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial schema", _initial),
+    (2, "event_participants.user_id index", _participants_user_index),
+    (3, "events.category + city/category indexes", _event_category),
+    (4, "full-text search index", _event_search),
+    (5, "events.participants_count", _participants_count),
+    (6, "events (start_date, end_date) indexes", _event_period_index),
+    (7, "events.latitude/longitude", _event_coordinates),
+    (8, "outbox table", _outbox),
+    (9, "event_changes feed", _event_changes),
+    (10, "events.high_demand", _event_high_demand),
+    (11, "event_counter_shards + events.seats_reserved", _counter_shards),
+    (12, "idempotency_keys table", _idempotency_keys),
+    (13, "event_participant_logs.id BIGINT", _participant_log_bigint),
+    (14, "event_seat_leases table", _seat_leases),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (version INTEGER NOT NULL)")
+    )
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        value = conn.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+    except Exception:
+        conn.rollback()
+        return 0
+    return value or 0
+
+
+def is_up_to_date(bind: Engine = engine) -> bool:
+    """Один дешёвый запрос вместо рефлексии всей схемы на каждом старте."""
+    with bind.connect() as conn:
+        return current_version(conn) >= LATEST_VERSION
+
+
+@contextmanager
+def _migration_lock(bind: Engine) -> Iterator[None]:
+    """
+    Мигрирует один процесс, остальные ждут и затем видят актуальную версию.
+    Postgres — advisory lock на отдельном соединении, файловый SQLite —
+    flock на <база>.migrate.lock; для прочих баз блокировки нет.
+    """
+    if bind.dialect.name == "postgresql":
+        with bind.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                conn.commit()
+        return
+    database = bind.url.database
+    if bind.dialect.name == "sqlite" and fcntl is not None and database and database != ":memory:":
+        with open(f"{database}.migrate.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return
+    yield
+
+
+def migrate(bind: Engine = engine) -> int:
+    """Применяет недостающие миграции, каждую в своей транзакции. Возвращает итоговую версию."""
+    with _migration_lock(bind):
+        # версию читаем под блокировкой: другой воркер мог уже всё применить
+        with bind.begin() as conn:
+            _ensure_version_table(conn)
+            version = current_version(conn)
+
+        for number, description, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            logger.info("[MIGRATE] %s: %s", number, description)
+            with bind.begin() as conn:
+                apply(conn)
+                conn.execute(
+                    text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version) VALUES (:v)"),
+                    {"v": number},
+                )
+            version = number
+    return version
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"schema version: {migrate()}")
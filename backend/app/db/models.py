@@ -3,13 +3,18 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     String,
     Boolean,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Table,
+    Text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -47,13 +52,17 @@ event_participants = Table(
     Base.metadata,
     Column("event_id", UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True),
     Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True),
+    # PK (event_id, user_id) не помогает искать события пользователя
+    Index("ix_event_participants_user_id", "user_id"),
 )
 
 
 class EventParticipantLog(Base):
     __tablename__ = "event_participant_logs"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    # BIGINT: в режиме group commit id присваивает сервис (см. event_service);
+    # в SQLite первичный ключ-rowid должен оставаться INTEGER
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     event_id = Column(UUID(as_uuid=True), ForeignKey("events.id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     action = Column(String(10), nullable=False)  # join | leave
@@ -72,7 +81,19 @@ class Event(Base):
     image_url = Column(String(500), nullable=False)
     payment_info = Column(String(1000), nullable=True)
     max_participants = Column(Integer, nullable=True)
-    city = Column(String(255), nullable=False, default="")
+    # вход через очередь допуска (admission_service) вместо прямого join
+    high_demand = Column(Boolean, default=False, nullable=False)
+    # денормализованное число строк event_participants для события; у горячих
+    # событий (high_demand) к нему добавляется сумма EventCounterShard.count
+    participants_count = Column(Integer, nullable=False, default=0)
+    # места, выданные пулам воркеров (seat_pool в event_service): занятые
+    # записями через шарды и ещё не израсходованные (те — в EventSeatLease).
+    # Свободно: max_participants - participants_count - seats_reserved
+    seats_reserved = Column(Integer, nullable=False, default=0)
+    city = Column(String(255), nullable=False, default="", index=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    category = Column(String(100), nullable=False, default="прочее", index=True)
     status = Column(String(50), nullable=False, default="active")  # active, upcoming, past, deleted
     is_deleted = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -85,6 +106,102 @@ class Event(Base):
 
     participants = relationship("User", secondary=event_participants, back_populates="events")
 
+    __table_args__ = (
+        # выборки по окну дат: start_date <= :to AND end_date >= :from
+        Index("ix_events_start_end", "start_date", "end_date"),
+        Index("ix_events_lat_lon", "latitude", "longitude"),
+    )
+
+
+class EventChange(Base):
+    """
+    Журнал изменений событий для /events/changes: строки только дописываются
+    в транзакции изменения, seq монотонно растёт. Само изменение не храним —
+    клиент получает текущее состояние события (или tombstone для удалённого).
+    """
+
+    __tablename__ = "event_changes"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # свежие записи (окно SAFETY_LAG) и очистка старых ищутся по времени
+    __table_args__ = (Index("ix_event_changes_created_at", "created_at"),)
+
+
+class EventCounterShard(Base):
+    """
+    Слагаемое счётчика участников горячего события: join/leave меняют
+    случайную из PARTICIPANT_COUNTER_SHARDS строк вместо строки события,
+    так что параллельные записи не ждут одну блокировку.
+    """
+
+    __tablename__ = "event_counter_shards"
+
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    # число изменений строки — сумма по шардам служит версией для ETag
+    updates = Column(Integer, nullable=False, default=0)
+
+
+class EventSeatLease(Base):
+    """
+    Неизрасходованные места горячего события в пуле одного воркера. Воркер
+    продлевает аренду, пока жив; места просроченной аренды (воркер упал)
+    возвращаются в общий лимит — снимаются с Event.seats_reserved.
+    """
+
+    __tablename__ = "event_seat_leases"
+
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id"), primary_key=True)
+    owner = Column(String(100), primary_key=True)
+    seats = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class OutboxMessage(Base):
+    """
+    Исходящее побочное действие (письмо, WebSocket-сообщение), записанное
+    в той же транзакции, что и изменение данных. Доставляет dispatcher
+    из outbox_service.
+    """
+
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False)  # email | ws
+    idempotency_key = Column(String(200), nullable=False, unique=True)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), nullable=False, default="pending")  # pending | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # не раньше этого времени: бэкофф ретраев и аренда взятого в работу пакета
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claim = Column(String(36), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_outbox_status_available_at", "status", "available_at"),)
+
+
+class IdempotencyKey(Base):
+    """
+    Общее для воркеров хранилище Idempotency-Key (IDEMPOTENCY_BACKEND=db).
+    status_code NULL — запрос ещё выполняется, expires_at тогда — аренда.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 от (токен, метод, путь, ключ клиента)
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 
 class EmailVerificationCode(Base):
     __tablename__ = "email_verification_codes"
@@ -1,15 +1,82 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from app.core.boot import boot_timer  # первым: отсюда считаем время импорта
+
 import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import auth, ws  # Подключение маршрутов
-from app.db.base import Base, engine
+from app.config import settings
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.security import warm_up_jwt
+from app.core.templates import email_templates
 from app.core.ws_manager import ws_manager
+from app.db import migrations
+from app.db.base import count_statements, dispose_async_engine, warm_up_pool
+from app.services import admission_service, event_service, idempotency_service, outbox_service
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Схема больше не создаётся при импорте: проверяем версию одним запросом,
+    # а миграции применяем только если разрешено (см. app/db/migrations.py)
+    with boot_timer.phase("migrate"):
+        if not migrations.is_up_to_date():
+            if settings.AUTO_MIGRATE:
+                migrations.migrate()
+            else:
+                logger.error(
+                    "[BOOT] схема БД устарела, выполните `python -m app.db.migrations`"
+                )
+    with boot_timer.phase("db_pool"):
+        warm_up_pool(settings.DB_POOL_PREWARM)
+    with boot_timer.phase("jwt"):
+        warm_up_jwt()
+    with boot_timer.phase("templates"):
+        email_templates.load()
+    ws_manager.set_loop(asyncio.get_running_loop())
+    ws_manager.start()
+    outbox_service.dispatcher.start()
+    outbox_service.ws_dispatcher.start()
+    admission_service.worker.start()
+    if settings.PARTICIPANT_LOG_MODE == "group":
+        event_service.participant_log_writer.start()
+    else:
+        # без потока и каталога spool: только сегменты, оставшиеся от режима group
+        await asyncio.to_thread(event_service.participant_log_writer.recover)
+    event_service.seat_lease_keeper.start()
+    app.state.boot_timings = boot_timer.report()
+    boot_timer.log()
+    yield
+    admission_service.worker.stop()
+    event_service.seat_lease_keeper.stop()
+    # Блокирующие записи в БД — в потоке: event loop должен оставаться
+    # свободным, чтобы async-сессии (WS outbox) могли завершить транзакции,
+    # иначе SQLite ждёт блокировку до таймаута.
+    # Накопленный журнал участия — в БД до остановки
+    if settings.PARTICIPANT_LOG_MODE == "group":
+        await asyncio.to_thread(event_service.participant_log_writer.stop)
+    # неизрасходованные места горячих событий — обратно в общий лимит
+    await asyncio.to_thread(event_service.release_all_seats)
+    await outbox_service.ws_dispatcher.stop()
+    await ws_manager.stop()
+    outbox_service.dispatcher.stop()
+    await dispose_async_engine()
 
-# Создание таблиц в базе данных (для простоты без Alembic)
-Base.metadata.create_all(bind=engine)
 
 # Инициализация FastAPI
-app = FastAPI(title="Afisha Auth API")
+app = FastAPI(title="Afisha Auth API", lifespan=lifespan)
+
+# Повторы POST с тем же Idempotency-Key отвечаются из хранилища. Добавляется
+# до CORS, чтобы CORS оставался внешним и сохранённые ответы получали его заголовки
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_service.store,
+    routes=idempotency_service.IDEMPOTENT_ROUTES,
+)
 
 # Настройки CORS для разрешения запросов с других доменов (например, с фронтенда)
 app.add_middleware(
@@ -18,17 +85,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешаем все HTTP методы
     allow_headers=["*"],  # Разрешаем все заголовки
+    # служебные заголовки пагинации/кэша должны быть видны JS на фронте
+    expose_headers=[
+        "ETag",
+        "X-Total-Count",
+        "X-Next-Cursor",
+        "X-Change-Cursor",
+        "X-DB-Statements",
+        "Idempotent-Replayed",
+    ],
 )
 
+if settings.DB_STATEMENT_BUDGET:
+
+    @app.middleware("http")
+    async def db_statement_budget(request: Request, call_next):
+        with count_statements() as counter:
+            response = await call_next(request)
+        if counter[0] > settings.DB_STATEMENT_BUDGET:
+            logger.warning(
+                "[DB] %s %s: %s запросов при бюджете %s",
+                request.method,
+                request.url.path,
+                counter[0],
+                settings.DB_STATEMENT_BUDGET,
+            )
+        response.headers["X-DB-Statements"] = str(counter[0])
+        return response
+
+
 # Подключаем маршруты (роутеры) для аутентификации и пользователей
 app.include_router(auth.router)  # Включаем все маршруты из auth.py, включая /get_users
 app.include_router(ws.router)
 
 
-@app.on_event("startup")
-async def set_loop_for_ws():
-    ws_manager.set_loop(asyncio.get_running_loop())
-
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Afisha Auth API running"}
+
+
+boot_timer.mark("import")
@@ -0,0 +1,111 @@
+# app/repositories/async_event_repo.py
+"""
+Async-версии запросов read-пути событий (AsyncSession). SELECT/UPDATE
+строятся теми же функциями, что и в event_repo, — отличается только исполнение.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Event, User
+from app.repositories import event_repo
+
+
+async def list_events(
+    db: AsyncSession,
+    status: Optional[str] = None,
+    include_deleted: bool = False,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> List[Event]:
+    stmt = event_repo.list_events_stmt(
+        db.bind.dialect.name, status, include_deleted, city, category, date_from, date_to
+    )
+    return (await db.scalars(stmt)).all()
+
+
+async def get_event(db: AsyncSession, event_id: UUID) -> Optional[Event]:
+    return await db.get(Event, event_id)
+
+
+async def get_user(db: AsyncSession, user_id: UUID) -> Optional[User]:
+    return await db.get(User, user_id)
+
+
+async def list_events_by_user(
+    db: AsyncSession,
+    user_id: UUID,
+    *,
+    section: Optional[str] = None,
+    today: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> List[Event]:
+    stmt = event_repo.events_by_user_stmt(
+        user_id, section=section, today=today, limit=limit, cursor=cursor
+    )
+    return (await db.scalars(stmt)).all()
+
+
+async def get_participant_pairs(db: AsyncSession, event_ids: List[UUID]) -> List[tuple]:
+    pairs: List[tuple] = []
+    for stmt in event_repo.participant_pairs_stmts(event_ids):
+        pairs.extend(tuple(row) for row in await db.execute(stmt))
+    return pairs
+
+
+async def mark_past_events(db: AsyncSession, before: datetime) -> int:
+    await db.execute(event_repo.past_changes_stmt(before))
+    return (await db.execute(event_repo.mark_past_events_stmt(before))).rowcount
+
+
+async def purge_changes(db: AsyncSession, before: datetime) -> int:
+    return (await db.execute(event_repo.purge_changes_stmt(before))).rowcount or 0
+
+
+async def fold_counter_shards(db: AsyncSession) -> int:
+    fold, purge = event_repo.fold_counter_shards_stmts()
+    folded = (await db.execute(fold)).rowcount or 0
+    if folded:
+        await db.execute(purge)
+    return folded
+
+
+async def changes_since(db: AsyncSession, since: int, limit: int) -> List[tuple]:
+    return (await db.execute(event_repo.changes_since_stmt(since, limit))).all()
+
+
+async def change_bounds(db: AsyncSession) -> Tuple[Optional[int], Optional[int]]:
+    return tuple((await db.execute(event_repo.change_bounds_stmt())).one())
+
+
+async def first_fresh_change(db: AsyncSession, after: datetime) -> Optional[int]:
+    return await db.scalar(event_repo.first_fresh_change_stmt(after))
+
+
+async def get_events_by_ids(db: AsyncSession, event_ids: List[UUID]) -> List[Event]:
+    if not event_ids:
+        return []
+    return (await db.scalars(event_repo.events_by_ids_stmt(event_ids))).all()
+
+
+async def list_participants_page(
+    db: AsyncSession, event_id: UUID, after: Optional[UUID], limit: int
+) -> List[tuple]:
+    return (await db.execute(event_repo.participants_page_stmt(event_id, after, limit))).all()
+
+
+async def related_events(db: AsyncSession, event: Event, limit: int) -> List[Event]:
+    return (await db.scalars(event_repo.related_events_stmt(event, limit))).all()
+
+
+async def is_participant(db: AsyncSession, event_id: UUID, user_id: UUID) -> bool:
+    return bool(await db.scalar(event_repo.is_participant_stmt(event_id, user_id)))
+
+
+async def counter_shards(db: AsyncSession, event_id: UUID) -> tuple:
+    return tuple((await db.execute(event_repo.counter_shards_stmt(event_id))).one())
@@ -0,0 +1,50 @@
+# app/repositories/async_idempotency_repo.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IdempotencyKey
+from app.repositories import idempotency_repo
+
+
+async def claim(
+    db: AsyncSession,
+    key: str,
+    fingerprint: str,
+    now: datetime,
+    lease_until: datetime,
+) -> Optional[IdempotencyKey]:
+    """None — ключ занят под этот запрос; иначе существующая запись."""
+    await db.execute(idempotency_repo.drop_expired_stmt(key, now))
+    try:
+        inserted = (
+            await db.execute(idempotency_repo.claim_stmt(db.bind.dialect.name, key, fingerprint, lease_until))
+        ).rowcount
+    except IntegrityError:
+        # диалекты без ON CONFLICT: ключ уже есть
+        await db.rollback()
+        inserted = 0
+    if inserted:
+        return None
+    return (await db.scalars(idempotency_repo.get_stmt(key))).first()
+
+
+async def complete(
+    db: AsyncSession,
+    key: str,
+    status_code: int,
+    content_type: Optional[str],
+    body: bytes,
+    expires_at: datetime,
+) -> None:
+    await db.execute(idempotency_repo.complete_stmt(key, status_code, content_type, body, expires_at))
+
+
+async def release(db: AsyncSession, key: str) -> None:
+    await db.execute(idempotency_repo.release_stmt(key))
+
+
+async def purge(db: AsyncSession, now: datetime) -> int:
+    return (await db.execute(idempotency_repo.purge_stmt(now))).rowcount or 0
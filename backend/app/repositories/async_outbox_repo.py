@@ -0,0 +1,21 @@
+# app/repositories/async_outbox_repo.py
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import OutboxMessage
+from app.repositories import outbox_repo
+
+
+async def claim_batch(
+    db: AsyncSession,
+    claim: str,
+    now: datetime,
+    lease_until: datetime,
+    limit: int,
+    kinds: Optional[Sequence[str]] = None,
+) -> List[OutboxMessage]:
+    take, taken = outbox_repo.claim_stmts(db.bind.dialect.name, claim, now, lease_until, limit, kinds)
+    await db.execute(take)
+    return (await db.scalars(taken)).all()
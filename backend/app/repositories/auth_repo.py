@@ -20,8 +20,7 @@ def create_email_code(
         is_used=False,
     )
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    db.flush()
     return record
 
 
@@ -46,8 +45,7 @@ def get_valid_email_code(
 def mark_email_code_used(db: Session, record: EmailVerificationCode):
     record.is_used = True
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    db.flush()
 
 
 def invalidate_email_codes_for_user(db: Session, user: User):
@@ -59,7 +57,7 @@ def invalidate_email_codes_for_user(db: Session, user: User):
         )
         .update({EmailVerificationCode.is_used: True})
     )
-    db.commit()
+    db.flush()
 
 
 def create_reset_token(
@@ -75,8 +73,7 @@ def create_reset_token(
         is_used=False,
     )
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    db.flush()
     return record
 
 
@@ -103,5 +100,4 @@ def get_valid_reset_token(
 def mark_reset_token_used(db: Session, record: PasswordResetToken):
     record.is_used = True
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    db.flush()
@@ -1,41 +1,252 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from uuid import UUID
 
+from sqlalchemy import (
+    Delete,
+    Insert,
+    Select,
+    Update,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from app.db.models import Event, User, EventParticipantLog
+from app.db.models import (
+    Event,
+    EventChange,
+    EventCounterShard,
+    EventParticipantLog,
+    EventSeatLease,
+    User,
+    event_participants,
+)
+from app.repositories import search_repo
+
+
+def list_events_stmt(
+    dialect: str,
+    status: Optional[str] = None,
+    include_deleted: bool = False,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> Select:
+    """
+    SELECT для каталога — общий для синхронного и async-репозитория.
+    date_from/date_to — события, пересекающиеся с окном [date_from, date_to].
+    """
+    stmt = select(Event)
+    if not include_deleted:
+        stmt = stmt.where(Event.is_deleted == False)  # noqa: E712
+    if status:
+        stmt = stmt.where(Event.status == status)
+    if city:
+        stmt = stmt.where(Event.city == city)
+    if category:
+        stmt = stmt.where(Event.category == category)
+    if date_from is not None or date_to is not None:
+        if dialect == "postgresql":
+            # NULL-граница tsrange — бесконечность; идёт через GiST ix_events_period
+            stmt = stmt.where(
+                func.tsrange(Event.start_date, Event.end_date, "[]").op("&&")(
+                    func.tsrange(date_from, date_to, "[]")
+                )
+            )
+        else:
+            if date_to is not None:
+                stmt = stmt.where(Event.start_date <= date_to)
+            if date_from is not None:
+                stmt = stmt.where(Event.end_date >= date_from)
+    return stmt.order_by(Event.start_date)
 
 
 def list_events(
     db: Session,
     status: Optional[str] = None,
     include_deleted: bool = False,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
 ) -> List[Event]:
-    query = db.query(Event)
-    if not include_deleted:
-        query = query.filter(Event.is_deleted == False)  # noqa: E712
-    if status:
-        query = query.filter(Event.status == status)
-    return query.order_by(Event.start_date).all()
+    stmt = list_events_stmt(
+        db.get_bind().dialect.name, status, include_deleted, city, category, date_from, date_to
+    )
+    return db.scalars(stmt).all()
+
+
+def list_city_events(db: Session, city: str) -> List[Event]:
+    """Неудалённые события города — исходные данные для ICS-ленты."""
+    return (
+        db.query(Event)
+        .filter(Event.city == city, Event.is_deleted == False)  # noqa: E712
+        .order_by(Event.start_date)
+        .all()
+    )
+
+
+def facet_counts(db: Session) -> List[tuple]:
+    """(status, city, category, count) — исходные данные для FacetIndex."""
+    return [
+        tuple(row)
+        for row in db.query(Event.status, Event.city, Event.category, func.count())
+        .filter(Event.is_deleted == False)  # noqa: E712
+        .group_by(Event.status, Event.city, Event.category)
+    ]
 
 
 def get_event(db: Session, event_id: UUID) -> Optional[Event]:
     return db.query(Event).filter(Event.id == event_id).first()
 
 
-def list_events_by_user(db: Session, user: User) -> List[Event]:
-    return (
-        db.query(Event)
-        .filter(
+def get_events_by_ids(db: Session, event_ids: List[UUID]) -> List[Event]:
+    """События в порядке переданных id (например, по релевантности поиска)."""
+    if not event_ids:
+        return []
+    events = {
+        ev.id: ev
+        for ev in db.query(Event).filter(
+            Event.id.in_(event_ids),
             Event.is_deleted == False,  # noqa: E712
-            Event.participants.any(User.id == user.id),
         )
-        .order_by(Event.start_date)
-        .all()
+    }
+    return [events[event_id] for event_id in event_ids if event_id in events]
+
+
+def events_by_user_stmt(
+    user_id: UUID,
+    *,
+    section: Optional[str] = None,
+    today: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> Select:
+    """
+    События пользователя через индекс event_participants(user_id) — обычный JOIN
+    вместо коррелированного EXISTS. section: upcoming (по возрастанию даты)
+    или past (от свежих к старым); cursor — (start_date, id) последней записи.
+    """
+    stmt = (
+        select(Event)
+        .join(event_participants, event_participants.c.event_id == Event.id)
+        .where(
+            event_participants.c.user_id == user_id,
+            Event.is_deleted == False,  # noqa: E712
+        )
+    )
+    if section == "past":
+        stmt = stmt.where(Event.end_date < today)
+        if cursor:
+            stmt = stmt.where(tuple_(Event.start_date, Event.id) < cursor)
+        return stmt.order_by(Event.start_date.desc(), Event.id.desc()).limit(limit)
+    if section == "upcoming":
+        stmt = stmt.where(Event.end_date >= today)
+    if cursor:
+        stmt = stmt.where(tuple_(Event.start_date, Event.id) > cursor)
+    return stmt.order_by(Event.start_date, Event.id).limit(limit)
+
+
+def list_events_by_user(
+    db: Session,
+    user: User,
+    *,
+    section: Optional[str] = None,
+    today: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[tuple] = None,
+) -> List[Event]:
+    stmt = events_by_user_stmt(user.id, section=section, today=today, limit=limit, cursor=cursor)
+    return db.scalars(stmt).all()
+
+
+def _becoming_past(before: datetime) -> tuple:
+    return (
+        Event.is_deleted == False,  # noqa: E712
+        Event.end_date < before,
+        Event.status != "past",
+    )
+
+
+def mark_past_events_stmt(before: datetime) -> Update:
+    """Одним UPDATE помечаем прошедшими события, закончившиеся до `before`."""
+    return (
+        update(Event)
+        .where(*_becoming_past(before))
+        .values(status="past")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def past_changes_stmt(before: datetime) -> Insert:
+    """Записи ленты изменений для тех же событий — выполняется до mark_past_events_stmt."""
+    return insert(EventChange).from_select(
+        ["event_id", "created_at"],
+        select(Event.id, literal(datetime.utcnow())).where(*_becoming_past(before)),
     )
 
 
+def mark_past_events(db: Session, before: datetime) -> int:
+    db.execute(past_changes_stmt(before))
+    return db.execute(mark_past_events_stmt(before)).rowcount
+
+
+# ---------------------- Лента изменений ----------------------
+def record_changes(db: Session, event_ids: Iterable[UUID]) -> None:
+    """Дописывает изменённые события в event_changes (в транзакции изменения)."""
+    now = datetime.utcnow()
+    rows = [{"event_id": event_id, "created_at": now} for event_id in dict.fromkeys(event_ids)]
+    if rows:
+        db.execute(insert(EventChange), rows)
+
+
+def changes_since_stmt(since: int, limit: int) -> Select:
+    """Изменённые после since события, по одной строке на событие (с последним seq)."""
+    last_seq = func.max(EventChange.seq)
+    return (
+        select(EventChange.event_id, last_seq.label("seq"))
+        .where(EventChange.seq > since)
+        .group_by(EventChange.event_id)
+        .order_by(last_seq)
+        .limit(limit)
+    )
+
+
+def change_bounds_stmt() -> Select:
+    return select(func.min(EventChange.seq), func.max(EventChange.seq))
+
+
+def first_fresh_change_stmt(after: datetime) -> Select:
+    """Наименьший seq среди записей моложе after — курсор не должен его обгонять."""
+    return select(func.min(EventChange.seq)).where(EventChange.created_at > after)
+
+
+def purge_changes_stmt(before: datetime) -> Delete:
+    # последнюю запись не удаляем: по min(seq) клиент с устаревшим since получит 410
+    return delete(EventChange).where(
+        EventChange.created_at < before,
+        EventChange.seq < select(func.max(EventChange.seq)).scalar_subquery(),
+    )
+
+
+def purge_changes(db: Session, before: datetime) -> int:
+    return db.execute(purge_changes_stmt(before)).rowcount or 0
+
+
+def events_by_ids_stmt(event_ids: List[UUID]) -> Select:
+    """События по id, включая удалённые (для tombstone)."""
+    return select(Event).where(Event.id.in_(event_ids))
+
+
 def create_event(
     db: Session,
     title: str,
@@ -49,6 +260,10 @@ def create_event(
     max_participants: Optional[int],
     participants: List[User],
     status: str,
+    category: str = "прочее",
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    high_demand: bool = False,
 ) -> Event:
     event = Event(
         title=title,
@@ -58,17 +273,410 @@ def create_event(
         end_date=end_date,
         image_url=image_url,
         city=city,
+        category=category,
+        latitude=latitude,
+        longitude=longitude,
         payment_info=payment_info,
         max_participants=max_participants,
+        high_demand=high_demand,
         participants=participants,
+        participants_count=len(participants),
         status=status,
     )
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    db.flush()
+    search_repo.index_event(db, event)
     return event
 
 
+def bulk_create_events(db: Session, events: List[dict], participants: List[dict]) -> None:
+    """
+    Пакетная вставка событий и связей с участниками
+    (executemany вместо create_event + flush на каждое событие).
+    id событий формируются заранее вызывающим кодом.
+    """
+    if events:
+        db.execute(insert(Event), events)
+        search_repo.index_events(db, events)
+    if participants:
+        db.execute(insert(event_participants), participants)
+
+
+def get_events_brief(db: Session, event_ids: List[UUID]) -> List[Event]:
+    if not event_ids:
+        return []
+    return db.query(Event).filter(Event.id.in_(event_ids)).all()
+
+
+def related_events_stmt(event: Event, limit: int) -> Select:
+    """Актуальные события того же города: сначала той же категории, затем ближайшие по дате."""
+    return (
+        select(Event)
+        .where(
+            Event.city == event.city,
+            Event.id != event.id,
+            Event.is_deleted == False,  # noqa: E712
+            Event.status != "past",
+        )
+        .order_by((Event.category == event.category).desc(), Event.start_date)
+        .limit(limit)
+    )
+
+
+def related_events(db: Session, event: Event, limit: int) -> List[Event]:
+    return db.scalars(related_events_stmt(event, limit)).all()
+
+
+def geo_points(db: Session) -> List[tuple]:
+    """(id, latitude, longitude, end_date) неудалённых событий с координатами — для GeoIndex."""
+    return [
+        tuple(row)
+        for row in db.query(Event.id, Event.latitude, Event.longitude, Event.end_date).filter(
+            Event.is_deleted == False,  # noqa: E712
+            Event.latitude.isnot(None),
+            Event.longitude.isnot(None),
+        )
+    ]
+
+
+def is_participant_stmt(event_id: UUID, user_id: UUID) -> Select:
+    return select(
+        select(event_participants.c.user_id)
+        .where(event_participants.c.event_id == event_id, event_participants.c.user_id == user_id)
+        .exists()
+    )
+
+
+def is_participant(db: Session, event_id: UUID, user_id: UUID) -> bool:
+    return db.scalar(is_participant_stmt(event_id, user_id))
+
+
+def recommendation_candidates(db: Session) -> List[tuple]:
+    """(id, city, category, число участников) актуальных событий — для RecommendationIndex."""
+    participants_count = func.count(event_participants.c.user_id)
+    return [
+        tuple(row)
+        for row in db.query(Event.id, Event.city, Event.category, participants_count)
+        .outerjoin(event_participants, event_participants.c.event_id == Event.id)
+        .filter(
+            Event.is_deleted == False,  # noqa: E712
+            Event.status != "past",
+        )
+        .group_by(Event.id, Event.city, Event.category)
+    ]
+
+
+def user_event_categories(db: Session, user_id: UUID) -> List[tuple]:
+    """(event_id, category) событий, в которых участвует пользователь."""
+    return [
+        tuple(row)
+        for row in db.query(Event.id, Event.category)
+        .join(event_participants, event_participants.c.event_id == Event.id)
+        .filter(event_participants.c.user_id == user_id)
+    ]
+
+
+def participant_pairs_stmts(event_ids: List[UUID]) -> Iterator[Select]:
+    # IN-список режем на части: у SQLite есть лимит на число параметров
+    for offset in range(0, len(event_ids), 1000):
+        yield select(event_participants.c.event_id, event_participants.c.user_id).where(
+            event_participants.c.event_id.in_(event_ids[offset:offset + 1000])
+        )
+
+
+def get_participant_pairs(db: Session, event_ids: List[UUID]) -> List[tuple]:
+    """Пары (event_id, user_id) из event_participants для набора событий."""
+    pairs: List[tuple] = []
+    for stmt in participant_pairs_stmts(event_ids):
+        pairs.extend(tuple(row) for row in db.execute(stmt))
+    return pairs
+
+
+def change_participants_counts(db: Session, deltas: dict) -> None:
+    """participants_count += delta атомарным UPDATE (без чтения строки события)."""
+    rows = [{"event_key": event_id, "delta": delta} for event_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    events = Event.__table__
+    db.execute(
+        update(events)
+        .where(events.c.id == bindparam("event_key"))
+        .values(participants_count=events.c.participants_count + bindparam("delta")),
+        rows,
+    )
+
+
+def take_free_seat(db: Session, event_id: UUID) -> bool:
+    """
+    participants_count += 1 условным UPDATE: только если
+    participants_count + seats_reserved ещё меньше max_participants.
+    False — мест нет (их заняла параллельная запись после проверки).
+    """
+    events = Event.__table__
+    has_room = or_(
+        events.c.max_participants.is_(None),
+        events.c.participants_count + events.c.seats_reserved < events.c.max_participants,
+    )
+    return bool(
+        db.execute(
+            update(events)
+            .where(events.c.id == event_id, has_room)
+            .values(participants_count=events.c.participants_count + 1)
+        ).rowcount
+    )
+
+
+def add_to_counter_shard(db: Session, event_id: UUID, shard: int, delta: int) -> None:
+    """count += delta в строке-шарде горячего события (upsert), строка события не трогается."""
+    shards = EventCounterShard.__table__
+    values = {"event_id": event_id, "shard": shard, "count": delta, "updates": 1}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(shards).values(values)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[shards.c.event_id, shards.c.shard],
+                set_={"count": shards.c.count + stmt.excluded.count, "updates": shards.c.updates + 1},
+            )
+        )
+        return
+    updated = db.execute(
+        update(shards)
+        .where(shards.c.event_id == event_id, shards.c.shard == shard)
+        .values(count=shards.c.count + delta, updates=shards.c.updates + 1)
+    ).rowcount
+    if not updated:
+        db.execute(insert(shards).values(values))
+
+
+def counter_shards_stmt(event_id: UUID) -> Select:
+    """(сумма count, сумма updates) по шардам события — (0, 0), если шардов нет."""
+    shards = EventCounterShard.__table__
+    return select(
+        func.coalesce(func.sum(shards.c.count), 0),
+        func.coalesce(func.sum(shards.c.updates), 0),
+    ).where(shards.c.event_id == event_id)
+
+
+def counter_shards(db: Session, event_id: UUID) -> tuple:
+    return tuple(db.execute(counter_shards_stmt(event_id)).one())
+
+
+def fold_counter_shards_stmts() -> tuple[Update, Delete]:
+    """
+    Переносит шарды событий, уже не помеченных high_demand, в participants_count
+    (и снимает с seats_reserved — эти места больше не в шардах) и удаляет их.
+    """
+    shards = EventCounterShard.__table__
+    events = Event.__table__
+    total = (
+        select(func.coalesce(func.sum(shards.c.count), 0))
+        .where(shards.c.event_id == events.c.id)
+        .scalar_subquery()
+    )
+    cold = select(events.c.id).where(events.c.high_demand == False)  # noqa: E712
+    fold = (
+        update(events)
+        .where(events.c.high_demand == False, events.c.id.in_(select(shards.c.event_id)))  # noqa: E712
+        .values(
+            participants_count=events.c.participants_count + total,
+            seats_reserved=events.c.seats_reserved - total,
+        )
+    )
+    return fold, delete(shards).where(shards.c.event_id.in_(cold))
+
+
+def fold_counter_shards(db: Session) -> int:
+    fold, purge = fold_counter_shards_stmts()
+    folded = db.execute(fold).rowcount or 0
+    if folded:
+        db.execute(purge)
+    return folded
+
+
+def _add_to_lease(db: Session, event_id: UUID, owner: str, seats: int, expires_at: datetime) -> None:
+    """seats += n в аренде воркера (upsert) с продлением срока."""
+    leases = EventSeatLease.__table__
+    values = {"event_id": event_id, "owner": owner, "seats": seats, "expires_at": expires_at}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        stmt = module.insert(leases).values(values)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[leases.c.event_id, leases.c.owner],
+                set_={"seats": leases.c.seats + stmt.excluded.seats, "expires_at": stmt.excluded.expires_at},
+            )
+        )
+        return
+    updated = db.execute(
+        update(leases)
+        .where(leases.c.event_id == event_id, leases.c.owner == owner)
+        .values(seats=leases.c.seats + seats, expires_at=expires_at)
+    ).rowcount
+    if not updated:
+        db.execute(insert(leases).values(values))
+
+
+def reserve_seats(
+    db: Session,
+    event_id: UUID,
+    wanted: int,
+    owner: str,
+    expires_at: datetime,
+    attempts: int = 3,
+) -> int:
+    """
+    Резервирует до wanted свободных мест события за воркером owner условным
+    UPDATE: participants_count + seats_reserved не превысит max_participants
+    даже при гонке воркеров. Места записываются в аренду воркера до
+    expires_at. Возвращает число выданных мест (0 — мест нет).
+    """
+    events = Event.__table__
+    free = events.c.max_participants - events.c.participants_count - events.c.seats_reserved
+    for _ in range(attempts):
+        available = db.execute(select(free).where(events.c.id == event_id)).scalar()
+        granted = min(wanted, available or 0)
+        if granted <= 0:
+            return 0
+        reserved = db.execute(
+            update(events)
+            .where(events.c.id == event_id, free >= granted)
+            .values(seats_reserved=events.c.seats_reserved + granted)
+        ).rowcount
+        if reserved:
+            _add_to_lease(db, event_id, owner, granted, expires_at)
+            return granted
+    return 0
+
+
+def take_leased_seat(db: Session, event_id: UUID, owner: str) -> bool:
+    """
+    Место из аренды воркера уходит записавшемуся (в транзакции записи).
+    False — аренды нет: её забрали как просроченную, места пула недействительны.
+    """
+    leases = EventSeatLease.__table__
+    return bool(
+        db.execute(
+            update(leases)
+            .where(leases.c.event_id == event_id, leases.c.owner == owner, leases.c.seats >= 1)
+            .values(seats=leases.c.seats - 1)
+        ).rowcount
+    )
+
+
+def return_leased_seat(db: Session, event_id: UUID, owner: str, expires_at: datetime) -> None:
+    """Место вышедшего участника — в аренду воркера, который вернёт его в пул."""
+    _add_to_lease(db, event_id, owner, 1, expires_at)
+
+
+def renew_seat_leases(db: Session, owner: str, expires_at: datetime) -> int:
+    """
+    Продлевает аренды воркера по событиям, ещё помеченным high_demand.
+    Аренды событий, с которых сняли флаг, не продлеваются и истекут.
+    """
+    leases = EventSeatLease.__table__
+    events = Event.__table__
+    hot = select(events.c.id).where(events.c.high_demand == True)  # noqa: E712
+    return db.execute(
+        update(leases)
+        .where(leases.c.owner == owner, leases.c.event_id.in_(hot))
+        .values(expires_at=expires_at)
+    ).rowcount
+
+
+def _drop_leases(db: Session, condition) -> dict:
+    """Удаляет аренды по условию и снимает их места с seats_reserved: {event_id: мест}."""
+    leases = EventSeatLease.__table__
+    stmt = delete(leases).where(condition)
+    if db.get_bind().dialect.delete_returning:
+        rows = db.execute(stmt.returning(leases.c.event_id, leases.c.seats)).all()
+    else:
+        rows = db.execute(select(leases.c.event_id, leases.c.seats).where(condition)).all()
+        db.execute(stmt)
+    seats: dict = {}
+    for event_id, count in rows:
+        seats[event_id] = seats.get(event_id, 0) + count
+    release_seats(db, seats)
+    return seats
+
+
+def release_leases(db: Session, owner: str, event_id: Optional[UUID] = None) -> dict:
+    """Возвращает места аренд воркера (одного события или всех) в общий лимит."""
+    leases = EventSeatLease.__table__
+    condition = leases.c.owner == owner
+    if event_id is not None:
+        condition = condition & (leases.c.event_id == event_id)
+    return _drop_leases(db, condition)
+
+
+def reclaim_expired_leases(db: Session, now: datetime) -> dict:
+    """Места просроченных аренд (воркер упал или завис) — обратно в общий лимит."""
+    return _drop_leases(db, EventSeatLease.__table__.c.expires_at < now)
+
+
+def release_seats(db: Session, seats: dict) -> None:
+    """seats_reserved -= n по событиям."""
+    rows = [{"event_key": event_id, "seats": count} for event_id, count in seats.items() if count]
+    if not rows:
+        return
+    events = Event.__table__
+    db.execute(
+        update(events)
+        .where(events.c.id == bindparam("event_key"))
+        .values(seats_reserved=events.c.seats_reserved - bindparam("seats")),
+        rows,
+    )
+
+
+def add_participant(db: Session, event_id: UUID, user_id: UUID) -> bool:
+    """Одна строка event_participants без загрузки коллекции; False — уже участник."""
+    stmt = _insert_ignore(db, event_participants).values(event_id=event_id, user_id=user_id)
+    return bool(db.execute(stmt).rowcount)
+
+
+def remove_participant(db: Session, event_id: UUID, user_id: UUID) -> bool:
+    stmt = delete(event_participants).where(
+        event_participants.c.event_id == event_id,
+        event_participants.c.user_id == user_id,
+    )
+    return bool(db.execute(stmt).rowcount)
+
+
+def participants_page_stmt(event_id: UUID, after: Optional[UUID], limit: int) -> Select:
+    """
+    Страница участников (id, full_name, avatar_url) с keyset-пагинацией
+    по user_id — идёт по первичному ключу event_participants без OFFSET.
+    """
+    stmt = (
+        select(User.id, User.full_name, User.avatar_url)
+        .join(event_participants, event_participants.c.user_id == User.id)
+        .where(event_participants.c.event_id == event_id)
+    )
+    if after is not None:
+        stmt = stmt.where(event_participants.c.user_id > after)
+    return stmt.order_by(event_participants.c.user_id).limit(limit)
+
+
+def list_participants_page(
+    db: Session,
+    event_id: UUID,
+    after: Optional[UUID],
+    limit: int,
+) -> List[tuple]:
+    return db.execute(participants_page_stmt(event_id, after, limit)).all()
+
+
+def bulk_add_participants(db: Session, pairs: List[dict]) -> None:
+    if pairs:
+        db.execute(insert(event_participants), pairs)
+        deltas: dict = {}
+        for pair in pairs:
+            deltas[pair["event_id"]] = deltas.get(pair["event_id"], 0) + 1
+        change_participants_counts(db, deltas)
+
+
 def update_event(
     db: Session,
     event: Event,
@@ -80,9 +688,12 @@ def update_event(
     end_date: Optional[datetime] = None,
     image_url: Optional[str] = None,
     city: Optional[str] = None,
+    category: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
     payment_info: Optional[str] = None,
     max_participants: Optional[int] = None,
-    participants: Optional[List[User]] = None,
+    high_demand: Optional[bool] = None,
     status: Optional[str] = None,
 ) -> Event:
     if title is not None:
@@ -99,35 +710,129 @@ def update_event(
         event.image_url = image_url
     if city is not None:
         event.city = city
+    if category is not None:
+        event.category = category
+    if latitude is not None:
+        event.latitude = latitude
+    if longitude is not None:
+        event.longitude = longitude
     if payment_info is not None:
         event.payment_info = payment_info
     if max_participants is not None:
         event.max_participants = max_participants
-    if participants is not None:
-        event.participants = participants
+    if high_demand is not None:
+        event.high_demand = high_demand
     if status is not None:
         event.status = status
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    db.flush()
+    if title is not None or short_description is not None or description is not None:
+        search_repo.index_event(db, event)
     return event
 
 
+def get_participant_ids(db: Session, event_id: UUID) -> set[UUID]:
+    """id участников без загрузки объектов User."""
+    stmt = select(event_participants.c.user_id).where(event_participants.c.event_id == event_id)
+    return set(db.execute(stmt).scalars())
+
+
+def _insert_ignore(db: Session, table):
+    """INSERT ... ON CONFLICT DO NOTHING для диалектов, которые это умеют."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+def apply_participant_changes(
+    db: Session,
+    event_id: UUID,
+    add_ids: set[UUID],
+    remove_ids: set[UUID],
+) -> tuple[List[UUID], List[UUID]]:
+    """
+    Добавляет/удаляет участников set-based запросами к event_participants
+    (без загрузки коллекции event.participants). Возвращает фактически
+    добавленных и удалённых — журнал участия по ним пишет сервис.
+    """
+    dialect = db.get_bind().dialect
+    added: List[UUID] = []
+    removed: List[UUID] = []
+    # многострочный VALUES и IN-список режем на части, как в
+    # participant_pairs_stmts: старые SQLite ограничивают запрос 999 параметрами
+    add_list, remove_list = list(add_ids), list(remove_ids)
+    existing: set = set()
+    if (add_list and not dialect.insert_returning) or (remove_list and not dialect.delete_returning):
+        existing = get_participant_ids(db, event_id)
+    for offset in range(0, len(add_list), 400):
+        part = add_list[offset:offset + 400]
+        if dialect.insert_returning:
+            stmt = _insert_ignore(db, event_participants).values(
+                [{"event_id": event_id, "user_id": uid} for uid in part]
+            )
+            added.extend(db.execute(stmt.returning(event_participants.c.user_id)).scalars())
+        else:
+            fresh = [uid for uid in part if uid not in existing]
+            if fresh:
+                db.execute(insert(event_participants), [{"event_id": event_id, "user_id": uid} for uid in fresh])
+            added.extend(fresh)
+    for offset in range(0, len(remove_list), 900):
+        part = remove_list[offset:offset + 900]
+        stmt = delete(event_participants).where(
+            event_participants.c.event_id == event_id,
+            event_participants.c.user_id.in_(part),
+        )
+        if dialect.delete_returning:
+            removed.extend(db.execute(stmt.returning(event_participants.c.user_id)).scalars())
+        else:
+            removed.extend(uid for uid in part if uid in existing)
+            db.execute(stmt)
+
+    change_participants_counts(db, {event_id: len(added) - len(removed)})
+    return added, removed
+
+
 def soft_delete_event(db: Session, event: Event) -> Event:
     event.is_deleted = True
     event.status = "deleted"
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    db.flush()
+    search_repo.remove_event(db, event.id)
     return event
 
 
-def add_participant_log(db: Session, event_id: UUID, user_id: UUID, action: str) -> EventParticipantLog:
-    log = EventParticipantLog(event_id=event_id, user_id=user_id, action=action)
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
+def insert_participant_logs(db: Session, rows: List[dict]) -> None:
+    """
+    Строки журнала участия многострочными INSERT (в транзакции изменения
+    или пачкой group commit). id присвоены заранее, повтор той же пачки (досылка spool)
+    пропускает уже записанные строки.
+    """
+    logs = EventParticipantLog.__table__
+    values = [
+        {
+            "id": row["id"],
+            "event_id": UUID(row["event_id"]),
+            "user_id": UUID(row["user_id"]),
+            "action": row["action"],
+            "created_at": datetime.fromisoformat(row["created_at"]),
+        }
+        for row in rows
+    ]
+    dialect = db.get_bind().dialect.name
+    # по 5 параметров на строку: пачки по 150 строк укладываются в лимит SQLite
+    for offset in range(0, len(values), 150):
+        part = values[offset:offset + 150]
+        if dialect in ("postgresql", "sqlite"):
+            module = postgresql if dialect == "postgresql" else sqlite
+            db.execute(module.insert(logs).values(part).on_conflict_do_nothing(index_elements=[logs.c.id]))
+            continue
+        existing = set(db.execute(select(logs.c.id).where(logs.c.id.in_([v["id"] for v in part]))).scalars())
+        part = [v for v in part if v["id"] not in existing]
+        if part:
+            db.execute(insert(logs), part)
 
 
 def get_participant_logs(db: Session, event_id: UUID) -> List[EventParticipantLog]:
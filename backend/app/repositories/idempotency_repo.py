@@ -0,0 +1,49 @@
+# app/repositories/idempotency_repo.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Delete, Insert, Select, Update, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.models import IdempotencyKey
+
+
+def drop_expired_stmt(key: str, now: datetime) -> Delete:
+    """Просроченная запись ключа (или брошенная аренда) не мешает новому запросу."""
+    return delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+
+
+def claim_stmt(dialect: str, key: str, fingerprint: str, lease_until: datetime) -> Insert:
+    """INSERT незавершённой записи; если ключ уже занят — ничего (rowcount 0)."""
+    values = {"key": key, "fingerprint": fingerprint, "expires_at": lease_until}
+    if dialect == "postgresql":
+        return postgresql.insert(IdempotencyKey).values(values).on_conflict_do_nothing(index_elements=["key"])
+    if dialect == "sqlite":
+        return sqlite.insert(IdempotencyKey).values(values).on_conflict_do_nothing(index_elements=["key"])
+    return insert(IdempotencyKey).values(values)
+
+
+def get_stmt(key: str) -> Select:
+    return select(IdempotencyKey).where(IdempotencyKey.key == key).execution_options(populate_existing=True)
+
+
+def complete_stmt(
+    key: str,
+    status_code: int,
+    content_type: Optional[str],
+    body: bytes,
+    expires_at: datetime,
+) -> Update:
+    return (
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status_code=status_code, content_type=content_type, body=body, expires_at=expires_at)
+    )
+
+
+def release_stmt(key: str) -> Delete:
+    return delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+
+
+def purge_stmt(now: datetime) -> Delete:
+    return delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now)
@@ -0,0 +1,119 @@
+# app/repositories/outbox_repo.py
+from datetime import datetime
+from typing import List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Select, Update, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models import OutboxMessage
+
+
+def add_messages(db: Session, rows: List[dict]) -> None:
+    """Вставка пакета; сообщения с уже известным idempotency_key пропускаются."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(OutboxMessage).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(OutboxMessage).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    else:
+        stmt = insert(OutboxMessage)
+    db.execute(stmt, rows)
+
+
+def existing_keys(db: Session, keys: List[str]) -> Set[str]:
+    """Какие из idempotency_key уже есть в outbox."""
+    found: Set[str] = set()
+    for offset in range(0, len(keys), 500):
+        chunk = keys[offset:offset + 500]
+        stmt = select(OutboxMessage.idempotency_key).where(OutboxMessage.idempotency_key.in_(chunk))
+        found.update(db.execute(stmt).scalars())
+    return found
+
+
+def claim_stmts(
+    dialect: str,
+    claim: str,
+    now: datetime,
+    lease_until: datetime,
+    limit: int,
+    kinds: Optional[Sequence[str]] = None,
+) -> Tuple[Update, Select]:
+    """
+    UPDATE, берущий в работу до limit готовых сообщений: помечает их меткой
+    claim и сдвигает available_at на время аренды (если воркер упадёт, после
+    аренды сообщения снова станут доступны), и SELECT взятых сообщений.
+    """
+    ready = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == "pending", OutboxMessage.available_at <= now)
+        .order_by(OutboxMessage.id)
+        .limit(limit)
+    )
+    if kinds:
+        ready = ready.where(OutboxMessage.kind.in_(kinds))
+    if dialect == "postgresql":
+        ready = ready.with_for_update(skip_locked=True)
+    take = (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ready.scalar_subquery()))
+        .values(claim=claim, available_at=lease_until, attempts=OutboxMessage.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    # populate_existing: сессия могла видеть эти строки в прошлом пакете
+    taken = (
+        select(OutboxMessage)
+        .where(OutboxMessage.claim == claim, OutboxMessage.status == "pending")
+        .order_by(OutboxMessage.id)
+        .execution_options(populate_existing=True)
+    )
+    return take, taken
+
+
+def claim_batch(
+    db: Session,
+    claim: str,
+    now: datetime,
+    lease_until: datetime,
+    limit: int,
+    kinds: Optional[Sequence[str]] = None,
+) -> List[OutboxMessage]:
+    take, taken = claim_stmts(db.get_bind().dialect.name, claim, now, lease_until, limit, kinds)
+    db.execute(take)
+    return db.scalars(taken).all()
+
+
+def done_stmt(ids: List[int], now: datetime) -> Update:
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ids))
+        .values(status="done", processed_at=now, claim=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def retry_stmt(message_id: int, error: str, available_at: datetime) -> Update:
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(available_at=available_at, claim=None, last_error=error[:500])
+        .execution_options(synchronize_session=False)
+    )
+
+
+def failed_stmt(message_id: int, error: str, now: datetime) -> Update:
+    return (
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(status="failed", processed_at=now, claim=None, last_error=error[:500])
+        .execution_options(synchronize_session=False)
+    )
+
+
+def purge_done(db: Session, before: datetime) -> int:
+    result = db.execute(
+        delete(OutboxMessage).where(OutboxMessage.status == "done", OutboxMessage.processed_at < before)
+    )
+    return result.rowcount or 0
@@ -0,0 +1,146 @@
+# app/repositories/search_repo.py
+"""
+Полнотекстовый поиск по событиям (title, short_description, description).
+
+PostgreSQL: генерируемая колонка events.search_vector (tsvector, словарь
+russian со стеммингом) + GIN-индекс — синхронизируется самой БД.
+SQLite: внешняя FTS5-таблица events_fts, которую поддерживают хуки
+index_event/remove_event из event_repo. Стемминга в FTS5 нет, поэтому
+слова запроса ищем как префиксы.
+"""
+import re
+from typing import Iterable, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Event
+
+FTS_TABLE = "events_fts"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _terms(query: str) -> List[str]:
+    return [t.lower() for t in _WORD_RE.findall(query)]
+
+
+def _fts_rowid(event_id) -> int:
+    """
+    rowid FTS-записи из первых 8 байт UUID: UNINDEXED-колонку event_id FTS5
+    не индексирует, а удаление/замена по rowid не требует полного просмотра.
+    """
+    return int.from_bytes(UUID(str(event_id)).bytes[:8], "big", signed=True)
+
+
+def _fts_rows(events: Iterable[dict]) -> List[dict]:
+    return [
+        {
+            "rowid": _fts_rowid(ev["id"]),
+            "event_id": UUID(str(ev["id"])).hex,
+            "title": ev["title"],
+            "short_description": ev.get("short_description") or "",
+            "description": ev["description"],
+        }
+        for ev in events
+    ]
+
+
+_FTS_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, event_id, title, short_description, description) "
+    "VALUES (:rowid, :event_id, :title, :short_description, :description)"
+)
+
+
+def index_events(db: Session, events: Iterable[dict]) -> None:
+    """Добавляет/обновляет события в индексе (нужно только для SQLite)."""
+    if _dialect(db) != "sqlite":
+        return
+    rows = _fts_rows(events)
+    if not rows:
+        return
+    db.execute(
+        text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"),
+        [{"rowid": row["rowid"]} for row in rows],
+    )
+    db.execute(text(_FTS_INSERT), rows)
+
+
+def index_event(db: Session, event: Event) -> None:
+    index_events(
+        db,
+        [{
+            "id": event.id,
+            "title": event.title,
+            "short_description": event.short_description,
+            "description": event.description,
+        }],
+    )
+
+
+def remove_event(db: Session, event_id: UUID) -> None:
+    if _dialect(db) != "sqlite":
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), {"rowid": _fts_rowid(event_id)})
+
+
+def search_event_ids(
+    db: Session,
+    query: str,
+    limit: int,
+    offset: int = 0,
+) -> Tuple[List[UUID], int]:
+    """id найденных событий по убыванию релевантности и общее число совпадений."""
+    terms = _terms(query)
+    if not terms:
+        return [], 0
+    dialect = _dialect(db)
+    params = {"limit": limit, "offset": offset}
+
+    if dialect == "postgresql":
+        params["q"] = " ".join(terms)
+        where = "NOT is_deleted AND search_vector @@ plainto_tsquery('russian', :q)"
+        rows = db.execute(
+            text(
+                f"SELECT id FROM events WHERE {where} "
+                "ORDER BY ts_rank_cd(search_vector, plainto_tsquery('russian', :q)) DESC, start_date "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            params,
+        ).scalars()
+        total = db.execute(text(f"SELECT count(*) FROM events WHERE {where}"), params).scalar()
+        return [UUID(str(r)) for r in rows], total or 0
+
+    if dialect == "sqlite":
+        params["q"] = " ".join(f'"{t}"*' for t in terms)
+        rows = db.execute(
+            text(
+                f"SELECT event_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q "
+                f"ORDER BY bm25({FTS_TABLE}, 0, 10.0, 5.0, 1.0) LIMIT :limit OFFSET :offset"
+            ),
+            params,
+        ).scalars()
+        total = db.execute(
+            text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"), params
+        ).scalar()
+        return [UUID(r) for r in rows], total or 0
+
+    # прочие СУБД: без индекса, простым ILIKE (порядок — по дате)
+    query_obj = db.query(Event.id).filter(Event.is_deleted == False)  # noqa: E712
+    for term in terms:
+        pattern = f"%{term}%"
+        query_obj = query_obj.filter(
+            or_(
+                Event.title.ilike(pattern),
+                Event.short_description.ilike(pattern),
+                Event.description.ilike(pattern),
+            )
+        )
+    total = query_obj.count()
+    ids = [row.id for row in query_obj.order_by(Event.start_date).limit(limit).offset(offset)]
+    return ids, total
@@ -21,24 +21,21 @@ def create_user(db: Session, full_name: str, email: str, password_hash: str) ->
         is_active=False,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
 def activate_user(db: Session, user: User) -> User:
     user.is_active = True
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
 def update_password(db: Session, user: User, password_hash: str) -> User:
     user.password_hash = password_hash
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
@@ -50,14 +47,26 @@ def get_by_ids(db: Session, ids: Iterable[UUID]) -> list[User]:
     return db.query(User).filter(User.id.in_(list(ids))).all()
 
 
+def get_emails_by_ids(db: Session, ids: Iterable[UUID]) -> dict[UUID, str]:
+    """Только id и email существующих пользователей — без загрузки ORM-объектов."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = (
+        db.query(User.id, User.email)
+        .filter(User.id.in_(ids), User.is_deleted == False)  # noqa: E712
+        .all()
+    )
+    return {row.id: row.email for row in rows}
+
+
 def update_profile(db: Session, user: User, full_name: Optional[str], about: Optional[str], avatar_url: Optional[str]) -> User:
     if full_name:
         user.full_name = full_name
     user.about = about
     user.avatar_url = avatar_url
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
@@ -99,8 +108,7 @@ def soft_delete_user(db: Session, user: User) -> User:
     user.is_deleted = True
     user.is_active = False
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
@@ -108,6 +116,5 @@ def restore_user(db: Session, user: User) -> User:
     user.is_deleted = False
     user.is_active = True
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field, validator
@@ -14,8 +14,12 @@ class EventCreateRequest(BaseModel):
     end_date: datetime
     image_url: str
     city: str
+    category: str = "прочее"
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
     payment_info: Optional[str] = None
     max_participants: Optional[int] = Field(default=None, ge=1)
+    high_demand: bool = False
     participant_ids: List[UUID] = []
 
     @validator("end_date")
@@ -34,9 +38,16 @@ class EventUpdateRequest(BaseModel):
     end_date: Optional[datetime] = None
     image_url: Optional[str] = None
     city: Optional[str] = None
+    category: Optional[str] = None
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
     payment_info: Optional[str] = None
     max_participants: Optional[int] = Field(default=None, ge=1)
+    high_demand: Optional[bool] = None
     participant_ids: Optional[List[UUID]] = None
+    # Дельта участников — дешевле, чем передавать весь список participant_ids
+    add_participant_ids: Optional[List[UUID]] = None
+    remove_participant_ids: Optional[List[UUID]] = None
     status: Optional[str] = None
 
     @validator("end_date")
@@ -56,8 +67,12 @@ class EventResponse(BaseModel):
     end_date: datetime
     image_url: str
     city: str
+    category: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     payment_info: Optional[str]
     max_participants: Optional[int]
+    high_demand: bool = False
     status: str
     is_deleted: bool
     participants: List[UUID]
@@ -66,6 +81,114 @@ class EventResponse(BaseModel):
         from_attributes = True
 
 
+class NearbyEventResponse(EventResponse):
+    distance_km: float
+
+
+class EventChangeItem(BaseModel):
+    seq: int
+    event_id: UUID
+    # tombstone: событие удалено, event не передаётся
+    deleted: bool
+    event: Optional[EventResponse] = None
+
+
+class EventChangesResponse(BaseModel):
+    changes: List[EventChangeItem]
+    # since для следующего запроса
+    next_since: int
+    has_more: bool
+
+
+class CatalogFreshnessResponse(BaseModel):
+    loaded: bool
+    events: int
+    live_events: int
+    seq: Optional[int]
+    age_seconds: Optional[float]
+    max_staleness_seconds: float
+    dirty: bool
+    refreshes: int
+    full_loads: int
+    patches: int
+    last_refresh_ms: float
+    last_changed: int
+
+
+class WSStatsResponse(BaseModel):
+    connections: int
+    authenticated: int
+    binary: int
+    sse: int
+    sse_events: int
+    ips: int
+    top_ips: Dict[str, int]
+    buffered_bytes: int
+    max_buffered_bytes: int
+    replay_seq: int
+    timers: int
+    pings: int
+    reaped_idle: int
+    dropped_slow: int
+    rejected_worker: int
+    rejected_ip: int
+    rejected_token: int
+    binary_frames: int
+    binary_bytes: int
+    rejected_sse: int
+
+
+class GroupCommitStatsResponse(BaseModel):
+    name: str
+    # записей в памяти/spool, ещё не записанных в БД
+    pending: int
+    spool_segments: int
+    appended: int
+    written: int
+    batches: int
+    avg_batch: float
+    max_batch: int
+    failures: int
+    recovered: int
+    last_flush_ms: float
+    avg_flush_ms: float
+    max_flush_ms: float
+
+
+class AdmissionTicketResponse(BaseModel):
+    ticket: str
+    event_id: UUID
+    status: str  # waiting | admitted | joined | rejected
+    # место в очереди, пока status == waiting
+    position: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ParticipantResponse(BaseModel):
+    id: UUID
+    full_name: str
+    avatar_url: Optional[str] = None
+
+
+class EventPageResponse(BaseModel):
+    """Всё для страницы события одним ответом."""
+    # event.participants — id только первой страницы, всего — participants_total
+    event: EventResponse
+    is_participant: bool = False
+    is_full: bool
+    spots_left: Optional[int]
+    participants: List[ParticipantResponse]
+    participants_total: int
+    participants_next_cursor: Optional[str] = None
+    related: List[EventResponse]
+
+
+class EventFacetsResponse(BaseModel):
+    cities: Dict[str, int]
+    categories: Dict[str, int]
+    statuses: Dict[str, int]
+
+
 class ParticipationUser(BaseModel):
     id: UUID
     full_name: str
@@ -75,3 +198,30 @@ class ParticipationUser(BaseModel):
 class ParticipationLogResponse(BaseModel):
     active: List[ParticipationUser]
     declined: List[ParticipationUser]
+
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    created: int
+    failed: int
+    event_ids: List[UUID]
+    errors: List[BulkRowError]
+
+
+class BulkParticipantsItem(BaseModel):
+    event_id: UUID
+    user_ids: List[UUID]
+
+
+class BulkParticipantsRequest(BaseModel):
+    items: List[BulkParticipantsItem]
+
+
+class BulkParticipantsResponse(BaseModel):
+    added: int
+    failed: int
+    errors: List[BulkRowError]
@@ -0,0 +1,261 @@
+# app/services/admission_service.py
+"""
+Запись на события с высоким спросом (Event.high_demand) через очередь допуска.
+
+POST /events/{id}/join для такого события не пишет в БД: флаг и число
+свободных мест читаются из строки события и счётчиков участников (те же,
+что у записи, с кэшем шардов), запрос получает билет (202).
+Поток AdmissionWorker допускает билеты с ограниченной скоростью и выполняет
+обычный event_service.join_event; когда места кончаются, остальным билетам
+отказывается сразу в памяти. Позицию клиент узнаёт опросом
+GET /events/{id}/queue/{ticket} или подпиской в /ws/events.
+
+Очередь живёт в памяти воркера: при нескольких воркерах опрос билета
+должен попадать в тот же воркер (sticky-сессии на балансировщике).
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, WebSocket, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.admission import (
+    JOINED,
+    REJECTED,
+    AdmissionQueue,
+    AdmissionRejected,
+    Ticket,
+)
+from app.core.ws_manager import ws_manager
+from app.db.base import SessionLocal
+from app.repositories import event_repo, user_repo
+from app.schemas.event import AdmissionTicketResponse
+from app.services import event_service
+
+logger = logging.getLogger(__name__)
+
+# Как часто (сек) удаляем завершённые билеты
+PURGE_INTERVAL = 30
+
+admission = AdmissionQueue(
+    rate=settings.ADMISSION_RATE,
+    max_waiting=settings.ADMISSION_MAX_WAITING,
+    ticket_ttl=settings.ADMISSION_TICKET_TTL,
+    remaining_ttl=settings.PARTICIPANT_COUNTER_CACHE_TTL,
+)
+
+# ticket_id -> подписанные соединения и последнее отправленное (status, position)
+_subscribers: Dict[str, Set[WebSocket]] = {}
+_last_sent: Dict[str, Tuple[str, Optional[int]]] = {}
+_subscribers_lock = threading.Lock()
+
+
+def try_enqueue(db: Session, event_id: UUID, user) -> Optional[Ticket]:
+    """
+    Билет, если событие помечено high_demand; иначе None — обычный путь join.
+    Флаг читается из БД, а не из снимка каталога: устаревший или ещё не
+    загруженный снимок пропустил бы запросы к горячему событию мимо очереди.
+    Повторный запрос и отказ по счётчику очереди в БД не ходят.
+    """
+    try:
+        ticket = admission.check(event_id, user.id)
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if ticket is not None:
+        return ticket
+    event = event_repo.get_event(db, event_id)
+    if event is None or not event.high_demand or event.is_deleted:
+        return None
+    if event_repo.is_participant(db, event_id, user.id):
+        return None
+    remaining = event_service.spots_left(db, event)
+    try:
+        ticket = admission.enqueue(event_id, user.id, remaining)
+    except AdmissionRejected as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    worker.notify()
+    return ticket
+
+
+def ticket_response(ticket: Ticket) -> AdmissionTicketResponse:
+    return AdmissionTicketResponse(
+        ticket=ticket.id,
+        event_id=ticket.event_id,
+        status=ticket.status,
+        position=admission.position(ticket),
+        detail=ticket.detail,
+    )
+
+
+def get_ticket(event_id: UUID, ticket_id: str, user) -> AdmissionTicketResponse:
+    ticket = admission.get(ticket_id)
+    if ticket is None or ticket.event_id != event_id or ticket.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Билет не найден")
+    return ticket_response(ticket)
+
+
+def _message(ticket: Ticket, position: Optional[int]) -> str:
+    return json.dumps(
+        {
+            "type": "queue",
+            "ticket": ticket.id,
+            "event_id": str(ticket.event_id),
+            "status": ticket.status,
+            "position": position,
+            "detail": ticket.detail,
+        },
+        ensure_ascii=False,
+    )
+
+
+def subscribe(ticket_id: str, websocket: WebSocket, user_id: Optional[UUID] = None) -> Optional[str]:
+    """
+    Подписка соединения /ws/events на билет. Анонимному соединению
+    достаточно знать id билета; соединение с токеном — только на свои.
+    Возвращает текущее состояние для немедленной отправки.
+    """
+    ticket = admission.get(ticket_id)
+    if ticket is None or (user_id is not None and ticket.user_id != user_id):
+        return None
+    with _subscribers_lock:
+        _subscribers.setdefault(ticket_id, set()).add(websocket)
+    return _message(ticket, admission.position(ticket))
+
+
+def unsubscribe(websocket: WebSocket) -> None:
+    with _subscribers_lock:
+        for ticket_id in [t for t, sockets in _subscribers.items() if websocket in sockets]:
+            sockets = _subscribers[ticket_id]
+            sockets.discard(websocket)
+            if not sockets:
+                del _subscribers[ticket_id]
+                _last_sent.pop(ticket_id, None)
+
+
+def _notify_subscribers(positions: bool) -> None:
+    """
+    Рассылка подписчикам: смена статуса — сразу, позиция — только при
+    positions=True (не чаще ADMISSION_NOTIFY_INTERVAL).
+    """
+    with _subscribers_lock:
+        items = [(ticket_id, list(sockets)) for ticket_id, sockets in _subscribers.items()]
+    for ticket_id, sockets in items:
+        ticket = admission.get(ticket_id)
+        if ticket is None:
+            # билет удалён по ticket_ttl
+            with _subscribers_lock:
+                _subscribers.pop(ticket_id, None)
+            _last_sent.pop(ticket_id, None)
+            continue
+        position = admission.position(ticket)
+        last = _last_sent.get(ticket_id)
+        if last is not None and last[0] == ticket.status and (not positions or last[1] == position):
+            continue
+        _last_sent[ticket_id] = (ticket.status, position)
+        message = _message(ticket, position)
+        for websocket in sockets:
+            ws_manager.send_from_thread(websocket, message)
+
+
+def admit_once() -> int:
+    """Допускает очередную порцию билетов через обычный join. Возвращает их число."""
+    tickets = admission.take()
+    if not tickets:
+        return 0
+    db = SessionLocal()
+    try:
+        for ticket in tickets:
+            user = user_repo.get_by_id(db, ticket.user_id)
+            if user is None:
+                admission.finish(ticket, REJECTED, "Пользователь не найден")
+                continue
+            try:
+                event_service.join_event(db, ticket.event_id, user)
+            except HTTPException as exc:
+                # отказ — этому билету; остальным отказываем, только если событие
+                # недоступно или мест нет и по свежему счётчику
+                event = event_repo.get_event(db, ticket.event_id)
+                if event is None or event.is_deleted or event.end_date < datetime.utcnow():
+                    admission.reject_all(ticket.event_id, exc.detail)
+                    admission.finish(ticket, REJECTED, exc.detail)
+                else:
+                    admission.finish(ticket, REJECTED, exc.detail, remaining=event_service.spots_left(db, event))
+                continue
+            except Exception:
+                logger.exception("[ADMISSION] не удалось записать по билету %s", ticket.id)
+                db.rollback()
+                admission.finish(ticket, REJECTED, "Не удалось записаться, попробуйте ещё раз")
+                continue
+            # точный остаток после записи: счётчик шардов события уже сброшен
+            event = event_repo.get_event(db, ticket.event_id)
+            admission.finish(ticket, JOINED, remaining=event_service.spots_left(db, event))
+    finally:
+        db.close()
+    return len(tickets)
+
+
+class AdmissionWorker:
+    """
+    Фоновый поток: пока есть ожидающие билеты, раз в tick допускает
+    порцию и рассылает подписчикам изменения; без очереди спит до notify().
+    """
+
+    def __init__(self, tick: float):
+        self.tick = tick
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+        self._last_positions = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="admission-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _step(self) -> None:
+        admit_once()
+        now = time.monotonic()
+        positions = now - self._last_positions >= settings.ADMISSION_NOTIFY_INTERVAL
+        if positions:
+            self._last_positions = now
+        _notify_subscribers(positions)
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            admission.purge()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            # после ошибки — повтор через tick
+            busy = True
+            try:
+                self._step()
+                busy = admission.has_waiting()
+            except Exception:
+                logger.exception("[ADMISSION] ошибка потока допуска")
+            if busy:
+                self._stop.wait(self.tick)
+            else:
+                self._wakeup.wait(PURGE_INTERVAL)
+
+
+worker = AdmissionWorker(tick=0.1)
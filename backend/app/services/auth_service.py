@@ -9,8 +9,10 @@ from sqlalchemy.orm import Session
 from app.core.security import hash_password, verify_password, create_access_token
 from app.core import email_utils
 from app.config import settings
+from app.db.base import transaction
 from app.db.models import User
 from app.repositories import user_repo, auth_repo
+from app.services import outbox_service
 from app.schemas.auth import (
     RegisterRequest,
     LoginRequest,
@@ -34,33 +36,34 @@ def _generate_reset_token() -> str:
 
 def register_user(db: Session, data: RegisterRequest):
     existing = user_repo.get_by_email(db, data.email)
+    if existing and existing.is_active:
+        raise ValueError("Пользователь с такой почтой уже существует")
     password_hash = hash_password(_trim_password(data.password))
 
-    if existing:
-        if existing.is_active:
-            raise ValueError("Пользователь с такой почтой уже существует")
-        # Пользователь не активирован — обновляем данные и шлём новый код
-        existing.full_name = data.full_name
-        existing.password_hash = password_hash
-        existing.is_active = False
-        db.add(existing)
-        db.commit()
-        db.refresh(existing)
-        auth_repo.invalidate_email_codes_for_user(db, existing)
-        user = existing
-    else:
-        user = user_repo.create_user(
-            db=db,
-            full_name=data.full_name,
-            email=data.email,
-            password_hash=password_hash,
+    with transaction(db):
+        if existing:
+            # Пользователь не активирован — обновляем данные и шлём новый код
+            existing.full_name = data.full_name
+            existing.password_hash = password_hash
+            existing.is_active = False
+            db.add(existing)
+            auth_repo.invalidate_email_codes_for_user(db, existing)
+            user = existing
+        else:
+            user = user_repo.create_user(
+                db=db,
+                full_name=data.full_name,
+                email=data.email,
+                password_hash=password_hash,
+            )
+
+        code = _generate_code()
+        expires_at = datetime.utcnow() + timedelta(hours=24)
+        record = auth_repo.create_email_code(db, user, code, expires_at)
+        outbox_service.enqueue_email(
+            db, "confirmation_code", user.email, {"code": code}, key=f"confirm:{record.id}"
         )
-
-    code = _generate_code()
-    expires_at = datetime.utcnow() + timedelta(hours=24)
-    auth_repo.create_email_code(db, user, code, expires_at)
-
-    email_utils.send_confirmation_code(user.email, code)
+    outbox_service.notify()
 
 
 
@@ -73,9 +76,13 @@ def confirm_email(db: Session, email: str, code: str):
     if not record:
         raise ValueError("Неверный или истёкший код подтверждения")
 
-    auth_repo.mark_email_code_used(db, record)
-    user_repo.activate_user(db, user)
-    email_utils.send_welcome_email(user.email, user.full_name)
+    with transaction(db):
+        auth_repo.mark_email_code_used(db, record)
+        user_repo.activate_user(db, user)
+        outbox_service.enqueue_email(
+            db, "welcome", user.email, {"full_name": user.full_name}, key=f"welcome:{record.id}"
+        )
+    outbox_service.notify()
 
 
 def login_user(db: Session, data: LoginRequest) -> str:
@@ -101,9 +108,12 @@ def request_password_reset(db: Session, email: str):
 
     token = _generate_reset_token()
     expires_at = datetime.utcnow() + timedelta(hours=24)
-    auth_repo.create_reset_token(db, user, token, expires_at)
-
-    email_utils.send_reset_code(user.email, token)
+    with transaction(db):
+        reset = auth_repo.create_reset_token(db, user, token, expires_at)
+        outbox_service.enqueue_email(
+            db, "reset_code", user.email, {"code": token}, key=f"reset:{reset.id}"
+        )
+    outbox_service.notify()
 
 
 def reset_password(db: Session, data: ResetPasswordRequest):
@@ -113,10 +123,17 @@ def reset_password(db: Session, data: ResetPasswordRequest):
 
     user: User = record.user
     new_hash = hash_password(_trim_password(data.new_password))
-    user_repo.update_password(db, user, new_hash)
-
-    auth_repo.mark_reset_token_used(db, record)
-    email_utils.send_password_changed(user.email)
+    with transaction(db):
+        user_repo.update_password(db, user, new_hash)
+        auth_repo.mark_reset_token_used(db, record)
+        outbox_service.enqueue_email(
+            db,
+            "password_changed",
+            user.email,
+            {"new_password_block": ""},
+            key=f"password-changed:{record.id}",
+        )
+    outbox_service.notify()
 
 
 def verify_reset_code(db: Session, email: str, token: str):
@@ -127,7 +144,9 @@ def verify_reset_code(db: Session, email: str, token: str):
 
 def admin_reset_password(db: Session, user: User, new_password: str):
     new_hash = hash_password(_trim_password(new_password))
-    user_repo.update_password(db, user, new_hash)
+    with transaction(db):
+        user_repo.update_password(db, user, new_hash)
+    # письмо содержит сам пароль — в outbox его не сохраняем, отправляем напрямую
     email_utils.send_password_changed(user.email, new_password)
 
 
@@ -140,8 +159,7 @@ def change_email(db: Session, user: User, data: ChangeEmailRequest):
     if existing and existing.id != user.id:
         raise ValueError("Этот email уже используется другим пользователем")
 
-    user.email = data.new_email
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    with transaction(db):
+        user.email = data.new_email
+        db.add(user)
     return user
@@ -1,26 +1,218 @@
-from datetime import datetime
-from typing import Optional
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import random
+import re
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
 from uuid import UUID
 
+from pydantic import ValidationError
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
+from app.config import settings
 from app.core import email_utils
+from app.core.cache import TTLCache
+from app.core.calendar import CalendarFeed
+from app.core.catalog import CatalogRecord, CatalogSnapshot, EventCatalog
+from app.core.facets import FacetIndex
+from app.core.group_commit import GroupCommitWriter
+from app.core.geo import GeoIndex
+from app.core.recommendations import RecommendationIndex
+from app.core.seats import SeatPool
+from app.db.base import SessionLocal, async_session_factory, transaction
 from app.db.models import Event
-from app.repositories import event_repo, user_repo
-from app.core.ws_manager import ws_manager
-from app.schemas.event import EventCreateRequest, EventResponse, EventUpdateRequest
+from app.repositories import async_event_repo, event_repo, outbox_repo, search_repo, user_repo
+from app.services import outbox_service
+from app.schemas.event import (
+    BulkImportResponse,
+    BulkParticipantsItem,
+    BulkParticipantsResponse,
+    BulkRowError,
+    EventChangeItem,
+    EventChangesResponse,
+    EventCreateRequest,
+    EventPageResponse,
+    EventResponse,
+    EventUpdateRequest,
+    NearbyEventResponse,
+    ParticipantResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк импорта пишем в одной транзакции
+BULK_CHUNK_SIZE = 500
+
+# (номер строки, данные, ошибка разбора)
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+# Как часто (сек) воркер пересчитывает статус «past» по датам
+PAST_SWEEP_INTERVAL = 60
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+# user_id -> {(section, limit, cursor): (события, следующий курсор)}
+my_events_cache = TTLCache(ttl=settings.MY_EVENTS_CACHE_TTL)
+
+# Счётчики для фасетов города/категории/статуса
+facet_index = FacetIndex(rebuild_interval=settings.FACETS_REBUILD_INTERVAL)
+
+# Признаки для рекомендаций (популярность, город, категория)
+recommendation_index = RecommendationIndex(refresh_interval=settings.RECOMMENDATIONS_REFRESH_INTERVAL)
+
+# Сетка координат событий для поиска «рядом со мной»
+geo_index = GeoIndex(rebuild_interval=settings.GEO_INDEX_REBUILD_INTERVAL)
+
+# ICS-ленты по городам
+calendar_feed = CalendarFeed(rebuild_interval=settings.CALENDAR_REBUILD_INTERVAL)
+
+# event_id -> {(participants_limit, related_limit): EventPageResponse} для анонимов
+event_page_cache = TTLCache(ttl=settings.EVENT_PAGE_CACHE_TTL, maxsize=1000)
+
+# Снимок каталога для публичного чтения /events и /events/{id}
+catalog = EventCatalog(max_staleness=settings.CATALOG_MAX_STALENESS)
+_catalog_refreshing = False
+
+# Места горячих событий, зарезервированные этим воркером, и кэш сумм
+# шардов счётчика участников: event_id -> (число участников, версия)
+seat_pool = SeatPool(batch=settings.SEAT_RESERVATION_BATCH)
+participant_counter_cache = TTLCache(ttl=settings.PARTICIPANT_COUNTER_CACHE_TTL)
+
+
+def _write_participant_logs(rows: List[dict]) -> None:
+    db = SessionLocal()
+    try:
+        with transaction(db):
+            event_repo.insert_participant_logs(db, rows)
+    finally:
+        db.close()
+
+
+def _committed_participant_logs(rows: List[dict]) -> List[dict]:
+    """
+    Досылка spool: строки закоммиченных транзакций. В той же транзакции в
+    outbox легло WS-сообщение с ключом participant:<id>; нет сообщения —
+    транзакция откатилась или не дошла до commit. Сообщения старше
+    OUTBOX_RETENTION_HOURS уже могли удалить — такие строки досылаются.
+    """
+    horizon = (datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)).isoformat()
+    db = SessionLocal()
+    try:
+        known = outbox_repo.existing_keys(db, [f"participant:{row['id']}" for row in rows])
+    finally:
+        db.close()
+    return [row for row in rows if f"participant:{row['id']}" in known or row["created_at"] < horizon]
+
+
+# Журнал участия в режиме PARTICIPANT_LOG_MODE=group. Поток и каталог spool
+# создаются только в этом режиме; в режиме transaction при старте лишь
+# досылаются сегменты, оставшиеся от работы в group (см. app/main.py)
+participant_log_writer = GroupCommitWriter(
+    "participant-log",
+    _write_participant_logs,
+    max_batch=settings.PARTICIPANT_LOG_BATCH,
+    interval=settings.PARTICIPANT_LOG_INTERVAL,
+    spool_dir=settings.SPOOL_DIR,
+    fsync=settings.PARTICIPANT_LOG_FSYNC,
+    committed=_committed_participant_logs,
+)
+# строки журнала, записанные в spool в ещё не закоммиченной транзакции (Session.info)
+_STAGED_LOGS = "participant_logs"
+
+
+def _facet_key(event: Event):
+    if event.is_deleted:
+        return None
+    return (event.status, event.city, event.category)
+
+
+def _recommend_put(event_id: UUID, status: str, city: str, category: str, count: int) -> None:
+    """Прошедшие события из рекомендаций убираем (удалённые — recommendation_index.remove)."""
+    if status == "past":
+        recommendation_index.remove(event_id)
+    else:
+        recommendation_index.put(event_id, city, category, count)
+
+
+def _invalidate_user_events(user_ids: Optional[Iterable[UUID]] = None) -> None:
+    """Сбрасываем кэш «мои события»: для указанных пользователей или целиком."""
+    if user_ids is None:
+        my_events_cache.clear()
+        return
+    for user_id in user_ids:
+        my_events_cache.invalidate(user_id)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Даты в БД — наивное UTC; параметры с часовым поясом приводим к нему."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _today() -> datetime:
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def _sweep_due() -> bool:
+    global _last_sweep
+    now = time.monotonic()
+    with _sweep_lock:
+        if now - _last_sweep < PAST_SWEEP_INTERVAL:
+            return False
+        _last_sweep = now
+        return True
+
+
+def _after_sweep(updated: int) -> None:
+    if updated:
+        _invalidate_user_events()
+        facet_index.reset()
+        recommendation_index.reset()
+        catalog.mark_dirty()
+
+
+def _changes_retention_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=settings.CHANGE_FEED_RETENTION_HOURS)
 
 
 def _touch_past_events(db: Session) -> None:
-    """Автоматически помечаем прошедшие события (по дате)."""
-    now = datetime.utcnow()
-    events = event_repo.list_events(db, include_deleted=False)
-    for ev in events:
-        if _calc_status(ev.start_date, ev.end_date, now) == "past" and ev.status != "past":
-            ev.status = "past"
-            db.add(ev)
-    db.commit()
+    """
+    Автоматически помечаем прошедшие события (по дате): одним UPDATE
+    и не чаще раза в PAST_SWEEP_INTERVAL вместо перебора всех событий.
+    Заодно чистим старые записи ленты изменений и сворачиваем шарды
+    счётчиков событий, с которых сняли high_demand.
+    """
+    if not _sweep_due():
+        return
+    with transaction(db):
+        updated = event_repo.mark_past_events(db, _today())
+        event_repo.purge_changes(db, _changes_retention_cutoff())
+        event_repo.fold_counter_shards(db)
+    _after_sweep(updated)
+
+
+async def _touch_past_events_async(db: AsyncSession) -> None:
+    if not _sweep_due():
+        return
+    updated = await async_event_repo.mark_past_events(db, _today())
+    await async_event_repo.purge_changes(db, _changes_retention_cutoff())
+    await async_event_repo.fold_counter_shards(db)
+    await db.commit()
+    _after_sweep(updated)
 
 
 def _calc_status(start: datetime, end: datetime, now: datetime) -> str:
@@ -32,7 +224,7 @@ def _calc_status(start: datetime, end: datetime, now: datetime) -> str:
     return "active"
 
 
-def _as_response(event: Event) -> EventResponse:
+def _as_response(event: Event, participant_ids: Optional[List[UUID]] = None) -> EventResponse:
     return EventResponse(
         id=event.id,
         title=event.title,
@@ -42,18 +234,175 @@ def _as_response(event: Event) -> EventResponse:
         end_date=event.end_date,
         image_url=event.image_url,
         city=event.city,
+        category=event.category,
+        latitude=event.latitude,
+        longitude=event.longitude,
         payment_info=event.payment_info,
         max_participants=event.max_participants,
+        high_demand=event.high_demand,
         status=event.status,
         is_deleted=event.is_deleted,
-        participants=[p.id for p in event.participants],
+        participants=(
+            participant_ids if participant_ids is not None else [p.id for p in event.participants]
+        ),
+    )
+
+
+def _responses_from_pairs(events: List[Event], pairs: Iterable[tuple]) -> List[EventResponse]:
+    by_event: dict = {}
+    for event_id, user_id in pairs:
+        by_event.setdefault(event_id, []).append(user_id)
+    return [_as_response(ev, by_event.get(ev.id, [])) for ev in events]
+
+
+def _as_responses(db: Session, events: List[Event]) -> List[EventResponse]:
+    """Участники всех событий одним запросом вместо ленивой загрузки на каждое."""
+    return _responses_from_pairs(events, event_repo.get_participant_pairs(db, [ev.id for ev in events]))
+
+
+async def _as_responses_async(db: AsyncSession, events: List[Event]) -> List[EventResponse]:
+    pairs = await async_event_repo.get_participant_pairs(db, [ev.id for ev in events])
+    return _responses_from_pairs(events, pairs)
+
+
+def _encode_cursor(event: Event) -> str:
+    return f"{event.start_date.isoformat()}_{event.id}"
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        start, event_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(start), UUID(event_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+
+def _date_window(
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    date_from, date_to = _naive_utc(date_from), _naive_utc(date_to)
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from должен быть не позже to")
+    return date_from, date_to
+
+
+# Синхронные list_events / get_event / list_user_events — для админских
+# сценариев и фоновых задач, у которых уже есть Session; HTTP-роуты читают
+# через *_async
+def list_events(
+    db: Session,
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> list[EventResponse]:
+    date_from, date_to = _date_window(date_from, date_to)
+    _touch_past_events(db)
+    events = event_repo.list_events(
+        db,
+        status=status,
+        include_deleted=False,
+        city=city,
+        category=category,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return _as_responses(db, events)
+
+
+def nearby_events(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_km: Optional[float] = None,
+    limit: int = 20,
+) -> List[NearbyEventResponse]:
+    """
+    Ближайшие незавершённые события: в радиусе radius_km или, если радиус
+    не задан, k = limit ближайших. Порядок — по расстоянию.
+    """
+    if geo_index.needs_load():
+        geo_index.load(event_repo.geo_points(db))
+    now = datetime.utcnow()
+    if radius_km is not None:
+        found = geo_index.within(lat, lon, radius_km, limit=limit, not_ended_before=now)
+    else:
+        found = geo_index.nearest(lat, lon, limit, not_ended_before=now)
+    distances = {event_id: distance for distance, event_id in found}
+    events = event_repo.get_events_by_ids(db, [event_id for _, event_id in found])
+    return [
+        NearbyEventResponse(**response.model_dump(), distance_km=round(distances[response.id], 3))
+        for response in _as_responses(db, events)
+    ]
+
+
+async def list_events_async(
+    db: AsyncSession,
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> List[EventResponse]:
+    """То же, что list_events, но из снимка каталога в памяти (см. _catalog_snapshot)."""
+    date_from, date_to = _date_window(date_from, date_to)
+    await _touch_past_events_async(db)
+    snapshot = await _catalog_snapshot(db)
+    records = snapshot.query(
+        status=status, city=city, category=category, date_from=date_from, date_to=date_to
     )
+    return [_record_response(record) for record in records]
 
 
-def list_events(db: Session, status: Optional[str] = None) -> list[EventResponse]:
+def get_city_calendar(db: Session, city: str) -> Tuple[bytes, str]:
+    """ICS-лента событий города и её ETag."""
+    if calendar_feed.needs_load(city):
+        calendar_feed.load(city, event_repo.list_city_events(db, city))
+    return calendar_feed.body(city)
+
+
+def search_events(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+) -> Tuple[List[EventResponse], int]:
+    """Поиск по названию и описаниям: страница результатов по релевантности и общее число."""
+    event_ids, total = search_repo.search_event_ids(db, query, limit=limit, offset=offset)
+    events = event_repo.get_events_by_ids(db, event_ids)
+    return _as_responses(db, events), total
+
+
+def recommend_events(
+    db: Session,
+    user=None,
+    city: Optional[str] = None,
+    limit: int = 10,
+) -> List[EventResponse]:
+    """
+    Рекомендации: город пользователя, предпочтения по категориям из истории
+    участия и популярность. Уже выбранные события не предлагаем.
+    """
+    if recommendation_index.needs_refresh():
+        recommendation_index.load(event_repo.recommendation_candidates(db))
+    affinity: dict = {}
+    joined: set = set()
+    if user is not None:
+        for event_id, category in event_repo.user_event_categories(db, user.id):
+            joined.add(event_id)
+            affinity[category] = affinity.get(category, 0) + 1
+    event_ids = recommendation_index.top(limit, city=city, affinity=affinity, exclude=joined)
+    return _as_responses(db, event_repo.get_events_by_ids(db, event_ids))
+
+
+def get_event_facets(db: Session, status: Optional[str] = None) -> dict:
+    """Количество событий по городам/категориям/статусам из FacetIndex, без GROUP BY на запрос."""
     _touch_past_events(db)
-    events = event_repo.list_events(db, status=status, include_deleted=False)
-    return [_as_response(ev) for ev in events]
+    if facet_index.needs_load():
+        facet_index.load(event_repo.facet_counts(db))
+    return facet_index.counts(status)
 
 
 def get_event(db: Session, event_id: UUID) -> Optional[EventResponse]:
@@ -64,10 +413,196 @@ def get_event(db: Session, event_id: UUID) -> Optional[EventResponse]:
     return _as_response(ev)
 
 
-def list_user_events(db: Session, user) -> list[EventResponse]:
+async def get_event_async(db: AsyncSession, event_id: UUID) -> Optional[EventResponse]:
+    await _touch_past_events_async(db)
+    record = (await _catalog_snapshot(db)).get(event_id)
+    if record is not None:
+        return _record_response(record)
+    # событие другого воркера, ещё не попавшее в снимок
+    ev = await async_event_repo.get_event(db, event_id)
+    if not ev:
+        return None
+    return (await _as_responses_async(db, [ev]))[0]
+
+
+def _record_response(record: CatalogRecord) -> EventResponse:
+    # записи снимка неизменяемы — ответ строим один раз на запись
+    response = record.response
+    if response is None:
+        response = record.response = _as_response(record, list(record.participants))
+    return response
+
+
+async def _catalog_records(db: AsyncSession, events: List[Event]) -> List[CatalogRecord]:
+    by_event: dict = {}
+    for event_id, user_id in await async_event_repo.get_participant_pairs(db, [ev.id for ev in events]):
+        by_event.setdefault(event_id, []).append(user_id)
+    return [CatalogRecord(ev, by_event.get(ev.id, ())) for ev in events]
+
+
+async def _refresh_catalog(db: AsyncSession) -> None:
+    """
+    Догоняем снимок по ленте изменений: перечитываем только события с
+    записями после snapshot.seq. Если журнал уже очищен дальше seq (или
+    снимка нет) — загружаем каталог целиком.
+    """
+    catalog.begin_refresh()
+    started = time.perf_counter()
+    snapshot = catalog.snapshot
+    if snapshot is not None:
+        low, _ = await async_event_repo.change_bounds(db)
+        if low is None or snapshot.seq >= low - 1:
+            fresh = await async_event_repo.first_fresh_change(db, _safety_horizon())
+            since, changed = snapshot.seq, {}
+            while True:
+                rows = await async_event_repo.changes_since(db, since, settings.CATALOG_REFRESH_BATCH)
+                for row in rows:
+                    changed[row.event_id] = None
+                if rows:
+                    since = rows[-1].seq
+                if len(rows) < settings.CATALOG_REFRESH_BATCH:
+                    break
+            # как и в ленте: не обгоняем записи моложе CHANGE_FEED_SAFETY_LAG
+            seq = since if fresh is None else max(snapshot.seq, min(since, fresh - 1))
+            events = await async_event_repo.get_events_by_ids(db, list(changed))
+            records = await _catalog_records(db, events)
+            catalog.apply(records, seq, time.perf_counter() - started)
+            return
+    seq = await change_cursor_async(db)
+    events = await async_event_repo.list_events(db, include_deleted=True)
+    catalog.load(await _catalog_records(db, events), seq, time.perf_counter() - started)
+
+
+async def _catalog_snapshot(db: AsyncSession) -> CatalogSnapshot:
+    """
+    Текущий снимок каталога; устаревший обновляется прямо в запросе.
+    Пока один запрос обновляет, остальные читают предыдущий снимок.
+    """
+    global _catalog_refreshing
+    if catalog.needs_refresh() and not (_catalog_refreshing and catalog.snapshot is not None):
+        _catalog_refreshing = True
+        try:
+            await _refresh_catalog(db)
+        finally:
+            _catalog_refreshing = False
+    return catalog.snapshot
+
+
+def catalog_freshness() -> dict:
+    return catalog.freshness()
+
+
+async def change_cursor_async(db: AsyncSession) -> int:
+    """
+    Курсор ленты, с которого клиент продолжит после полной загрузки /events:
+    берётся до чтения списка, так что пропустить изменение нельзя (только
+    получить повторно).
+    """
+    fresh = await async_event_repo.first_fresh_change(db, _safety_horizon())
+    if fresh is not None:
+        return fresh - 1
+    _, high = await async_event_repo.change_bounds(db)
+    return high or 0
+
+
+def _safety_horizon() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.CHANGE_FEED_SAFETY_LAG)
+
+
+async def list_changes_async(db: AsyncSession, since: int, limit: int) -> EventChangesResponse:
+    """
+    Изменения событий после since: по событию — его текущее состояние или
+    tombstone. next_since не обгоняет записи моложе CHANGE_FEED_SAFETY_LAG,
+    поэтому свежие изменения могут прийти повторно — клиент применяет их по id.
+    """
+    await _touch_past_events_async(db)
+    low, _ = await async_event_repo.change_bounds(db)
+    if low is not None and since < low - 1:
+        raise HTTPException(status_code=410, detail="Журнал изменений уже очищен, загрузите события заново")
+    fresh = await async_event_repo.first_fresh_change(db, _safety_horizon())
+    rows = await async_event_repo.changes_since(db, since, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_since = rows[-1].seq if rows else since
+    if fresh is not None and fresh - 1 < next_since:
+        next_since = max(since, fresh - 1)
+        has_more = False
+    events = await async_event_repo.get_events_by_ids(db, [row.event_id for row in rows])
+    live = [ev for ev in events if not ev.is_deleted]
+    responses = {item.id: item for item in await _as_responses_async(db, live)}
+    changes = [
+        EventChangeItem(
+            seq=row.seq,
+            event_id=row.event_id,
+            deleted=row.event_id not in responses,
+            event=responses.get(row.event_id),
+        )
+        for row in rows
+    ]
+    return EventChangesResponse(changes=changes, next_since=next_since, has_more=has_more)
+
+
+def _check_section(section: Optional[str]) -> None:
+    if section not in (None, "upcoming", "past"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="section: upcoming или past")
+
+
+def list_user_events(
+    db: Session,
+    user,
+    section: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[EventResponse], Optional[str]]:
+    """События пользователя (все или раздел upcoming/past) и курсор следующей страницы."""
+    _check_section(section)
     _touch_past_events(db)
-    events = event_repo.list_events_by_user(db, user)
-    return [_as_response(ev) for ev in events]
+    key = (section, limit, cursor)
+    cached = my_events_cache.get(user.id) or {}
+    if key in cached:
+        return cached[key]
+
+    events = event_repo.list_events_by_user(
+        db,
+        user,
+        section=section,
+        today=_today(),
+        limit=limit,
+        cursor=_decode_cursor(cursor) if cursor else None,
+    )
+    next_cursor = _encode_cursor(events[-1]) if limit and len(events) == limit else None
+    result = (_as_responses(db, events), next_cursor)
+    my_events_cache.set(user.id, {**cached, key: result})
+    return result
+
+
+async def list_user_events_async(
+    db: AsyncSession,
+    user,
+    section: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[EventResponse], Optional[str]]:
+    _check_section(section)
+    await _touch_past_events_async(db)
+    key = (section, limit, cursor)
+    cached = my_events_cache.get(user.id) or {}
+    if key in cached:
+        return cached[key]
+
+    events = await async_event_repo.list_events_by_user(
+        db,
+        user.id,
+        section=section,
+        today=_today(),
+        limit=limit,
+        cursor=_decode_cursor(cursor) if cursor else None,
+    )
+    next_cursor = _encode_cursor(events[-1]) if limit and len(events) == limit else None
+    result = (await _as_responses_async(db, events), next_cursor)
+    my_events_cache.set(user.id, {**cached, key: result})
+    return result
 
 
 def create_event(db: Session, data: EventCreateRequest) -> EventResponse:
@@ -76,54 +611,304 @@ def create_event(db: Session, data: EventCreateRequest) -> EventResponse:
         participants = user_repo.get_by_ids(db, data.participant_ids)
     now = datetime.utcnow()
     status = _calc_status(data.start_date, data.end_date, now)
-    event = event_repo.create_event(
-        db=db,
-        title=data.title,
-        short_description=data.short_description,
-        description=data.description,
-        start_date=data.start_date,
-        end_date=data.end_date,
-        image_url=data.image_url,
-        city=data.city,
-        payment_info=data.payment_info,
-        max_participants=data.max_participants,
-        participants=participants,
-        status=status,
-    )
+    with transaction(db):
+        event = event_repo.create_event(
+            db=db,
+            title=data.title,
+            short_description=data.short_description,
+            description=data.description,
+            start_date=data.start_date,
+            end_date=data.end_date,
+            image_url=data.image_url,
+            city=data.city,
+            category=data.category,
+            latitude=data.latitude,
+            longitude=data.longitude,
+            payment_info=data.payment_info,
+            max_participants=data.max_participants,
+            high_demand=data.high_demand,
+            participants=participants,
+            status=status,
+        )
+        event_repo.record_changes(db, [event.id])
+        _enqueue_invitations(db, event, [(p.id, p.email) for p in participants])
+    outbox_service.notify()
+    catalog.mark_dirty()
+    facet_index.apply(None, _facet_key(event))
+    calendar_feed.upsert(event)
+    geo_index.put(event.id, event.latitude, event.longitude, event.end_date)
+    _recommend_put(event.id, event.status, event.city, event.category, len(participants))
     if participants:
-        email_utils.send_event_notification([p.email for p in participants], event)
+        _invalidate_user_events(p.id for p in participants)
     return _as_response(event)
 
 
+def _enqueue_invitations(db: Session, event, recipients: List[Tuple[UUID, str]]) -> None:
+    """Приглашения участникам — в outbox, в текущей транзакции."""
+    if recipients:
+        outbox_service.enqueue_emails(
+            db,
+            "event_invitation",
+            [(email, f"invite:{event.id}:{user_id}") for user_id, email in recipients],
+            email_utils.event_values(event),
+        )
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _csv_row(row: dict) -> dict:
+    data = {
+        key.strip(): value.strip() if isinstance(value, str) else value
+        for key, value in row.items()
+        if key
+    }
+    data = {key: value for key, value in data.items() if value not in ("", None)}
+    ids = data.get("participant_ids")
+    if isinstance(ids, str):
+        data["participant_ids"] = [part for part in re.split(r"[;,\s]+", ids) if part]
+    return data
+
+
+def iter_import_rows(stream: BinaryIO, fmt: str) -> Iterator[ImportRow]:
+    """Построчно читаем NDJSON/CSV, не загружая файл в память целиком."""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(text_stream), start=1):
+            yield row_number, _csv_row(row), None
+        return
+    for row_number, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, None, "Некорректный JSON"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Ожидается JSON-объект"
+            continue
+        yield row_number, data, None
+
+
+def _import_chunk(
+    db: Session,
+    chunk: List[Tuple[int, EventCreateRequest]],
+    created_ids: List[UUID],
+    errors: List[BulkRowError],
+) -> None:
+    emails = user_repo.get_emails_by_ids(
+        db, {uid for _, item in chunk for uid in item.participant_ids}
+    )
+    now = datetime.utcnow()
+    events, pairs, accepted = [], [], []
+    for row_number, item in chunk:
+        participant_ids = list(dict.fromkeys(item.participant_ids))
+        missing = [str(uid) for uid in participant_ids if uid not in emails]
+        if missing:
+            errors.append(BulkRowError(row=row_number, error=f"Пользователи не найдены: {', '.join(missing)}"))
+            continue
+        if item.max_participants is not None and len(participant_ids) > item.max_participants:
+            errors.append(BulkRowError(row=row_number, error="Участников больше, чем max_participants"))
+            continue
+        event_id = uuid.uuid4()
+        events.append(
+            {
+                **item.model_dump(exclude={"participant_ids"}),
+                "id": event_id,
+                "status": _calc_status(item.start_date, item.end_date, now),
+                "participants_count": len(participant_ids),
+            }
+        )
+        pairs.extend({"event_id": event_id, "user_id": uid} for uid in participant_ids)
+        accepted.append((row_number, event_id, item, [(uid, emails[uid]) for uid in participant_ids]))
+
+    if not events:
+        return
+    try:
+        with transaction(db):
+            event_repo.bulk_create_events(db, events, pairs)
+            event_repo.record_changes(db, [event["id"] for event in events])
+            for _, event_id, item, recipients in accepted:
+                _enqueue_invitations(db, SimpleNamespace(id=event_id, **item.model_dump()), recipients)
+    except SQLAlchemyError:
+        logger.exception("[BULK] не удалось сохранить пакет событий")
+        errors.extend(BulkRowError(row=row_number, error="Не удалось сохранить пакет") for row_number, *_ in accepted)
+        return
+    _invalidate_user_events({pair["user_id"] for pair in pairs})
+    catalog.mark_dirty()
+    for event in events:
+        facet_index.apply(None, (event["status"], event["city"], event["category"]))
+    for city in {event["city"] for event in events}:
+        calendar_feed.invalidate(city)
+    for event in events:
+        geo_index.put(event["id"], event["latitude"], event["longitude"], event["end_date"])
+        _recommend_put(event["id"], event["status"], event["city"], event["category"], event["participants_count"])
+    created_ids.extend(event_id for _, event_id, *_ in accepted)
+
+
+def bulk_import_events(
+    db: Session,
+    rows: Iterable[ImportRow],
+) -> BulkImportResponse:
+    """
+    Потоковый импорт событий: строки валидируются по одной, вставляются
+    пакетами по BULK_CHUNK_SIZE, ошибки возвращаются по номерам строк.
+    Приглашения пишутся в outbox в транзакции своего пакета.
+    """
+    created_ids: List[UUID] = []
+    errors: List[BulkRowError] = []
+    chunk: List[Tuple[int, EventCreateRequest]] = []
+    for row_number, data, error in rows:
+        if error:
+            errors.append(BulkRowError(row=row_number, error=error))
+            continue
+        try:
+            chunk.append((row_number, EventCreateRequest(**data)))
+        except ValidationError as e:
+            errors.append(BulkRowError(row=row_number, error=_validation_message(e)))
+            continue
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            _import_chunk(db, chunk, created_ids, errors)
+            chunk = []
+    if chunk:
+        _import_chunk(db, chunk, created_ids, errors)
+
+    outbox_service.notify()
+    errors.sort(key=lambda e: e.row)
+    return BulkImportResponse(
+        created=len(created_ids),
+        failed=len(errors),
+        event_ids=created_ids,
+        errors=errors,
+    )
+
+
+def bulk_assign_participants(
+    db: Session,
+    items: List[BulkParticipantsItem],
+) -> BulkParticipantsResponse:
+    """Массовое добавление участников: по паре запросов на пакет вместо загрузки каждого события."""
+    added = 0
+    errors: List[BulkRowError] = []
+    for offset in range(0, len(items), BULK_CHUNK_SIZE):
+        chunk = items[offset:offset + BULK_CHUNK_SIZE]
+        event_ids = list({item.event_id for item in chunk})
+        events = {ev.id: ev for ev in event_repo.get_events_brief(db, event_ids)}
+        existing: dict = {}
+        for event_id, user_id in event_repo.get_participant_pairs(db, event_ids):
+            existing.setdefault(event_id, set()).add(user_id)
+        emails = user_repo.get_emails_by_ids(db, {uid for item in chunk for uid in item.user_ids})
+
+        pairs, pending = [], []
+        for row_number, item in enumerate(chunk, start=offset + 1):
+            event = events.get(item.event_id)
+            if not event or event.is_deleted:
+                errors.append(BulkRowError(row=row_number, error="Событие не найдено"))
+                continue
+            missing = [str(uid) for uid in item.user_ids if uid not in emails]
+            if missing:
+                errors.append(BulkRowError(row=row_number, error=f"Пользователи не найдены: {', '.join(missing)}"))
+                continue
+            current = existing.setdefault(item.event_id, set())
+            new_ids = [uid for uid in dict.fromkeys(item.user_ids) if uid not in current]
+            if event.max_participants is not None and len(current) + len(new_ids) > event.max_participants:
+                errors.append(BulkRowError(row=row_number, error="Достигнут максимальный лимит участников"))
+                continue
+            current.update(new_ids)
+            pairs.extend({"event_id": event.id, "user_id": uid} for uid in new_ids)
+            pending.append((row_number, event, [(uid, emails[uid]) for uid in new_ids]))
+
+        try:
+            with transaction(db):
+                event_repo.bulk_add_participants(db, pairs)
+                event_repo.record_changes(db, [event.id for _, event, recipients in pending if recipients])
+                for _, event, recipients in pending:
+                    _enqueue_invitations(db, event, recipients)
+        except SQLAlchemyError:
+            logger.exception("[BULK] не удалось сохранить пакет участников")
+            errors.extend(BulkRowError(row=row_number, error="Не удалось сохранить пакет") for row_number, *_ in pending)
+            continue
+        _invalidate_user_events({pair["user_id"] for pair in pairs})
+        event_page_cache.clear()
+        catalog.mark_dirty()
+        added += sum(len(recipients) for _, _, recipients in pending)
+
+    outbox_service.notify()
+    return BulkParticipantsResponse(added=added, failed=len(errors), errors=errors)
+
+
 def update_event(db: Session, event_id: UUID, data: EventUpdateRequest) -> Optional[EventResponse]:
     event = event_repo.get_event(db, event_id)
     if not event or event.is_deleted:
         return None
-    participants = None
+    old_facet = _facet_key(event)
+    old_city = event.city
+    was_high_demand = event.high_demand
+    add_ids = set(data.add_participant_ids or [])
+    remove_ids = set(data.remove_participant_ids or [])
     if data.participant_ids is not None:
-        participants = user_repo.get_by_ids(db, data.participant_ids)
-    event = event_repo.update_event(
-        db,
-        event,
-        title=data.title,
-        short_description=data.short_description,
-        description=data.description,
-        start_date=data.start_date,
-        end_date=data.end_date,
-        image_url=data.image_url,
-        city=data.city,
-        payment_info=data.payment_info,
-        max_participants=data.max_participants,
-        participants=participants,
-        status=data.status,
-    )
-    # если статус не передан вручную — пересчитываем по датам
-    if data.status is None:
-        now = datetime.utcnow()
-        event.status = _calc_status(event.start_date, event.end_date, now)
-        db.add(event)
-        db.commit()
-        db.refresh(event)
+        # полный список превращаем в дельту относительно текущего состава
+        current = event_repo.get_participant_ids(db, event.id)
+        target = set(data.participant_ids)
+        add_ids |= target - current
+        remove_ids |= current - target
+    add_ids -= remove_ids
+    if add_ids:
+        # несуществующих пользователей молча пропускаем, как и раньше
+        add_ids = set(user_repo.get_emails_by_ids(db, add_ids))
+    # если статус не передан вручную — пересчитываем по датам (до записи, без второго commit)
+    new_status = data.status
+    if new_status is None:
+        new_status = _calc_status(
+            data.start_date or event.start_date,
+            data.end_date or event.end_date,
+            datetime.utcnow(),
+        )
+    with transaction(db):
+        if add_ids or remove_ids:
+            added, removed = event_repo.apply_participant_changes(db, event.id, add_ids, remove_ids)
+            _log_participants(
+                db, event.id, [(uid, "join") for uid in added] + [(uid, "leave") for uid in removed]
+            )
+            db.expire(event, ["participants"])
+        event = event_repo.update_event(
+            db,
+            event,
+            title=data.title,
+            short_description=data.short_description,
+            description=data.description,
+            start_date=data.start_date,
+            end_date=data.end_date,
+            image_url=data.image_url,
+            city=data.city,
+            category=data.category,
+            latitude=data.latitude,
+            longitude=data.longitude,
+            payment_info=data.payment_info,
+            max_participants=data.max_participants,
+            high_demand=data.high_demand,
+            status=new_status,
+        )
+        event_repo.record_changes(db, [event.id])
+    outbox_service.notify()
+    if was_high_demand and not event.high_demand:
+        # аренды остальных воркеров больше не продлеваются и истекут
+        release_seats(db, event.id)
+    facet_index.apply(old_facet, _facet_key(event))
+    if old_city != event.city:
+        calendar_feed.remove(old_city, event.id)
+    calendar_feed.upsert(event)
+    geo_index.put(event.id, event.latitude, event.longitude, event.end_date)
+    _recommend_put(event.id, event.status, event.city, event.category, event.participants_count)
+    # изменения события видны в списках всех участников
+    _invalidate_user_events()
+    event_page_cache.invalidate(event.id)
+    catalog.mark_dirty()
     return _as_response(event)
 
 
@@ -131,7 +916,238 @@ def soft_delete_event(db: Session, event_id: UUID) -> Optional[EventResponse]:
     event = event_repo.get_event(db, event_id)
     if not event:
         return None
-    return _as_response(event_repo.soft_delete_event(db, event))
+    old_facet = _facet_key(event)
+    with transaction(db):
+        event = event_repo.soft_delete_event(db, event)
+        event_repo.record_changes(db, [event.id])
+    facet_index.apply(old_facet, None)
+    calendar_feed.remove(event.city, event.id)
+    geo_index.remove(event.id)
+    recommendation_index.remove(event.id)
+    _invalidate_user_events()
+    event_page_cache.invalidate(event.id)
+    catalog.mark_dirty()
+    return _as_response(event)
+
+
+def _log_participants(db: Session, event_id: UUID, changes: Iterable[Tuple[UUID, str]]) -> None:
+    """
+    Журнал участия и WS-сообщения (в outbox) внутри транзакции, меняющей
+    состав: join/leave и правка списка в update_event. changes — пары
+    (user_id, join|leave). id строки журнала — случайный 63-битный, так что
+    повторная досылка spool не задвоит её. В режиме transaction строки
+    пишутся в этой же транзакции, в режиме group — в spool (с fsync) до
+    commit, а в пачку participant_log_writer попадают после него
+    (_confirm_participant_logs).
+    """
+    created_at = datetime.utcnow().isoformat()
+    rows = [
+        {
+            "id": secrets.randbits(63) or 1,
+            "event_id": str(event_id),
+            "user_id": str(user_id),
+            "action": action,
+            "created_at": created_at,
+        }
+        for user_id, action in changes
+    ]
+    if not rows:
+        return
+    messages = []
+    for row in rows:
+        message = {"type": "participant", "action": row["action"], "event_id": row["event_id"], "user_id": row["user_id"]}
+        messages.append((message, f"participant:{row['id']}"))
+    outbox_service.enqueue_ws_messages(db, messages)
+    if settings.PARTICIPANT_LOG_MODE != "group":
+        event_repo.insert_participant_logs(db, rows)
+        return
+    participant_log_writer.stage(rows)
+    db.info.setdefault(_STAGED_LOGS, []).extend(rows)
+
+
+# Строки group уже в spool: после commit они идут в пачку writer'а, после
+# rollback отбрасываются (в файле остаются, при досылке их отсеет committed)
+@sa_event.listens_for(Session, "after_commit")
+def _confirm_participant_logs(session: Session) -> None:
+    rows = session.info.pop(_STAGED_LOGS, None)
+    if rows:
+        participant_log_writer.confirm(rows)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_participant_logs(session: Session) -> None:
+    rows = session.info.pop(_STAGED_LOGS, None)
+    if rows:
+        participant_log_writer.discard(rows)
+
+
+def _after_participant_change(event_id: UUID, user_id: UUID) -> None:
+    outbox_service.notify()
+    _invalidate_user_events([user_id])
+    event_page_cache.invalidate(event_id)
+    participant_counter_cache.invalidate(event_id)
+    catalog.mark_dirty()
+
+
+def _lease_until() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.SEAT_LEASE_SECONDS)
+
+
+def _take_seat(db: Session, event_id: UUID) -> bool:
+    """
+    Место из пула воркера; пустой пул пополняем партией в отдельной
+    транзакции — партия остаётся за воркером (в его аренде), даже если
+    запись не удастся.
+    """
+    if seat_pool.take(event_id):
+        return True
+    with transaction(db):
+        granted = event_repo.reserve_seats(db, event_id, seat_pool.batch, seat_pool.owner, _lease_until())
+    if not granted:
+        return False
+    seat_pool.reserved(event_id, granted)
+    return True
+
+
+class _LeaseLost(Exception):
+    """Аренду воркера забрали как просроченную: места его пула недействительны."""
+
+
+def _join_hot_event(db: Session, event: Event, user) -> EventResponse:
+    """
+    Запись на горячее событие: место из пула воркера, +1 в случайный шард
+    счётчика. Строка события не обновляется — параллельные записи не ждут
+    её блокировку, а коллекция участников не загружается. Место списывается
+    с аренды воркера в той же транзакции: если аренду уже вернули в лимит,
+    пул сбрасывается и берётся новая партия.
+    """
+    event_id = event.id
+    limited = event.max_participants is not None
+    if event_repo.is_participant(db, event_id, user.id):
+        return _as_response(event, list(event_repo.get_participant_ids(db, event_id)))
+    for _ in range(2):
+        if limited and not _take_seat(db, event_id):
+            break
+        try:
+            with transaction(db):
+                added = event_repo.add_participant(db, event_id, user.id)
+                if added and limited and not event_repo.take_leased_seat(db, event_id, seat_pool.owner):
+                    raise _LeaseLost()
+                if added:
+                    shard = random.randrange(settings.PARTICIPANT_COUNTER_SHARDS)
+                    event_repo.add_to_counter_shard(db, event_id, shard, 1)
+                    event_repo.record_changes(db, [event_id])
+                    _log_participants(db, event_id, [(user.id, "join")])
+        except _LeaseLost:
+            seat_pool.drain(event_id)
+            continue
+        except Exception:
+            if limited:
+                seat_pool.put(event_id)
+            raise
+        if not added:
+            # параллельный запрос того же пользователя успел раньше
+            if limited:
+                seat_pool.put(event_id)
+            return _as_response(event, list(event_repo.get_participant_ids(db, event_id)))
+        _after_participant_change(event_id, user.id)
+        return _as_response(event, list(event_repo.get_participant_ids(db, event_id)))
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Достигнут максимальный лимит участников")
+
+
+def _leave_hot_event(db: Session, event: Event, user) -> EventResponse:
+    """Выход с горячего события: -1 в шард, место возвращается в пул (и аренду) воркера."""
+    event_id = event.id
+    limited = event.max_participants is not None
+    with transaction(db):
+        removed = event_repo.remove_participant(db, event_id, user.id)
+        if removed:
+            shard = random.randrange(settings.PARTICIPANT_COUNTER_SHARDS)
+            event_repo.add_to_counter_shard(db, event_id, shard, -1)
+            event_repo.record_changes(db, [event_id])
+            if limited:
+                event_repo.return_leased_seat(db, event_id, seat_pool.owner, _lease_until())
+            _log_participants(db, event_id, [(user.id, "leave")])
+    if removed:
+        if limited:
+            seat_pool.put(event_id)
+            # admission_service сам импортирует event_service
+            from app.services.admission_service import admission
+
+            admission.credit(event_id)
+        _after_participant_change(event_id, user.id)
+    return _as_response(event, list(event_repo.get_participant_ids(db, event_id)))
+
+
+def release_seats(db: Session, event_id: Optional[UUID] = None) -> None:
+    """Возвращает в БД места из пула и аренды воркера (при остановке или снятии high_demand)."""
+    seat_pool.drain(event_id)
+    with transaction(db):
+        event_repo.release_leases(db, seat_pool.owner, event_id)
+
+
+def release_all_seats() -> None:
+    db = SessionLocal()
+    try:
+        release_seats(db)
+    except Exception:
+        logger.exception("[SEATS] не удалось вернуть зарезервированные места")
+    finally:
+        db.close()
+
+
+def keep_seat_leases(db: Session) -> dict:
+    """
+    Продлевает аренды мест этого воркера и возвращает в лимит места
+    просроченных аренд (упавших или зависших воркеров).
+    """
+    now = datetime.utcnow()
+    with transaction(db):
+        event_repo.renew_seat_leases(db, seat_pool.owner, _lease_until())
+        reclaimed = event_repo.reclaim_expired_leases(db, now)
+    if reclaimed:
+        from app.services.admission_service import admission
+
+        for event_id, seats in reclaimed.items():
+            event_page_cache.invalidate(event_id)
+            admission.credit(event_id, seats)
+        logger.info("[SEATS] возвращено %s мест просроченных аренд", sum(reclaimed.values()))
+    return reclaimed
+
+
+class SeatLeaseKeeper:
+    """Фоновый поток: раз в interval продлевает аренды и забирает просроченные."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="seat-lease-keeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                keep_seat_leases(db)
+            except Exception:
+                logger.exception("[SEATS] ошибка продления аренд")
+            finally:
+                db.close()
+
+
+seat_lease_keeper = SeatLeaseKeeper(interval=settings.SEAT_LEASE_SECONDS / 3)
 
 
 def join_event(db: Session, event_id: UUID, user) -> EventResponse:
@@ -141,21 +1157,25 @@ def join_event(db: Session, event_id: UUID, user) -> EventResponse:
     now = datetime.utcnow()
     if event.end_date < now:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Событие уже прошло")
-    if event.max_participants is not None and len(event.participants) >= event.max_participants:
+    if event.high_demand:
+        return _join_hot_event(db, event, user)
+    # места в пулах воркеров тоже заняты (событие могло быть горячим)
+    if (
+        event.max_participants is not None
+        and event.participants_count + event.seats_reserved >= event.max_participants
+    ):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Достигнут максимальный лимит участников")
     if user in event.participants:
         return _as_response(event)
-    event.participants.append(user)
-    db.add(event)
-    db.commit()
-    db.refresh(event)
-    try:
-        event_repo.add_participant_log(db, event.id, user.id, "join")
-        ws_manager.broadcast_from_thread(
-            f'{{"type":"participant","action":"join","event_id":"{event.id}","user_id":"{user.id}"}}'
-        )
-    except Exception:
-        pass
+    with transaction(db):
+        # проверка выше читала строку до транзакции — место берётся условным UPDATE
+        if not event_repo.take_free_seat(db, event.id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Достигнут максимальный лимит участников")
+        event.participants.append(user)
+        db.add(event)
+        event_repo.record_changes(db, [event.id])
+        _log_participants(db, event.id, [(user.id, "join")])
+    _after_participant_change(event.id, user.id)
     return _as_response(event)
 
 
@@ -163,21 +1183,164 @@ def leave_event(db: Session, event_id: UUID, user) -> EventResponse:
     event = event_repo.get_event(db, event_id)
     if not event or event.is_deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Событие не найдено")
+    if event.high_demand:
+        return _leave_hot_event(db, event, user)
     if user in event.participants:
-        event.participants = [p for p in event.participants if p.id != user.id]
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        try:
-          event_repo.add_participant_log(db, event.id, user.id, "leave")
-          ws_manager.broadcast_from_thread(
-              f'{{"type":"participant","action":"leave","event_id":"{event.id}","user_id":"{user.id}"}}'
-          )
-        except Exception:
-          pass
+        with transaction(db):
+            event.participants = [p for p in event.participants if p.id != user.id]
+            db.add(event)
+            event_repo.change_participants_counts(db, {event.id: -1})
+            event_repo.record_changes(db, [event.id])
+            _log_participants(db, event.id, [(user.id, "leave")])
+        _after_participant_change(event.id, user.id)
     return _as_response(event)
 
 
+def _participants_total(db: Session, event: Event) -> Tuple[int, int]:
+    """
+    (число участников, версия шардов): participants_count плюс шарды
+    горячего события. Сумма кэшируется на PARTICIPANT_COUNTER_CACHE_TTL —
+    записи других воркеров видны с такой задержкой.
+    """
+    shards = participant_counter_cache.get(event.id)
+    if shards is None:
+        shards = event_repo.counter_shards(db, event.id)
+        participant_counter_cache.set(event.id, shards)
+    count, version = shards
+    return event.participants_count + count, version
+
+
+def _participants_etag(
+    event: Event, total: int, version: int, after: Optional[UUID], limit: int
+) -> str:
+    # updated_at меняется вместе с participants_count при каждом join/leave,
+    # у горячих событий — версия шардов
+    raw = f"{event.id}:{total}:{version}:{event.updated_at.isoformat()}:{after}:{limit}"
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def list_participants(
+    db: Session,
+    event_id: UUID,
+    after: Optional[UUID] = None,
+    limit: int = 50,
+    if_none_match: Optional[str] = None,
+) -> Tuple[Optional[List[ParticipantResponse]], int, Optional[str], str]:
+    """
+    Страница участников, общее число (participants_count и шарды), курсор следующей
+    страницы и ETag. Если ETag совпал с If-None-Match, список не читаем (None).
+    """
+    event = event_repo.get_event(db, event_id)
+    if not event or event.is_deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Событие не найдено")
+    total, version = _participants_total(db, event)
+    etag = _participants_etag(event, total, version, after, limit)
+    if if_none_match == etag:
+        return None, total, None, etag
+    rows = event_repo.list_participants_page(db, event_id, after, limit)
+    next_cursor = str(rows[-1].id) if len(rows) == limit else None
+    items = [
+        ParticipantResponse(id=row.id, full_name=row.full_name, avatar_url=row.avatar_url)
+        for row in rows
+    ]
+    return items, total, next_cursor, etag
+
+
+def _free_seats(event: Event, hot_total: Optional[int]) -> Optional[int]:
+    if event.max_participants is None:
+        return None
+    if event.high_demand:
+        taken = hot_total
+    else:
+        taken = event.participants_count + event.seats_reserved
+    return max(event.max_participants - taken, 0)
+
+
+def spots_left(db: Session, event: Event) -> Optional[int]:
+    """
+    Свободные места так, как их видит запись (страница события, очередь
+    допуска). Обычное событие: места в пулах воркеров заняты (seats_reserved).
+    Горячее: пулы раздают свои места, заняты только записанные —
+    participants_count и шарды.
+    """
+    hot_total = _participants_total(db, event)[0] if event.high_demand else None
+    return _free_seats(event, hot_total)
+
+
+async def _counter_shards_async(db: AsyncSession, event_id: UUID) -> tuple:
+    shards = participant_counter_cache.get(event_id)
+    if shards is None:
+        shards = await async_event_repo.counter_shards(db, event_id)
+        participant_counter_cache.set(event_id, shards)
+    return shards
+
+
+async def _related_responses_async(db: AsyncSession, event: Event, limit: int) -> List[EventResponse]:
+    return await _as_responses_async(db, await async_event_repo.related_events(db, event, limit))
+
+
+async def _read_async(query, *args):
+    # своя сессия на каждый запрос gather: соединение берётся из пула
+    # и возвращается, не дожидаясь остальных
+    async with async_session_factory()() as db:
+        return await query(db, *args)
+
+
+async def _no_result(value=None):
+    return value
+
+
+async def get_event_page_async(
+    event_id: UUID,
+    user=None,
+    participants_limit: int = 10,
+    related_limit: int = 3,
+) -> EventPageResponse:
+    """
+    Событие, состояние участия/мест, первая страница участников и похожие события.
+    Событие читается первым, остальные запросы независимы и идут параллельно,
+    каждый в своей AsyncSession. Соединение, пока ждёт другое, не держит ни
+    один запрос — пул не блокируется. Всех участников не читаем: число — из
+    счётчика, в event.participants — только первая страница. Для анонимов
+    ответ кэшируется.
+    """
+    key = (participants_limit, related_limit)
+    cached = event_page_cache.get(event_id) or {}
+    if user is None and key in cached:
+        return cached[key]
+    async with async_session_factory()() as db:
+        await _touch_past_events_async(db)
+        event = await async_event_repo.get_event(db, event_id)
+    if not event or event.is_deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Событие не найдено")
+
+    rows, related, is_participant, shards = await asyncio.gather(
+        _read_async(async_event_repo.list_participants_page, event.id, None, participants_limit),
+        _read_async(_related_responses_async, event, related_limit),
+        _read_async(async_event_repo.is_participant, event.id, user.id) if user else _no_result(False),
+        _read_async(_counter_shards_async, event.id) if event.high_demand else _no_result((0, 0)),
+    )
+    items = [
+        ParticipantResponse(id=row.id, full_name=row.full_name, avatar_url=row.avatar_url)
+        for row in rows
+    ]
+    total = event.participants_count + shards[0]
+    free = _free_seats(event, total)
+    page = EventPageResponse(
+        event=_as_response(event, [item.id for item in items]),
+        is_participant=is_participant,
+        is_full=free == 0,
+        spots_left=free,
+        participants=items,
+        participants_total=total,
+        participants_next_cursor=str(items[-1].id) if len(items) == participants_limit else None,
+        related=related,
+    )
+    if user is None:
+        event_page_cache.set(event_id, {**cached, key: page})
+    return page
+
+
 def get_participation_log(db: Session, event_id: UUID):
     event = event_repo.get_event(db, event_id)
     if not event or event.is_deleted:
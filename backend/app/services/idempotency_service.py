@@ -0,0 +1,85 @@
+# app/services/idempotency_service.py
+"""
+Хранилище Idempotency-Key и список маршрутов, на которые действует
+IdempotencyMiddleware (см. app/core/idempotency.py).
+
+IDEMPOTENCY_BACKEND=memory — ключи в памяти воркера: повтор, попавший
+в другой воркер, выполнится заново. IDEMPOTENCY_BACKEND=db — таблица
+idempotency_keys через async-движок, общая для всех воркеров.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.config import settings
+from app.core.idempotency import IdempotencyRecord, MemoryIdempotencyStore
+from app.db.base import async_session_factory
+from app.repositories import async_idempotency_repo
+
+# Как часто (сек) удаляем просроченные ключи из БД
+PURGE_INTERVAL = 600
+
+# (метод, путь) запросов, которые клиенты повторяют по таймауту
+IDEMPOTENT_ROUTES = [
+    ("POST", r"/auth/register"),
+    ("POST", r"/auth/events"),
+    ("POST", r"/auth/events/[^/]+/join"),
+    ("POST", r"/auth/events/[^/]+/leave"),
+]
+
+
+class DatabaseIdempotencyStore:
+    """Тот же интерфейс, что у MemoryIdempotencyStore, поверх таблицы idempotency_keys."""
+
+    def __init__(self, ttl: float, lease: float):
+        self.ttl = ttl
+        self.lease = lease
+        self._last_purge = 0.0
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        now = datetime.utcnow()
+        async with async_session_factory()() as db:
+            async with db.begin():
+                await self._purge(db, now)
+                row = await async_idempotency_repo.claim(
+                    db, key, fingerprint, now, now + timedelta(seconds=self.lease)
+                )
+                if row is None:
+                    return None
+                return IdempotencyRecord(
+                    row.fingerprint,
+                    expires_at=row.expires_at.timestamp(),
+                    status_code=row.status_code,
+                    content_type=row.content_type,
+                    body=row.body or b"",
+                )
+
+    async def complete(self, key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        async with async_session_factory()() as db:
+            async with db.begin():
+                await async_idempotency_repo.complete(db, key, status_code, content_type, body, expires_at)
+
+    async def release(self, key: str) -> None:
+        async with async_session_factory()() as db:
+            async with db.begin():
+                await async_idempotency_repo.release(db, key)
+
+    async def _purge(self, db, now: datetime) -> None:
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        await async_idempotency_repo.purge(db, now)
+
+
+def build_store():
+    if settings.IDEMPOTENCY_BACKEND == "db":
+        return DatabaseIdempotencyStore(ttl=settings.IDEMPOTENCY_TTL, lease=settings.IDEMPOTENCY_LEASE_SECONDS)
+    return MemoryIdempotencyStore(
+        ttl=settings.IDEMPOTENCY_TTL,
+        lease=settings.IDEMPOTENCY_LEASE_SECONDS,
+        maxsize=settings.IDEMPOTENCY_MAX_KEYS,
+    )
+
+
+store = build_store()
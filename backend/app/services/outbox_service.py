@@ -0,0 +1,305 @@
+# app/services/outbox_service.py
+"""
+Transactional outbox: письма и WebSocket-сообщения записываются в таблицу
+outbox в той же транзакции, что и изменение данных, а доставляет их
+фоновые диспетчеры — пакетами, с ретраями и бэкоффом: письма разбирает
+поток OutboxDispatcher (SMTP блокирующий), WS-сообщения — задача
+WSOutboxDispatcher в event loop воркера через AsyncSession.
+
+Доставка «как минимум один раз»: сообщение, взятое в работу упавшим
+воркером, снова станет доступно после аренды (OUTBOX_LEASE_SECONDS).
+idempotency_key не даёт записать одно и то же действие дважды
+(повтор запроса, повторный импорт) и передаётся в WS-сообщении как "id".
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core import email_utils
+from app.core.ws_manager import ws_manager
+from app.db.base import SessionLocal, async_session_factory, transaction
+from app.db.models import OutboxMessage
+from app.repositories import async_outbox_repo, outbox_repo
+
+logger = logging.getLogger(__name__)
+
+# Как часто (сек) удаляем доставленные сообщения старше OUTBOX_RETENTION_HOURS
+PURGE_INTERVAL = 3600
+
+
+def enqueue_emails(
+    db: Session,
+    template: str,
+    recipients: Iterable[Tuple[str, str]],
+    values: dict,
+) -> None:
+    """Письма по шаблону: recipients — пары (адрес, idempotency_key). Без commit."""
+    outbox_repo.add_messages(
+        db,
+        [
+            {
+                "kind": "email",
+                "idempotency_key": key,
+                "payload": json.dumps({"template": template, "to": to_email, "values": values}),
+            }
+            for to_email, key in recipients
+        ],
+    )
+
+
+def enqueue_email(db: Session, template: str, to_email: str, values: dict, key: str) -> None:
+    enqueue_emails(db, template, [(to_email, key)], values)
+
+
+def enqueue_ws_messages(db: Session, messages: Iterable[Tuple[dict, str]]) -> None:
+    """Сообщения всем подключённым к /ws/events: пары (сообщение, idempotency_key). Без commit."""
+    outbox_repo.add_messages(
+        db,
+        [
+            {"kind": "ws", "idempotency_key": key, "payload": json.dumps({**message, "id": key})}
+            for message, key in messages
+        ],
+    )
+
+
+def _deliver_emails(messages: List[OutboxMessage]) -> Dict[int, str]:
+    """Письма пакета одним SMTP-соединением; возвращает {id: ошибка} недоставленных."""
+    by_template: Dict[str, List[Tuple[OutboxMessage, dict]]] = {}
+    errors: Dict[int, str] = {}
+    for message in messages:
+        data = json.loads(message.payload)
+        by_template.setdefault(data["template"], []).append((message, data))
+    payloads, owners = [], []
+    for template, items in by_template.items():
+        try:
+            rendered = email_utils.render_payloads(
+                template, [(data["to"], data["values"]) for _, data in items]
+            )
+        except Exception as exc:
+            logger.exception("[OUTBOX] не удалось отрендерить шаблон %s", template)
+            errors.update((message.id, f"render: {exc}") for message, _ in items)
+            continue
+        payloads.extend(rendered)
+        owners.extend(message for message, _ in items)
+    for position in email_utils.send_payloads(payloads) or []:
+        errors[owners[position].id] = "smtp: не отправлено"
+    return errors
+
+
+async def _deliver_ws(messages: List[OutboxMessage]) -> Dict[int, str]:
+    errors: Dict[int, str] = {}
+    for message in messages:
+        try:
+            await ws_manager.broadcast(message.payload)
+        except Exception as exc:
+            errors[message.id] = f"ws: {exc}"
+    return errors
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2 ** attempts, 300))
+
+
+def _lease(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+
+
+def _result_statements(messages: List[OutboxMessage], errors: Dict[int, str]) -> list:
+    """UPDATE-ы по итогам доставки пакета: done / повтор с бэкоффом / failed."""
+    now = datetime.utcnow()
+    statements = []
+    delivered = [m.id for m in messages if m.id not in errors]
+    if delivered:
+        statements.append(outbox_repo.done_stmt(delivered, now))
+    for message in messages:
+        error = errors.get(message.id)
+        if error is None:
+            continue
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            logger.error("[OUTBOX] сообщение %s не доставлено: %s", message.idempotency_key, error)
+            statements.append(outbox_repo.failed_stmt(message.id, error, now))
+        else:
+            statements.append(
+                outbox_repo.retry_stmt(message.id, error, now + _backoff(message.attempts))
+            )
+    return statements
+
+
+def dispatch_once(db: Session, limit: Optional[int] = None) -> int:
+    """Берёт пакет писем, доставляет и фиксирует результат. Возвращает размер пакета."""
+    claim = uuid.uuid4().hex
+    now = datetime.utcnow()
+    with transaction(db):
+        messages = outbox_repo.claim_batch(
+            db, claim, now, _lease(now), limit or settings.OUTBOX_BATCH_SIZE, kinds=("email",)
+        )
+    if not messages:
+        return 0
+    errors = _deliver_emails(messages)
+    with transaction(db):
+        for statement in _result_statements(messages, errors):
+            db.execute(statement)
+    return len(messages)
+
+
+async def dispatch_ws_once(db: AsyncSession, limit: Optional[int] = None) -> int:
+    """То же для WS-сообщений, без перехода в поток."""
+    claim = uuid.uuid4().hex
+    now = datetime.utcnow()
+    async with db.begin():
+        messages = await async_outbox_repo.claim_batch(
+            db, claim, now, _lease(now), limit or settings.OUTBOX_BATCH_SIZE, kinds=("ws",)
+        )
+    if not messages:
+        return 0
+    errors = await _deliver_ws(messages)
+    async with db.begin():
+        for statement in _result_statements(messages, errors):
+            await db.execute(statement)
+    return len(messages)
+
+
+class OutboxDispatcher:
+    """
+    Фоновый поток воркера: разбирает письма из outbox, пока есть готовые,
+    затем ждёт OUTBOX_POLL_INTERVAL или notify() после commit сервиса.
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        """Разбудить поток сразу после commit, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    def drain(self) -> int:
+        """Синхронно доставляет всё готовое (для скриптов и отладки)."""
+        total = 0
+        db = SessionLocal()
+        try:
+            while True:
+                count = dispatch_once(db)
+                total += count
+                if not count:
+                    return total
+        finally:
+            db.close()
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        db = SessionLocal()
+        try:
+            with transaction(db):
+                outbox_repo.purge_done(
+                    db, datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+                )
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                self.drain()
+                self._purge()
+            except Exception:
+                logger.exception("[OUTBOX] ошибка диспетчера")
+            self._wakeup.wait(self.poll_interval)
+
+
+class WSOutboxDispatcher:
+    """Задача в event loop воркера: WS-сообщения из outbox рассылаются без потоков."""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Вызывается из lifespan, внутри работающего loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name="ws-outbox-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self) -> None:
+        """Потокобезопасно: сервисы коммитят из threadpool."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    async def drain(self) -> int:
+        total = 0
+        async with async_session_factory()() as db:
+            while True:
+                count = await dispatch_ws_once(db)
+                total += count
+                if not count:
+                    return total
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[OUTBOX] ошибка WS-диспетчера")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+dispatcher = OutboxDispatcher(poll_interval=settings.OUTBOX_POLL_INTERVAL)
+ws_dispatcher = WSOutboxDispatcher(poll_interval=settings.OUTBOX_POLL_INTERVAL)
+
+
+def notify() -> None:
+    """Разбудить оба диспетчера после commit сервиса."""
+    dispatcher.notify()
+    ws_dispatcher.notify()
@@ -0,0 +1,47 @@
+# benchmarks/__init__.py
+"""
+Бенчмарки подсистем бэкенда. Запуск из backend/:
+
+    python -m benchmarks.search
+
+Скрипты работают на временной SQLite-базе (app.db из репозитория не
+трогают); DATABASE_URL можно задать явно — например, на PostgreSQL.
+Результаты, снятые на момент изменений, — в benchmarks/README.md.
+"""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Callable
+
+
+def use_temp_database() -> str:
+    """Вызывать до импорта app: настройки читаются при импорте."""
+    if "DATABASE_URL" not in os.environ:
+        root = tempfile.mkdtemp(prefix="afisha-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{root}/bench.db"
+        os.environ.setdefault("SPOOL_DIR", os.path.join(root, "spool"))
+    return os.environ["DATABASE_URL"]
+
+
+def per_call_ms(fn: Callable[[], object], repeat: int) -> float:
+    """Медиана времени одного вызова, мс."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def new_id() -> uuid.UUID:
+    """
+    uuid4 для массовой вставки. Колонки UUID в SQLite получают NUMERIC-affinity:
+    hex из одних цифр и одной «e» сохраняется как REAL и не читается обратно.
+    На сотнях тысяч строк такой id выпадает, поэтому его пропускаем.
+    """
+    while True:
+        value = uuid.uuid4()
+        if not value.hex.replace("e", "", 1).isdigit():
+            return value
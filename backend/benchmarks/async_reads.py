@@ -0,0 +1,183 @@
+# benchmarks/async_reads.py
+"""
+N одновременных запросов (по умолчанию 1000) к списку событий города:
+async-роут на AsyncSession против такого же sync-роута в threadpool
+(Session, event_repo.list_events) и боевой /auth/events из снимка каталога.
+Запросы идут в приложение напрямую через ASGI, без сокетов: меряется
+сервер, а не HTTP-клиент. Для каждого варианта — общее время, p50/p99
+задержки и максимум потоков процесса.
+
+sync-роут с Depends(get_db) держит соединение, пока ответ валидируется
+во втором заходе в threadpool. Когда одновременных запросов больше, чем
+соединений в пуле, свободные потоки занимают запросы, ждущие пул, а
+соединения ждут поток — до pool_timeout. Поэтому threadpool-вариант
+открывает сессию внутри обработчика и закрывает её до возврата ответа;
+--depends-db добавляет вариант с Depends(get_db) и воспроизводит блокировку.
+
+    python -m benchmarks.async_reads [--connections 1000] [--events 2000] [--depends-db]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from benchmarks import new_id, use_temp_database
+
+use_temp_database()
+
+from fastapi import Depends  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db import migrations  # noqa: E402
+from app.db.base import SessionLocal, get_async_db, get_db, transaction  # noqa: E402
+from app.main import app  # noqa: E402
+from app.repositories import async_event_repo, event_repo  # noqa: E402
+from app.schemas.event import EventResponse  # noqa: E402
+from app.services import event_service  # noqa: E402
+
+CITIES = [f"Город-{n}" for n in range(50)]
+
+
+@app.get("/bench/async", response_model=List[EventResponse])
+async def bench_async(city: str, db: AsyncSession = Depends(get_async_db)):
+    events = await async_event_repo.list_events(db, city=city)
+    return await event_service._as_responses_async(db, events)
+
+
+@app.get("/bench/threadpool", response_model=List[EventResponse])
+def bench_threadpool(city: str):
+    with SessionLocal() as db:
+        return event_service._as_responses(db, event_repo.list_events(db, city=city))
+
+
+@app.get("/bench/threadpool-depends", response_model=List[EventResponse])
+def bench_threadpool_depends(city: str, db: Session = Depends(get_db)):
+    return event_service._as_responses(db, event_repo.list_events(db, city=city))
+
+
+async def _get(path: str, query: str) -> Tuple[int, float]:
+    """Один GET через ASGI: (статус, секунды)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    started = time.perf_counter()
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware отвечает 500 и пробрасывает исключение дальше
+        status = 500
+    return status, time.perf_counter() - started
+
+
+async def _burst(path: str, connections: int) -> None:
+    peak = threading.active_count()
+    running = True
+
+    async def watch_threads():
+        nonlocal peak
+        while running:
+            peak = max(peak, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    watcher = asyncio.create_task(watch_threads())
+    started = time.perf_counter()
+    results: List[Tuple[int, float]] = await asyncio.gather(
+        *(_get(path, f"city={random.choice(CITIES)}") for _ in range(connections))
+    )
+    total = time.perf_counter() - started
+    running = False
+    await watcher
+
+    failed = sum(1 for status, _ in results if status != 200)
+    latencies = sorted(seconds * 1000 for _, seconds in results)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{path:<16} {total:6.2f} с  {connections / total:7.0f} запр/с  "
+        f"p50 {statistics.median(latencies):7.0f} мс  p99 {p99:7.0f} мс  "
+        f"потоков {peak:3d}  ошибок {failed}"
+    )
+
+
+async def run(connections: int, paths: List[str]) -> None:
+    async with app.router.lifespan_context(app):
+        for path in paths:
+            # прогрев: пулы соединений, снимок каталога, потоки threadpool
+            await asyncio.gather(*(_get(path, f"city={city}") for city in CITIES))
+            await _burst(path, connections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--depends-db", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(1)
+    migrations.migrate()
+    start = datetime.utcnow() + timedelta(days=1)
+    rows = [
+        {
+            "id": new_id(),
+            "title": f"Событие {n}",
+            "short_description": None,
+            "description": "описание",
+            "start_date": start + timedelta(hours=n),
+            "end_date": start + timedelta(hours=n + 2),
+            "image_url": "x.png",
+            "city": CITIES[n % len(CITIES)],
+            "category": "прочее",
+            "status": "upcoming",
+            "payment_info": None,
+            "max_participants": None,
+        }
+        for n in range(args.events)
+    ]
+    db = SessionLocal()
+    with transaction(db):
+        event_repo.bulk_create_events(db, rows, [])
+    db.close()
+    print(f"{args.events} событий, {len(CITIES)} городов, {args.connections} одновременных запросов")
+    paths = ["/bench/async", "/bench/threadpool", "/auth/events"]
+    if args.depends_db:
+        paths.append("/bench/threadpool-depends")
+    asyncio.run(run(args.connections, paths))
+
+
+if __name__ == "__main__":
+    main()
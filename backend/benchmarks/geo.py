@@ -0,0 +1,104 @@
+# benchmarks/geo.py
+"""
+Поиск ближайших событий на N синтетических событиях (по умолчанию 100k):
+загрузка GeoIndex из БД, запросы в радиусе и k ближайших против полного
+перебора точек с haversine, обновление одной точки и nearby_events целиком
+(индекс + чтение найденных событий из БД).
+
+    python -m benchmarks.geo [--events 100000]
+"""
+import argparse
+import heapq
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import new_id, per_call_ms, use_temp_database
+
+use_temp_database()
+
+from app.core.geo import GeoIndex, haversine_km  # noqa: E402
+from app.db import migrations  # noqa: E402
+from app.db.base import SessionLocal, transaction  # noqa: E402
+from app.repositories import event_repo  # noqa: E402
+from app.services import event_service  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    migrations.migrate()
+    start = datetime.utcnow() + timedelta(days=1)
+    rows = [
+        {
+            "id": new_id(),
+            "title": "Событие",
+            "short_description": None,
+            "description": "описание",
+            "start_date": start,
+            "end_date": start + timedelta(days=30),
+            "image_url": "x.png",
+            "city": "Москва",
+            "category": "прочее",
+            "status": "upcoming",
+            "payment_info": None,
+            "max_participants": None,
+            # европейская часть и Сибирь — плотность как у реального каталога
+            "latitude": random.uniform(41, 70),
+            "longitude": random.uniform(20, 140),
+        }
+        for _ in range(args.events)
+    ]
+    db = SessionLocal()
+    for offset in range(0, len(rows), 5000):
+        with transaction(db):
+            event_repo.bulk_create_events(db, rows[offset:offset + 5000], [])
+
+    index = GeoIndex(rebuild_interval=300)
+    started = time.perf_counter()
+    points = event_repo.geo_points(db)
+    index.load(points)
+    print(f"загрузка индекса из БД, {len(index)} точек: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    queries = [(random.uniform(41, 70), random.uniform(20, 140)) for _ in range(200)]
+    cycle = iter(queries * 1000)
+    for radius in (5, 25, 100):
+        ms = per_call_ms(lambda: index.within(*next(cycle), radius, limit=20), repeat=200)
+        print(f"{f'в радиусе {radius} км':<28} {ms:8.3f} мс/запрос")
+    ms = per_call_ms(lambda: index.nearest(*next(cycle), 20), repeat=200)
+    print(f"{'20 ближайших':<28} {ms:8.3f} мс/запрос")
+
+    def scan():
+        lat, lon = next(cycle)
+        return heapq.nsmallest(
+            20, ((haversine_km(lat, lon, p_lat, p_lon), event_id) for event_id, p_lat, p_lon, _ in points)
+        )
+
+    ms = per_call_ms(scan, repeat=10)
+    print(f"{'перебор всех точек':<28} {ms:8.3f} мс/запрос")
+
+    lat, lon = queries[0]
+    assert index.nearest(lat, lon, 20) == heapq.nsmallest(
+        20, ((haversine_km(lat, lon, p_lat, p_lon), event_id) for event_id, p_lat, p_lon, _ in points)
+    )
+
+    moved = iter(points * 2)
+
+    def move():
+        event_id, p_lat, p_lon, end_date = next(moved)
+        index.put(event_id, p_lat + 0.01, p_lon, end_date)
+
+    us = per_call_ms(move, repeat=10_000) * 1000
+    print(f"{'перенос одной точки':<28} {us:8.1f} мкс")
+
+    event_service.geo_index.load(points)
+    ms = per_call_ms(lambda: event_service.nearby_events(db, *next(cycle), limit=20), repeat=50)
+    print(f"{'nearby_events, 20 событий':<28} {ms:8.3f} мс/запрос")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/search.py
+"""
+Полнотекстовый поиск на N синтетических событиях (по умолчанию 100k):
+время запроса search_repo.search_event_ids против полного перебора
+title/description в Python (так искал клиент до индекса).
+
+    python -m benchmarks.search [--events 100000]
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks import per_call_ms, use_temp_database
+
+use_temp_database()
+
+from app.db import migrations  # noqa: E402
+from app.db.base import SessionLocal, transaction  # noqa: E402
+from app.repositories import event_repo, search_repo  # noqa: E402
+
+ALPHABET = "абвгдежзиклмнопрстуфхцчшэюя"
+COMMON = (
+    "концерт театр выставка джаз рок фестиваль лекция мастер класс экскурсия "
+    "спектакль кино футбол хоккей йога музыка живопись"
+).split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    words = COMMON + ["".join(random.choices(ALPHABET, k=random.randint(5, 10))) for _ in range(20_000)]
+    migrations.migrate()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "title": " ".join(random.sample(words, 3)),
+            "short_description": None,
+            "description": " ".join(random.choices(words, k=40)),
+            "start_date": datetime(2030, 1, 1),
+            "end_date": datetime(2030, 1, 2),
+            "image_url": "x.png",
+            "city": "Москва",
+            "category": "прочее",
+            "status": "upcoming",
+            "payment_info": None,
+            "max_participants": None,
+        }
+        for _ in range(args.events)
+    ]
+    db = SessionLocal()
+    started = time.perf_counter()
+    for offset in range(0, len(rows), 5000):
+        with transaction(db):
+            event_repo.bulk_create_events(db, rows[offset:offset + 5000], [])
+    print(f"{args.events} событий + индекс: {time.perf_counter() - started:.1f} с")
+
+    queries = {
+        "редкое слово": words[100],
+        "два слова, префикс": f"{words[200]} {words[300][:4]}",
+        "префикс": words[5000][:5],
+        "частое слово": "джаз",
+    }
+    for name, query in queries.items():
+        ms = per_call_ms(lambda: search_repo.search_event_ids(db, query, limit=20), repeat=20)
+        _, total = search_repo.search_event_ids(db, query, limit=20)
+        print(f"{name:<20} {query!r:<28} найдено {total:>6}  {ms:8.2f} мс/запрос")
+
+    term = words[100]
+    texts = [(row["title"] + " " + row["description"]).lower() for row in rows]
+    ms = per_call_ms(lambda: [i for i, text in enumerate(texts) if term in text][:20], repeat=5)
+    print(f"{'перебор в Python':<20} {term!r:<28} {'':>13}  {ms:8.2f} мс/запрос")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
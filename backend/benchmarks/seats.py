@@ -0,0 +1,133 @@
+# benchmarks/seats.py
+"""
+Параллельная запись на событие с лимитом: обычное событие (каждый join
+обновляет строку события — participants_count, единый счётчик) против
+горячего (места партиями из пула воркера, +1 в случайный шард счётчика).
+Для каждого варианта — записей в секунду, число UPDATE строки events,
+повторы из-за блокировки SQLite и проверка, что лимит не превышен.
+
+    python -m benchmarks.seats [--joins 400] [--threads 8]
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks import new_id, use_temp_database
+
+use_temp_database()
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import event as sa_event  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.db import migrations  # noqa: E402
+from app.db.base import SessionLocal, engine, transaction  # noqa: E402
+from app.db.models import User  # noqa: E402
+from app.repositories import event_repo, user_repo  # noqa: E402
+from app.services import event_service  # noqa: E402
+
+_counts = {"event_updates": 0}
+_counts_lock = threading.Lock()
+
+
+@sa_event.listens_for(engine, "before_cursor_execute")
+def _count_event_updates(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("UPDATE EVENTS"):
+        with _counts_lock:
+            _counts["event_updates"] += 1
+
+
+def _create_event(high_demand: bool, limit: int):
+    start = datetime.utcnow() + timedelta(days=1)
+    row = {
+        "id": new_id(),
+        "title": "Концерт",
+        "short_description": None,
+        "description": "описание",
+        "start_date": start,
+        "end_date": start + timedelta(hours=3),
+        "image_url": "x.png",
+        "city": "Москва",
+        "category": "прочее",
+        "status": "upcoming",
+        "payment_info": None,
+        "max_participants": limit,
+        "high_demand": high_demand,
+    }
+    db = SessionLocal()
+    try:
+        with transaction(db):
+            event_repo.bulk_create_events(db, [row], [])
+    finally:
+        db.close()
+    return row["id"]
+
+
+def _run(name: str, high_demand: bool, user_ids, limit: int, threads: int) -> None:
+    event_id = _create_event(high_demand, limit)
+    retries = [0]
+
+    def join(user_id):
+        db = SessionLocal()
+        try:
+            user = user_repo.get_by_id(db, user_id)
+            while True:
+                try:
+                    event_service.join_event(db, event_id, user)
+                    return True
+                except HTTPException:
+                    return False
+                except OperationalError:
+                    # SQLite: database is locked — повторяем
+                    db.rollback()
+                    with _counts_lock:
+                        retries[0] += 1
+        finally:
+            db.close()
+
+    _counts["event_updates"] = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        joined = sum(pool.map(join, user_ids))
+    took = time.perf_counter() - started
+    updates = _counts["event_updates"]
+
+    db = SessionLocal()
+    try:
+        stored = len(event_repo.get_participant_ids(db, event_id))
+        event_service.release_seats(db, event_id)
+    finally:
+        db.close()
+    print(
+        f"{name:<26} {len(user_ids) / took:7.0f} записей/с  UPDATE events: {updates:4d}  "
+        f"повторов: {retries[0]:4d}  записано {joined} (в БД {stored}, лимит {limit})"
+    )
+    assert stored == joined <= limit, (stored, joined, limit)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--joins", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    migrations.migrate()
+    user_ids = [new_id() for _ in range(args.joins)]
+    db = SessionLocal()
+    with transaction(db):
+        db.add_all(
+            User(id=user_id, full_name="Гость", email=f"guest{n}@example.com", password_hash="x", is_active=True)
+            for n, user_id in enumerate(user_ids)
+        )
+    db.close()
+    # лимит меньше числа желающих — часть записей получает отказ
+    limit = args.joins * 3 // 4
+    print(f"{args.joins} записей в {args.threads} потоков, лимит {limit}")
+    _run("одна строка (обычное)", False, user_ids, limit, args.threads)
+    _run("шарды + пул мест (горячее)", True, user_ids, limit, args.threads)
+
+
+if __name__ == "__main__":
+    main()
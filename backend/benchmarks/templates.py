@@ -0,0 +1,90 @@
+# benchmarks/templates.py
+"""
+Стоимость одного письма: прежняя сборка (f-строка + MIMEMultipart.as_string)
+против предкомпилированных шаблонов — рендер одного письма, пакет
+приглашений одному событию и персональные письма (у каждого свои значения).
+БД не нужна.
+
+    python -m benchmarks.templates [--recipients 2000]
+"""
+import argparse
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from types import SimpleNamespace
+
+from app.core import email_utils
+from app.core.templates import email_templates
+from benchmarks import per_call_ms
+
+EVENT = SimpleNamespace(
+    title="Большой концерт",
+    start_date=datetime(2030, 1, 1, 19),
+    end_date=datetime(2030, 1, 1, 22),
+    short_description="Описание события " * 5,
+    description="",
+)
+
+
+def legacy_invitation(to_email: str, event) -> str:
+    """Приглашение так, как его собирал send_event_notification до шаблонов."""
+    body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #020616; color: #fff; padding: 20px;">
+      <table role="presentation" style="width: 100%; background-color: #020616; color: #fff;">
+        <tr>
+          <td style="background-color: #1a202c; padding: 20px; border-radius: 8px;">
+            <h2 style="font-size: 22px; margin-bottom: 10px; color: #fff;">Вас пригласили на событие</h2>
+            <p style="font-size: 16px; color: #b0b0b0;">Название: <strong>{event.title}</strong></p>
+            <p style="font-size: 16px; color: #b0b0b0;">Начало: {event.start_date}</p>
+            <p style="font-size: 16px; color: #b0b0b0;">Окончание: {event.end_date}</p>
+            <p style="font-size: 16px; color: #b0b0b0;">Описание: {event.short_description or event.description[:150]}</p>
+          </td>
+        </tr>
+      </table>
+    </body>
+    </html>
+    """
+    msg = MIMEMultipart()
+    msg["From"] = "noreply@example.com"
+    msg["To"] = to_email
+    msg["Subject"] = f"Приглашение на событие «{event.title}»"
+    msg.attach(MIMEText(body, "html"))
+    return msg.as_string()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=2000)
+    args = parser.parse_args()
+
+    email_templates.load()
+    emails = [f"user{n}@example.com" for n in range(args.recipients)]
+    values = email_utils.event_values(EVENT)
+    template = email_templates.get("event_invitation")
+
+    def each(fn):
+        return lambda: [fn(email) for email in emails]
+
+    rows = [
+        ("f-строка + MIME (до шаблонов)", each(lambda email: legacy_invitation(email, EVENT))),
+        ("Template.render", each(lambda _: template.render(**values))),
+        (
+            "render_payloads, по одному",
+            each(lambda email: email_utils.render_payloads("event_invitation", [(email, values)])),
+        ),
+        (
+            "render_payloads, пакет",
+            lambda: email_utils.render_payloads("event_invitation", [(email, values) for email in emails]),
+        ),
+        (
+            "welcome, свои значения",
+            lambda: email_utils.render_payloads("welcome", [(email, {"full_name": email}) for email in emails]),
+        ),
+    ]
+    for name, fn in rows:
+        print(f"{name:<32} {per_call_ms(fn, repeat=5) * 1000 / args.recipients:8.1f} мкс/письмо")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# benchmarks/ws_codec.py
+"""
+Рассылка /ws/events на N получателей (по умолчанию 10k): JSON-текст против
+бинарного подпротокола events.bin.v1. Рассылки идут через WSManager.broadcast
+и писателей соединений; вместо сокетов — заглушки, которые считают байты.
+Для каждого варианта — байт на проводе (тело + заголовок кадра WebSocket)
+и CPU процесса на одну рассылку всем получателям: поштучно (каждое
+сообщение — свой кадр) и пачкой из M сообщений подряд. Отдельно — оценка
+permessage-deflate: сжатие идёт в контексте каждого соединения, поэтому
+его CPU умножается на число получателей.
+
+    python -m benchmarks.ws_codec [--recipients 10000] [--messages 100]
+"""
+import argparse
+import asyncio
+import json
+import secrets
+import time
+import uuid
+import zlib
+from types import SimpleNamespace
+from typing import List
+
+from app.config import settings
+from app.core import ws_codec
+from app.core.ws_manager import WSManager
+
+
+def _frame_header(size: int) -> int:
+    """Заголовок кадра сервер → клиент (без маски)."""
+    return 2 if size < 126 else 4 if size < 65536 else 10
+
+
+class _Wire:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.expected = 0
+        self.done = asyncio.Event()
+
+    def sent(self, size: int) -> None:
+        self.frames += 1
+        self.bytes += size + _frame_header(size)
+        if self.frames >= self.expected:
+            self.done.set()
+
+    async def wait(self, expected: int) -> None:
+        self.expected = expected
+        if self.frames < expected:
+            self.done.clear()
+            await self.done.wait()
+
+
+class _Socket:
+    """Заглушка WebSocket: принимает соединение и считает отправленное."""
+
+    def __init__(self, wire: _Wire, n: int, binary: bool):
+        self.wire = wire
+        self.client = SimpleNamespace(host=f"10.{n >> 16}.{(n >> 8) & 255}.{n & 255}")
+        self.scope = {"subprotocols": [ws_codec.SUBPROTOCOL] if binary else []}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, data: str):
+        # json.dumps по умолчанию даёт ASCII: символ — байт
+        self.wire.sent(len(data))
+
+    async def send_bytes(self, data: bytes):
+        self.wire.sent(len(data))
+
+
+def _messages(count: int) -> List[str]:
+    """Сообщения об участниках в том виде, в каком их рассылает outbox."""
+    event_id = str(uuid.uuid4())
+    return [
+        json.dumps(
+            {
+                "type": "participant",
+                "action": "join",
+                "event_id": event_id,
+                "user_id": str(uuid.uuid4()),
+                "id": f"participant:{secrets.randbits(63) or 1}",
+            }
+        )
+        for _ in range(count)
+    ]
+
+
+async def _run(recipients: int, messages: List[str], binary: bool, burst: bool) -> tuple:
+    """(байт на рассылку, мс CPU на рассылку, кадров на получателя)."""
+    wire = _Wire()
+    manager = WSManager()
+    for n in range(recipients):
+        await manager.connect(_Socket(wire, n, binary))
+    await wire.wait(recipients)  # hello
+    wire.frames = wire.bytes = 0
+
+    started = time.process_time()
+    sent = 0
+    batches = [messages] if burst else [[message] for message in messages]
+    for batch in batches:
+        for message in batch:
+            await manager.broadcast(message)
+        if binary:
+            # то же, что сделает таймер WS_BINARY_BATCH_INTERVAL
+            manager._flush()
+            sent += recipients
+        else:
+            sent += recipients * len(batch)
+        await wire.wait(sent)
+    cpu = time.process_time() - started
+
+    for conn in list(manager.active.values()):
+        manager.disconnect(conn.websocket)
+    await asyncio.sleep(0)
+    return wire.bytes / len(messages), cpu * 1000 / len(messages), wire.frames / recipients
+
+
+def _deflate(payloads: List[bytes]) -> tuple:
+    """
+    permessage-deflate одного соединения (контекст сохраняется между
+    сообщениями, окно 2^12, memLevel 5 — как у websockets): байт и мс CPU
+    на сообщение.
+    """
+    compressor = zlib.compressobj(wbits=-12, memLevel=5)
+    size = 0
+    started = time.process_time()
+    for payload in payloads:
+        size += len(compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    cpu = time.process_time() - started
+    return size / len(payloads), cpu * 1000 / len(payloads)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+
+    settings.WS_MAX_CONNECTIONS = args.recipients
+    messages = _messages(args.messages)
+    print(f"{args.recipients} получателей, {args.messages} сообщений об участниках")
+    for burst in (False, True):
+        for binary in (False, True):
+            name = f"{'бинарный' if binary else 'JSON'}, {'пачка' if burst else 'поштучно'}"
+            per_message, cpu, frames = asyncio.run(_run(args.recipients, messages, binary, burst))
+            print(
+                f"{name:<20} {per_message / 1024:9.1f} КБ/рассылка  "
+                f"{cpu:8.2f} мс CPU/рассылка  кадров на получателя {frames:5.0f}"
+            )
+
+    # сжатие: те же тела кадров, что уходят клиенту
+    manager = WSManager()
+    texts = [manager._sequenced(message).encode() for message in messages]
+    records = [ws_codec.encode_record(message) for message in messages]
+    single = [ws_codec.encode_batch(manager.stream, n, [record]) for n, record in enumerate(records)]
+    batch = [ws_codec.encode_batch(manager.stream, 0, records)]
+    for name, payloads, count in (
+        ("JSON + deflate", texts, 1),
+        ("бинарный + deflate", single, 1),
+        ("бинарный пачкой + deflate", batch, len(messages)),
+    ):
+        size, cpu = _deflate(payloads)
+        print(
+            f"{name:<26} {size / count * args.recipients / 1024:9.1f} КБ/рассылка  "
+            f"{cpu / count * args.recipients:8.2f} мс CPU/рассылка (оценка)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# tests/conftest.py
+"""
+Общие фикстуры: отдельная SQLite-база во временном каталоге (app.db из
+репозитория не трогаем), SMTP подменён — письма копятся в sent_emails.
+Запуск из backend/: python -m pytest -q
+"""
+import os
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+_tmp = tempfile.mkdtemp(prefix="afisha-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["SPOOL_DIR"] = os.path.join(_tmp, "spool")
+# включает подсчёт SQL-запросов: число приходит в заголовке X-DB-Statements
+os.environ["DB_STATEMENT_BUDGET"] = "1000"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import email_utils  # noqa: E402
+from app.db.base import SessionLocal  # noqa: E402
+from app.db.models import EmailVerificationCode, User  # noqa: E402
+from app.main import app  # noqa: E402
+
+sent_emails = []
+email_utils.send_payloads = lambda payloads: sent_emails.extend(payloads) or []
+
+
+@pytest.fixture(scope="session")
+def tmp_root():
+    return _tmp
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def make_user(client, name: str = "Гость", admin: bool = False) -> SimpleNamespace:
+    """Регистрация с подтверждением email; id пользователя и заголовки с токеном."""
+    email = f"u{uuid.uuid4().hex[:12]}@example.com"
+    r = client.post(
+        "/auth/register",
+        json={"full_name": name, "email": email, "password": "abcdefg1", "password_confirm": "abcdefg1"},
+    )
+    assert r.status_code == 200, r.text
+    session = SessionLocal()
+    try:
+        user = session.query(User).filter(User.email == email).one()
+        user_id = user.id
+        code = session.query(EmailVerificationCode).filter(EmailVerificationCode.user_id == user.id).first().code
+        if admin:
+            user.role = "ADMIN"
+            session.commit()
+    finally:
+        session.close()
+    r = client.post("/auth/confirm-email", json={"email": email, "code": code})
+    assert r.status_code == 200, r.text
+    r = client.post("/auth/login", json={"email": email, "password": "abcdefg1"})
+    assert r.status_code == 200, r.text
+    return SimpleNamespace(id=user_id, headers={"Authorization": "Bearer " + r.json()["access_token"]})
+
+
+@pytest.fixture(scope="session")
+def admin(client):
+    return make_user(client, "Админ", admin=True)
+
+
+@pytest.fixture
+def user(client):
+    return make_user(client)
+
+
+def event_payload(**overrides) -> dict:
+    payload = {
+        "title": "Концерт",
+        "description": "Большой концерт",
+        "start_date": "2030-01-01T10:00:00",
+        "end_date": "2030-01-02T10:00:00",
+        "image_url": "x.png",
+        "city": "Москва",
+        "max_participants": None,
+        "participant_ids": [],
+    }
+    payload.update(overrides)
+    return payload
+
+
+def create_event(client, admin, **overrides) -> dict:
+    r = client.post("/auth/events", json=event_payload(**overrides), headers=admin.headers)
+    assert r.status_code == 200, r.text
+    return r.json()
@@ -0,0 +1,105 @@
+import time
+import uuid
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.admission import AdmissionQueue, AdmissionRejected
+from app.db.base import count_statements
+from app.services import admission_service, event_service
+from conftest import create_event, make_user
+
+
+def _join(client, event_id, user):
+    r = client.post(f"/auth/events/{event_id}/join", headers=user.headers)
+    assert r.status_code in (200, 202, 400), r.text
+    return r
+
+
+def _settle(client, event_id, user, ticket, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        r = client.get(f"/auth/events/{event_id}/queue/{ticket}", headers=user.headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        if body["status"] in ("joined", "rejected") or time.monotonic() > deadline:
+            return body
+        time.sleep(0.05)
+
+
+def test_new_hot_event_goes_through_queue(client, admin):
+    # событие ещё не в снимке каталога — очередь всё равно не обходится
+    event = create_event(client, admin, high_demand=True)
+    user = make_user(client)
+    r = _join(client, event["id"], user)
+    assert r.status_code == 202
+    assert _settle(client, event["id"], user, r.json()["ticket"])["status"] == "joined"
+    # уже участник — сразу обычный ответ
+    assert _join(client, event["id"], user).status_code == 200
+
+
+def test_queue_capacity_follows_counters_and_leaves(client, admin):
+    event = create_event(client, admin, high_demand=True, max_participants=2)
+    first, second, third, fourth = (make_user(client) for _ in range(4))
+    for user in (first, second):
+        ticket = _join(client, event["id"], user).json()["ticket"]
+        assert _settle(client, event["id"], user, ticket)["status"] == "joined"
+
+    r = _join(client, event["id"], third)
+    assert r.status_code == 400
+
+    client.post(f"/auth/events/{event['id']}/leave", headers=first.headers)
+    r = _join(client, event["id"], fourth)
+    assert r.status_code == 202
+    assert _settle(client, event["id"], fourth, r.json()["ticket"])["status"] == "joined"
+    page = client.get(f"/auth/events/{event['id']}/page").json()
+    assert page["participants_total"] == 2 and page["is_full"]
+
+
+def test_check_rejects_from_fresh_counter_only():
+    queue = AdmissionQueue(rate=10, max_waiting=10, ticket_ttl=60, remaining_ttl=60)
+    event_id, first, second = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    assert queue.check(event_id, first) is None
+    ticket = queue.enqueue(event_id, first, remaining=1)
+    assert queue.has_waiting()
+    # повторный запрос — тот же билет, второму мест по счётчику нет
+    assert queue.check(event_id, first) is ticket
+    with pytest.raises(AdmissionRejected):
+        queue.check(event_id, second)
+    # устаревший счётчик не отказывает: решит enqueue со свежим remaining
+    queue.remaining_ttl = 0
+    assert queue.check(event_id, second) is None
+
+
+def test_full_queue_rejects_without_db(client, admin, db, monkeypatch):
+    monkeypatch.setattr(admission_service.admission, "remaining_ttl", 60)
+    event = create_event(client, admin, high_demand=True, max_participants=1)
+    first, second = make_user(client), make_user(client)
+    ticket = _join(client, event["id"], first).json()["ticket"]
+    assert _settle(client, event["id"], first, ticket)["status"] == "joined"
+
+    with count_statements() as statements, pytest.raises(HTTPException) as exc:
+        admission_service.try_enqueue(db, UUID(event["id"]), SimpleNamespace(id=second.id))
+    assert exc.value.status_code == 400
+    assert statements[0] == 0
+
+
+def test_failed_join_rejects_only_its_ticket(client, admin, monkeypatch):
+    event = create_event(client, admin, high_demand=True, max_participants=5)
+    unlucky, lucky = make_user(client), make_user(client)
+    join_event = event_service.join_event
+
+    def flaky_join(db, event_id, user):
+        if user.id == unlucky.id:
+            raise HTTPException(status_code=400, detail="Не удалось записаться")
+        return join_event(db, event_id, user)
+
+    monkeypatch.setattr(event_service, "join_event", flaky_join)
+    # по одному допуску в секунду: второй билет ещё ждёт, когда первый получает отказ
+    monkeypatch.setattr(admission_service.admission, "rate", 1.0)
+    tickets = [(user, _join(client, event["id"], user).json()["ticket"]) for user in (unlucky, lucky)]
+    results = [_settle(client, event["id"], user, ticket) for user, ticket in tickets]
+    assert [r["status"] for r in results] == ["rejected", "joined"]
+    assert results[0]["detail"] == "Не удалось записаться"
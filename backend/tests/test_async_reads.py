@@ -0,0 +1,38 @@
+from uuid import UUID
+
+from app.db.models import User
+from app.services import event_service
+
+from conftest import create_event, make_user
+
+
+def test_event_detail_and_list_on_async_path(client, admin):
+    user = make_user(client)
+    event = create_event(client, admin, participant_ids=[str(user.id)])
+
+    r = client.get(f"/auth/events/{event['id']}")
+    assert r.status_code == 200
+    assert r.json()["participants"] == [str(user.id)]
+    assert event["id"] in {e["id"] for e in client.get("/auth/events").json()}
+    assert [e["id"] for e in client.get("/auth/events/my", headers=user.headers).json()] == [event["id"]]
+
+    client.delete(f"/auth/events/{event['id']}", headers=admin.headers)
+    # карточка удалённого события по-прежнему открывается, но с is_deleted
+    assert client.get(f"/auth/events/{event['id']}").json()["is_deleted"] is True
+    assert event["id"] not in {e["id"] for e in client.get("/auth/events").json()}
+    assert client.get("/auth/events/00000000-0000-0000-0000-000000000001").status_code == 404
+    assert client.get("/auth/events/my").status_code == 401
+
+
+def test_sync_reads_match_async_routes(client, admin, db):
+    user = make_user(client)
+    event = create_event(client, admin, participant_ids=[str(user.id)])
+    listed = {e["id"] for e in client.get("/auth/events").json()}
+    assert {str(e.id) for e in event_service.list_events(db)} == listed
+
+    detail = event_service.get_event(db, UUID(event["id"]))
+    assert detail.model_dump(mode="json") == client.get(f"/auth/events/{event['id']}").json()
+
+    owner = db.get(User, user.id)
+    events, next_cursor = event_service.list_user_events(db, owner)
+    assert [str(e.id) for e in events] == [event["id"]] and next_cursor is None
@@ -0,0 +1,67 @@
+import io
+import json
+
+from conftest import create_event, event_payload, make_user
+
+
+def test_bulk_import_ndjson_reports_row_errors(client, admin):
+    guest = make_user(client)
+    lines = [
+        json.dumps(event_payload(title="Первое", participant_ids=[str(guest.id)])),
+        "{не json",
+        json.dumps(event_payload(title="Без описания", description=None)),
+        "",
+        json.dumps(event_payload(title="Второе")),
+    ]
+    r = client.post(
+        "/auth/events/bulk",
+        files={"file": ("events.ndjson", io.BytesIO("\n".join(lines).encode()), "application/x-ndjson")},
+        headers=admin.headers,
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["created"] == 2
+    assert [e["row"] for e in body["errors"]] == [2, 3]
+    event = client.get(f"/auth/events/{body['event_ids'][0]}").json()
+    assert event["participants"] == [str(guest.id)]
+
+
+def test_bulk_import_csv(client, admin):
+    data = (
+        "title,description,start_date,end_date,image_url,city,max_participants\n"
+        "Лекция,О главном,2030-02-01T10:00:00,2030-02-01T12:00:00,l.png,Казань,10\n"
+        "Плохая,Даты наоборот,2030-02-02T10:00:00,2030-02-01T10:00:00,l.png,Казань,\n"
+    )
+    r = client.post(
+        "/auth/events/bulk",
+        files={"file": ("events.csv", io.BytesIO(data.encode()), "text/csv")},
+        headers=admin.headers,
+    )
+    body = r.json()
+    assert body["created"] == 1 and body["failed"] == 1
+    assert body["errors"][0]["row"] == 2
+
+
+def test_bulk_assign_participants_respects_limit(client, admin):
+    small = create_event(client, admin, max_participants=1)
+    big = create_event(client, admin)
+    a, b = make_user(client), make_user(client)
+    r = client.post(
+        "/auth/events/participants/bulk",
+        json={"items": [
+            {"event_id": big["id"], "user_ids": [str(a.id), str(b.id)]},
+            {"event_id": small["id"], "user_ids": [str(a.id), str(b.id)]},
+        ]},
+        headers=admin.headers,
+    )
+    body = r.json()
+    assert body["added"] == 2
+    assert [e["row"] for e in body["errors"]] == [2]
+    assert sorted(client.get(f"/auth/events/{big['id']}").json()["participants"]) == sorted([str(a.id), str(b.id)])
+    assert client.get(f"/auth/events/{small['id']}").json()["participants"] == []
+
+
+def test_bulk_requires_admin(client):
+    guest = make_user(client)
+    r = client.post("/auth/events/participants/bulk", json={"items": []}, headers=guest.headers)
+    assert r.status_code == 403
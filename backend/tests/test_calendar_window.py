@@ -0,0 +1,62 @@
+import uuid
+
+from app.services.event_service import calendar_feed
+
+from conftest import create_event
+
+
+def _city() -> str:
+    return f"Город-{uuid.uuid4().hex[:8]}"
+
+
+def test_list_date_window(client, admin):
+    city = _city()
+    march = create_event(client, admin, city=city, start_date="2030-03-01T10:00:00", end_date="2030-03-02T10:00:00")["id"]
+    april = create_event(client, admin, city=city, start_date="2030-04-01T10:00:00", end_date="2030-04-30T10:00:00")["id"]
+
+    def ids(**params):
+        r = client.get("/auth/events", params={"city": city, **params})
+        assert r.status_code == 200, r.text
+        return {e["id"] for e in r.json()}
+
+    assert ids(**{"from": "2030-03-05T00:00:00"}) == {april}
+    assert ids(to="2030-03-15T00:00:00") == {march}
+    # пересечение окна: апрельское событие ещё идёт 15 апреля
+    assert ids(**{"from": "2030-04-15T00:00:00", "to": "2030-04-16T00:00:00"}) == {april}
+    assert client.get("/auth/events", params={"from": "2030-02-01T00:00:00", "to": "2030-01-01T00:00:00"}).status_code == 400
+
+
+def test_city_calendar_ics_and_etag(client, admin):
+    city = _city()
+    event = create_event(client, admin, city=city, title="Ночь музеев")
+    url = f"/auth/events/calendar/{city}.ics"
+
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/calendar")
+    body = r.text
+    assert body.startswith("BEGIN:VCALENDAR") and "Ночь музеев" in body
+    etag = r.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/auth/events/{event['id']}", json={"title": "Ночь кино"}, headers=admin.headers)
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and "Ночь кино" in r.text
+
+    client.delete(f"/auth/events/{event['id']}", headers=admin.headers)
+    assert "Ночь кино" not in client.get(url).text
+
+
+def test_unknown_city_is_not_cached(client, admin):
+    city = _city()
+    r = client.get(f"/auth/events/calendar/{city}.ics")
+    assert r.status_code == 200
+    assert r.text.startswith("BEGIN:VCALENDAR") and "BEGIN:VEVENT" not in r.text
+    assert city not in calendar_feed._cities and city not in calendar_feed._bodies
+
+    # город появляется в кэше с первым событием и уходит с последним
+    event = create_event(client, admin, city=city)
+    assert "BEGIN:VEVENT" in client.get(f"/auth/events/calendar/{city}.ics").text
+    assert city in calendar_feed._cities
+    client.delete(f"/auth/events/{event['id']}", headers=admin.headers)
+    assert city not in calendar_feed._cities and city not in calendar_feed._bodies
@@ -0,0 +1,66 @@
+from uuid import UUID
+
+from app.config import settings
+from app.db.models import Event
+from app.repositories import event_repo
+from app.services import event_service
+
+from conftest import create_event, make_user
+
+
+def test_own_writes_are_visible_immediately(client, admin):
+    client.get("/auth/events")  # снимок загружен
+    event = create_event(client, admin, title="Сразу видно")
+    listed = {e["id"]: e for e in client.get("/auth/events").json()}
+    assert listed[event["id"]]["title"] == "Сразу видно"
+
+
+def test_other_worker_writes_arrive_through_change_feed(client, admin, db, monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG", 0)
+    event = create_event(client, admin, title="До")
+    client.get("/auth/events")
+    before = client.get("/auth/admin/catalog", headers=admin.headers).json()
+
+    # запись «другого воркера»: мимо сервиса и без mark_dirty
+    row = db.get(Event, UUID(event["id"]))
+    row.title = "После"
+    event_repo.record_changes(db, [row.id])
+    db.commit()
+    listed = {e["id"]: e for e in client.get("/auth/events").json()}
+    assert listed[event["id"]]["title"] == "До"  # снимок ещё свеж
+
+    monkeypatch.setattr(event_service.catalog, "max_staleness", 0)
+    listed = {e["id"]: e for e in client.get("/auth/events").json()}
+    assert listed[event["id"]]["title"] == "После"
+    after = client.get("/auth/admin/catalog", headers=admin.headers).json()
+    assert after["loaded"] and after["seq"] > before["seq"]
+    assert after["refreshes"] > before["refreshes"]
+    assert after["full_loads"] == before["full_loads"]
+
+
+def test_join_patches_snapshot_without_rebuilding_indexes(client, admin):
+    user = make_user(client)
+    event = create_event(client, admin, title="Без пересборки")
+    client.get("/auth/events")
+    before = client.get("/auth/admin/catalog", headers=admin.headers).json()
+    by_city = event_service.catalog.snapshot._by_city
+
+    assert client.post(f"/auth/events/{event['id']}/join", headers=user.headers).status_code == 200
+    listed = {e["id"]: e for e in client.get("/auth/events", params={"city": "Москва"}).json()}
+    assert listed[event["id"]]["participants"] == [str(user.id)]
+    assert client.get(f"/auth/events/{event['id']}").json()["participants"] == [str(user.id)]
+    after = client.get("/auth/admin/catalog", headers=admin.headers).json()
+    assert after["patches"] == before["patches"] + 1
+    assert after["full_loads"] == before["full_loads"]
+    # индексы других городов переиспользованы как есть
+    snapshot = event_service.catalog.snapshot
+    assert all(snapshot._by_city[city] is index for city, index in by_city.items() if city != "Москва")
+
+    # перенос даты сдвигает запись в индексе — снимок пересобирается
+    moved = {"start_date": "2031-01-01T10:00:00", "end_date": "2031-01-02T10:00:00"}
+    r = client.put(f"/auth/events/{event['id']}", json=moved, headers=admin.headers)
+    assert r.status_code == 200, r.text
+    listed = client.get("/auth/events").json()
+    assert [e["start_date"] for e in listed] == sorted(e["start_date"] for e in listed)
+    assert {e["id"]: e for e in listed}[event["id"]]["start_date"] == moved["start_date"]
+    assert client.get("/auth/admin/catalog", headers=admin.headers).json()["patches"] == after["patches"]
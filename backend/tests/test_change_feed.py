@@ -0,0 +1,52 @@
+from sqlalchemy import func
+
+from app.config import settings
+from app.db.models import EventChange
+
+from conftest import create_event
+
+
+def _changes(client, since, **params):
+    r = client.get("/auth/events/changes", params={"since": since, **params})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_change_feed_from_list_cursor(client, admin, monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG", 0)
+    kept = create_event(client, admin)
+    cursor = int(client.get("/auth/events").headers["X-Change-Cursor"])
+
+    client.put(f"/auth/events/{kept['id']}", json={"title": "Новое название"}, headers=admin.headers)
+    added = create_event(client, admin)
+    client.delete(f"/auth/events/{added['id']}", headers=admin.headers)
+
+    feed = _changes(client, cursor)
+    by_id = {c["event_id"]: c for c in feed["changes"]}
+    assert by_id[kept["id"]]["event"]["title"] == "Новое название"
+    assert by_id[added["id"]]["deleted"] is True and by_id[added["id"]]["event"] is None
+    assert not feed["has_more"]
+    assert _changes(client, feed["next_since"])["changes"] == []
+
+    page = _changes(client, cursor, limit=1)
+    assert len(page["changes"]) == 1 and page["has_more"]
+    assert page["next_since"] == page["changes"][0]["seq"]
+
+
+def test_fresh_changes_hold_the_cursor(client, admin, monkeypatch):
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_LAG", 3600)
+    cursor = int(client.get("/auth/events").headers["X-Change-Cursor"])
+    create_event(client, admin)
+    feed = _changes(client, cursor)
+    # изменение уже видно, но курсор не уходит дальше незакрытого окна
+    assert feed["changes"] and feed["next_since"] <= cursor
+
+
+def test_pruned_cursor_gets_410(client, admin, db):
+    create_event(client, admin)
+    create_event(client, admin)
+    high = db.query(func.max(EventChange.seq)).scalar()
+    db.query(EventChange).filter(EventChange.seq < high).delete()
+    db.commit()
+    assert client.get("/auth/events/changes", params={"since": 0}).status_code == 410
+    assert client.get("/auth/events/changes", params={"since": high - 1}).status_code == 200
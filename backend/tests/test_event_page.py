@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+
+from app.db.models import Event, EventCounterShard
+from app.services import event_service
+
+from conftest import create_event, make_user
+
+
+def _page(client, event_id, headers=None):
+    event_service.event_page_cache.clear()
+    event_service.participant_counter_cache.clear()
+    r = client.get(f"/auth/events/{event_id}/page", headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_page_combines_event_participants_and_related(client, admin):
+    a, b = make_user(client), make_user(client)
+    event = create_event(client, admin, participant_ids=[str(a.id), str(b.id)], max_participants=5, category="джаз")
+    related = create_event(client, admin, category="джаз")
+
+    page = _page(client, event["id"], headers=a.headers)
+    assert page["event"]["id"] == event["id"]
+    assert page["is_participant"] is True
+    assert page["participants_total"] == 2
+    assert {p["id"] for p in page["participants"]} == {str(a.id), str(b.id)}
+    assert page["spots_left"] == 3 and page["is_full"] is False
+    assert related["id"] in {e["id"] for e in page["related"]}
+    assert _page(client, event["id"])["is_participant"] is False
+
+
+def test_spots_left_counts_reserved_seats_and_shards(client, admin, db):
+    event = create_event(client, admin, max_participants=5)
+    row = db.get(Event, UUID(event["id"]))
+
+    # места в пулах воркеров недоступны обычной записи
+    row.seats_reserved = 5
+    db.commit()
+    page = _page(client, event["id"])
+    assert page["spots_left"] == 0 and page["is_full"] is True
+
+    # горячее событие: заняты только записанные (шарды), пулы раздают остальное
+    row.high_demand = True
+    db.add(EventCounterShard(event_id=row.id, shard=0, count=2, updates=2))
+    db.commit()
+    assert _page(client, event["id"])["spots_left"] == 3
+
+
+def test_concurrent_pages_do_not_exhaust_pool(client, admin):
+    event = create_event(client, admin)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        ids = list(pool.map(lambda _: _page(client, event["id"])["event"]["id"], range(64)))
+    assert ids == [event["id"]] * 64
+
+
+def test_page_reads_only_first_participants_page(client, admin):
+    users = [make_user(client) for _ in range(4)]
+    event = create_event(client, admin, participant_ids=[str(u.id) for u in users])
+    r = client.get(f"/auth/events/{event['id']}/page", params={"participants_limit": 2})
+    page = r.json()
+    assert page["participants_total"] == 4
+    assert len(page["participants"]) == 2
+    assert page["event"]["participants"] == [p["id"] for p in page["participants"]]
+    rest = client.get(
+        f"/auth/events/{event['id']}/participants",
+        params={"after": page["participants_next_cursor"], "limit": 2},
+    ).json()
+    ids = [p["id"] for p in page["participants"] + rest]
+    assert sorted(ids) == sorted(str(u.id) for u in users)
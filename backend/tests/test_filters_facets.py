@@ -0,0 +1,56 @@
+import uuid
+
+from conftest import create_event
+
+PAST = {"start_date": "2020-01-01T10:00:00", "end_date": "2020-01-02T10:00:00"}
+
+
+def _city() -> str:
+    return f"Город-{uuid.uuid4().hex[:8]}"
+
+
+def test_list_filters_by_city_category_status(client, admin):
+    city = _city()
+    concert = create_event(client, admin, city=city, category="концерт")["id"]
+    lecture = create_event(client, admin, city=city, category="лекция")["id"]
+    old = create_event(client, admin, city=city, category="лекция", **PAST)["id"]
+    create_event(client, admin, category="лекция")
+
+    def ids(**params):
+        r = client.get("/auth/events", params={"city": city, **params})
+        assert r.status_code == 200, r.text
+        return {e["id"] for e in r.json()}
+
+    assert ids() == {concert, lecture, old}
+    assert ids(category="лекция") == {lecture, old}
+    assert ids(category="лекция", status="past") == {old}
+    assert ids(status="upcoming") == {concert, lecture}
+
+
+def test_facets_follow_create_update_delete(client, admin):
+    city = _city()
+
+    def facets():
+        return client.get("/auth/events/facets").json()
+
+    event = create_event(client, admin, city=city, category="спорт")
+    assert facets()["cities"][city] == 1
+
+    client.put(f"/auth/events/{event['id']}", json={"city": city + "-2"}, headers=admin.headers)
+    counts = facets()
+    assert city not in counts["cities"]
+    assert counts["cities"][city + "-2"] == 1
+
+    client.delete(f"/auth/events/{event['id']}", headers=admin.headers)
+    assert city + "-2" not in facets()["cities"]
+
+
+def test_facets_by_status_narrow_cities_only(client, admin):
+    city = _city()
+    create_event(client, admin, city=city, **PAST)
+    everything = client.get("/auth/events/facets").json()
+    upcoming = client.get("/auth/events/facets", params={"status": "upcoming"}).json()
+    assert everything["cities"][city] == 1
+    assert city not in upcoming["cities"]
+    # счётчики статусов — по всем событиям, чтобы показать соседние вкладки
+    assert upcoming["statuses"] == everything["statuses"]
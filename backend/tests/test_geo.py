@@ -0,0 +1,58 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.geo import GeoIndex, haversine_km
+
+from conftest import create_event
+
+FUTURE = datetime(2100, 1, 1)
+
+
+def _brute(points, lat, lon, k):
+    return sorted((haversine_km(lat, lon, p_lat, p_lon), event_id) for event_id, p_lat, p_lon, _ in points)[:k]
+
+
+def test_nearest_on_sparse_index_is_fast_and_complete():
+    index = GeoIndex(rebuild_interval=300)
+    points = [(uuid.uuid4(), 55.75, 37.62, FUTURE), (uuid.uuid4(), -33.87, 151.21, FUTURE)]
+    points.append((uuid.uuid4(), 40.71, -74.0, datetime(2000, 1, 1)))
+    index.load(points)
+
+    started = time.perf_counter()
+    found = index.nearest(59.93, 30.34, k=10, not_ended_before=datetime(2020, 1, 1))
+    assert time.perf_counter() - started < 0.05
+    assert [event_id for _, event_id in found] == [points[0][0], points[1][0]]
+
+    assert GeoIndex(rebuild_interval=300).nearest(0, 0, k=5) == []
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    points = [
+        (uuid.uuid4(), rng.uniform(-60, 70), rng.uniform(-180, 180), FUTURE)
+        for _ in range(2000)
+    ]
+    index = GeoIndex(rebuild_interval=300)
+    index.load(points)
+    for lat, lon in [(55.75, 37.62), (0.0, 179.9), (-89.0, 0.0)]:
+        for k in (1, 20):
+            assert index.nearest(lat, lon, k) == _brute(points, lat, lon, k)
+
+
+def test_nearby_endpoint(client, admin):
+    near = create_event(client, admin, latitude=55.75, longitude=37.62)
+    create_event(
+        client, admin, latitude=55.76, longitude=37.63,
+        start_date="2020-01-01T10:00:00", end_date="2020-01-02T10:00:00",
+    )
+    r = client.get("/auth/events/nearby", params={"lat": 55.7558, "lon": 37.6173, "radius_km": 5})
+    assert r.status_code == 200, r.text
+    assert [e["id"] for e in r.json()] == [near["id"]]
+    assert r.json()[0]["distance_km"] < 1
+
+    moved = client.put(f"/auth/events/{near['id']}", json={"latitude": 10.0, "longitude": 10.0}, headers=admin.headers)
+    assert moved.status_code == 200
+    r = client.get("/auth/events/nearby", params={"lat": 55.7558, "lon": 37.6173, "radius_km": 5})
+    assert near["id"] not in [e["id"] for e in r.json()]
@@ -0,0 +1,169 @@
+import glob
+import os
+from uuid import UUID
+
+import pytest
+
+from app.config import settings
+from app.core.group_commit import GroupCommitWriter
+from app.db.models import EventParticipantLog
+from app.services import event_service
+from conftest import create_event, make_user
+
+
+def _writer(spool_dir, written, **kwargs) -> GroupCommitWriter:
+    return GroupCommitWriter("test-log", written.extend, spool_dir=str(spool_dir), **kwargs)
+
+
+def test_flush_writes_batch_and_drops_spool(tmp_path):
+    written = []
+    writer = _writer(tmp_path, written)
+    for n in range(3):
+        writer.append({"id": n})
+    assert len(glob.glob(str(tmp_path / "*.spool"))) == 1
+    assert writer.stats()["pending"] == 3
+    assert writer.flush() == 3
+    assert written == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert glob.glob(str(tmp_path / "*.spool")) == []
+    assert writer.stats()["batches"] == 1
+
+
+def test_failed_flush_is_retried(tmp_path):
+    written, calls = [], []
+
+    def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+        written.extend(rows)
+
+    writer = GroupCommitWriter("test-log", flaky, spool_dir=str(tmp_path))
+    writer.append({"id": 1})
+    assert writer.flush() == 0
+    assert writer.stats()["failures"] == 1 and writer.stats()["pending"] == 1
+    assert writer.flush() == 1
+    assert written == [{"id": 1}]
+
+
+def test_orphan_spool_is_recovered(tmp_path):
+    crashed = _writer(tmp_path, [])
+    crashed.append({"id": 1})
+    crashed.append({"id": 2})
+    # процесс «упал»: блокировка снята, сегмент остался, последняя строка оборвана
+    segment = crashed._current
+    os.write(segment.fd, b'{"id": 3')
+    os.close(segment.fd)
+
+    written = []
+    assert _writer(tmp_path, written).recover() == 2
+    assert written == [{"id": 1}, {"id": 2}]
+    assert glob.glob(str(tmp_path / "*.spool")) == []
+
+
+def test_live_segment_is_not_recovered(tmp_path):
+    alive = _writer(tmp_path, [])
+    alive.append({"id": 1})
+    written = []
+    assert _writer(tmp_path, written).recover() == 0
+    assert written == []
+    alive.flush()
+
+
+def _spooled(spool_dir):
+    return sorted(line for path in glob.glob(str(spool_dir / "*.spool")) for line in open(path).read().split())
+
+
+def test_staged_rows_follow_current_segment(tmp_path):
+    written = []
+    writer = _writer(tmp_path, written)
+    writer.stage([{"id": 1}])
+    assert _spooled(tmp_path) == ['{"id":1}']
+    assert writer.stats()["pending"] == 0
+    # пачка другой транзакции записана, её сегмент удалён — строка 1 переехала
+    writer.append({"id": 2})
+    assert writer.flush() == 1
+    assert _spooled(tmp_path) == ['{"id":1}']
+    writer.confirm([{"id": 1}])
+    writer.stage([{"id": 3}])
+    writer.discard([{"id": 3}])
+    assert writer.flush() == 1
+    assert written == [{"id": 2}, {"id": 1}]
+    assert writer._current is None or not writer._current.staged
+
+
+def test_recover_skips_uncommitted_rows(tmp_path):
+    crashed = _writer(tmp_path, [])
+    crashed.stage([{"id": 1}, {"id": 2}])
+    os.close(crashed._current.fd)
+
+    written = []
+    writer = _writer(tmp_path, written, committed=lambda rows: [row for row in rows if row["id"] == 2])
+    assert writer.recover() == 1
+    assert written == [{"id": 2}]
+    assert glob.glob(str(tmp_path / "*.spool")) == []
+
+
+def test_transaction_mode_starts_no_writer(client):
+    assert settings.PARTICIPANT_LOG_MODE == "transaction"
+    assert event_service.participant_log_writer._thread is None
+    assert not os.path.exists(settings.SPOOL_DIR)
+
+
+def test_group_mode_logs_join_and_update(client, admin, db, tmp_path, monkeypatch):
+    writer = GroupCommitWriter("participant-log", event_service._write_participant_logs, spool_dir=str(tmp_path))
+    monkeypatch.setattr(event_service, "participant_log_writer", writer)
+    monkeypatch.setattr(event_service.settings, "PARTICIPANT_LOG_MODE", "group")
+    event = create_event(client, admin)
+    event_id = UUID(event["id"])
+    first, second = make_user(client), make_user(client)
+    assert client.post(f"/auth/events/{event['id']}/join", headers=first.headers).status_code == 200
+    # правка списка в update_event идёт тем же путём, что join/leave
+    r = client.put(
+        f"/auth/events/{event['id']}",
+        json={"add_participant_ids": [str(second.id)], "remove_participant_ids": [str(first.id)]},
+        headers=admin.headers,
+    )
+    assert r.status_code == 200, r.text
+    logs = db.query(EventParticipantLog).filter(EventParticipantLog.event_id == event_id)
+    assert logs.count() == 0
+    assert writer.stats()["pending"] == 3
+    assert writer.flush() == 3
+    actions = sorted((log.user_id, log.action) for log in logs.all())
+    assert actions == sorted([(first.id, "join"), (first.id, "leave"), (second.id, "join")])
+
+
+def test_group_mode_spools_before_commit(client, admin, db, tmp_path, monkeypatch):
+    writer = GroupCommitWriter("participant-log", event_service._write_participant_logs, spool_dir=str(tmp_path))
+    monkeypatch.setattr(event_service, "participant_log_writer", writer)
+    monkeypatch.setattr(event_service.settings, "PARTICIPANT_LOG_MODE", "group")
+    event = create_event(client, admin)
+    event_id = UUID(event["id"])
+    first, second = make_user(client), make_user(client)
+    assert client.post(f"/auth/events/{event['id']}/join", headers=first.headers).status_code == 200
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("update failed")
+
+    # транзакция откатилась после записи строки в spool
+    with monkeypatch.context() as m:
+        m.setattr(event_service.event_repo, "update_event", broken)
+        with pytest.raises(RuntimeError):
+            client.put(
+                f"/auth/events/{event['id']}",
+                json={"add_participant_ids": [str(second.id)]},
+                headers=admin.headers,
+            )
+    assert writer.stats()["pending"] == 1
+    assert len(_spooled(tmp_path)) == 2
+
+    # процесс «упал» до сброса: досылается только строка закоммиченного join
+    os.close(writer._current.fd)
+    recovered = GroupCommitWriter(
+        "participant-log",
+        event_service._write_participant_logs,
+        spool_dir=str(tmp_path),
+        committed=event_service._committed_participant_logs,
+    )
+    assert recovered.recover() == 1
+    logs = db.query(EventParticipantLog).filter(EventParticipantLog.event_id == event_id).all()
+    assert [(log.user_id, log.action) for log in logs] == [(first.id, "join")]
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+
+from app.core.idempotency import MemoryIdempotencyStore
+from app.db.models import Event, User
+from app.services.idempotency_service import DatabaseIdempotencyStore
+from conftest import create_event, event_payload, make_user, sent_emails
+
+
+def _key() -> dict:
+    return {"Idempotency-Key": uuid.uuid4().hex}
+
+
+def test_register_replays_stored_response(client, db):
+    email = f"u{uuid.uuid4().hex[:12]}@example.com"
+    body = {"full_name": "Повтор", "email": email, "password": "abcdefg1", "password_confirm": "abcdefg1"}
+    headers = _key()
+    mails = len(sent_emails)
+    first = client.post("/auth/register", json=body, headers=headers)
+    second = client.post("/auth/register", json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert db.query(User).filter(User.email == email).count() == 1
+    assert len(sent_emails) - mails == 1
+
+
+def test_create_event_once(client, admin, db):
+    headers = {**admin.headers, **_key()}
+    payload = event_payload(title=f"Идемпотентное {uuid.uuid4().hex[:6]}")
+    first = client.post("/auth/events", json=payload, headers=headers)
+    second = client.post("/auth/events", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert db.query(Event).filter(Event.title == payload["title"]).count() == 1
+
+
+def test_same_key_other_body_is_rejected(client, admin):
+    headers = {**admin.headers, **_key()}
+    assert client.post("/auth/events", json=event_payload(title="А"), headers=headers).status_code == 200
+    r = client.post("/auth/events", json=event_payload(title="Б"), headers=headers)
+    assert r.status_code == 422
+
+
+def test_join_leave_replay_and_key_scope(client, admin):
+    event = create_event(client, admin)
+    user, other = make_user(client), make_user(client)
+    key = _key()
+    join = f"/auth/events/{event['id']}/join"
+    assert client.post(join, headers={**user.headers, **key}).status_code == 200
+    client.post(f"/auth/events/{event['id']}/leave", headers=user.headers)
+    # повтор join после выхода отвечается из хранилища и не записывает снова
+    r = client.post(join, headers={**user.headers, **key})
+    assert r.headers.get("Idempotent-Replayed") == "true"
+    assert str(user.id) not in client.get(f"/auth/events/{event['id']}").json()["participants"]
+    # ключ действует в пределах пользователя
+    r = client.post(join, headers={**other.headers, **key})
+    assert r.status_code == 200 and "Idempotent-Replayed" not in r.headers
+
+
+def test_invalid_key_and_error_responses(client, admin):
+    r = client.post("/auth/events", json=event_payload(), headers={**admin.headers, "Idempotency-Key": "x" * 300})
+    assert r.status_code == 400
+    # 4xx сохраняется и повторяется как есть
+    headers = {**admin.headers, **_key()}
+    missing = f"/auth/events/{uuid.uuid4()}/join"
+    assert client.post(missing, headers=headers).status_code == 404
+    r = client.post(missing, headers=headers)
+    assert r.status_code == 404 and r.headers["Idempotent-Replayed"] == "true"
+
+
+def test_memory_store_lease_and_eviction():
+    store = MemoryIdempotencyStore(ttl=60, lease=60, maxsize=2)
+
+    async def run():
+        assert await store.claim("a", "f") is None
+        pending = await store.claim("a", "f")
+        assert pending is not None and not pending.completed
+        await store.complete("a", 201, "application/json", b"{}")
+        done = await store.claim("a", "f")
+        assert done.completed and done.status_code == 201
+        await store.claim("b", "f")
+        await store.claim("c", "f")
+        assert store.stats()["keys"] <= 2
+
+    asyncio.run(run())
+
+
+def test_database_store_roundtrip(client):
+    store = DatabaseIdempotencyStore(ttl=60, lease=60)
+    key = uuid.uuid4().hex
+
+    async def run():
+        assert await store.claim(key, "f") is None
+        assert not (await store.claim(key, "f")).completed
+        await store.complete(key, 200, "application/json", b'{"ok":1}')
+        record = await store.claim(key, "f")
+        assert record.completed and record.body == b'{"ok":1}'
+        # release снимает только незавершённый запрос (ответ 5xx, обрыв)
+        await store.release(key)
+        assert (await store.claim(key, "f")).completed
+        other = uuid.uuid4().hex
+        assert await store.claim(other, "f") is None
+        await store.release(other)
+        assert await store.claim(other, "f") is None
+
+    client.portal.call(run)
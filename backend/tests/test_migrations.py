@@ -0,0 +1,85 @@
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import migrations
+from app.db.base import Base
+from app.db import models  # noqa: F401 — таблицы моделей в Base.metadata
+from app.repositories import search_repo
+
+
+def _engine(path):
+    return create_engine(f"sqlite:///{path}")
+
+
+def test_fresh_database_matches_models(tmp_path):
+    engine = _engine(tmp_path / "fresh.db")
+    assert migrations.migrate(engine) == migrations.LATEST_VERSION
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {c["name"] for c in insp.get_columns(table.name)}
+        assert {c.name for c in table.columns} <= columns, table.name
+    assert migrations.is_up_to_date(engine)
+
+
+def test_initial_migration_does_not_follow_models(tmp_path):
+    # v1 — зафиксированная схема: колонки, добавленные позже, приходят своими миграциями
+    engine = _engine(tmp_path / "v1.db")
+    with engine.begin() as conn:
+        migrations._initial(conn)
+    columns = {c["name"] for c in inspect(engine).get_columns("events")}
+    assert "category" not in columns and "participants_count" not in columns
+    assert "outbox" not in inspect(engine).get_table_names()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    engine = _engine(tmp_path / "twice.db")
+    migrations.migrate(engine)
+    migrations.migrate(engine)
+    with engine.connect() as conn:
+        versions = conn.execute(text("SELECT version FROM schema_version")).scalars().all()
+    assert sorted(versions) == list(range(1, migrations.LATEST_VERSION + 1))
+
+
+def test_concurrent_migrate_applies_each_version_once(tmp_path):
+    path = tmp_path / "race.db"
+    errors = []
+
+    def run():
+        try:
+            migrations.migrate(_engine(path))
+        except Exception as exc:  # pragma: no cover — сообщение в assert ниже
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    with _engine(path).connect() as conn:
+        versions = conn.execute(text("SELECT version FROM schema_version")).scalars().all()
+    assert sorted(versions) == list(range(1, migrations.LATEST_VERSION + 1))
+
+
+def test_search_migration_backfills_existing_events(tmp_path):
+    # миграция 4 — своя копия DDL; rowid должен совпадать с тем, что пишет search_repo
+    engine = _engine(tmp_path / "search.db")
+    event_id = uuid.uuid4()
+    with engine.begin() as conn:
+        for _, _, step in migrations.MIGRATIONS[:3]:
+            step(conn)
+        conn.execute(
+            text(
+                "INSERT INTO events (id, title, short_description, description, start_date, end_date, "
+                "image_url, city, category, status, is_deleted, created_at, updated_at) VALUES "
+                "(:id, 'Джазовый вечер', NULL, 'Музыка', :now, :now, 'x.png', 'Москва', 'прочее', "
+                "'upcoming', 0, :now, :now)"
+            ),
+            {"id": event_id.hex, "now": datetime.utcnow()},
+        )
+        migrations._event_search(conn)
+        rows = conn.execute(text("SELECT rowid, event_id FROM events_fts WHERE events_fts MATCH 'джаз*'")).all()
+    assert rows == [(search_repo._fts_rowid(event_id), event_id.hex)]
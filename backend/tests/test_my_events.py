@@ -0,0 +1,42 @@
+from conftest import create_event, make_user
+
+PAST = {"start_date": "2020-01-01T10:00:00", "end_date": "2020-01-02T10:00:00"}
+
+
+def _ids(response):
+    assert response.status_code == 200, response.text
+    return [e["id"] for e in response.json()]
+
+
+def test_my_events_sections_and_cursor(client, admin):
+    user = make_user(client)
+    me = [str(user.id)]
+    upcoming = [create_event(client, admin, participant_ids=me)["id"] for _ in range(3)]
+    past = create_event(client, admin, participant_ids=me, **PAST)["id"]
+    create_event(client, admin)  # чужое событие
+
+    assert set(_ids(client.get("/auth/events/my", headers=user.headers))) == {*upcoming, past}
+    assert set(_ids(client.get("/auth/events/my?section=upcoming", headers=user.headers))) == set(upcoming)
+    assert _ids(client.get("/auth/events/my?section=past", headers=user.headers)) == [past]
+
+    seen = []
+    params = {"section": "upcoming", "limit": 2}
+    while True:
+        r = client.get("/auth/events/my", params=params, headers=user.headers)
+        seen += _ids(r)
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["cursor"] = r.headers["X-Next-Cursor"]
+    assert sorted(seen) == sorted(upcoming)
+
+    assert client.get("/auth/events/my?section=soon", headers=user.headers).status_code == 400
+
+
+def test_my_events_cache_invalidated_by_join_and_leave(client, admin):
+    user = make_user(client)
+    event_id = create_event(client, admin)["id"]
+    assert _ids(client.get("/auth/events/my", headers=user.headers)) == []
+    client.post(f"/auth/events/{event_id}/join", headers=user.headers)
+    assert _ids(client.get("/auth/events/my", headers=user.headers)) == [event_id]
+    client.post(f"/auth/events/{event_id}/leave", headers=user.headers)
+    assert _ids(client.get("/auth/events/my", headers=user.headers)) == []
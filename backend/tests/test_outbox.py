@@ -0,0 +1,53 @@
+import time
+import uuid
+from datetime import datetime
+
+from app.core import email_utils
+from app.db.models import OutboxMessage
+from app.services import outbox_service
+
+from conftest import sent_emails
+
+
+def _wait(db, key, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        outbox_service.dispatch_once(db)
+        db.expire_all()
+        message = db.query(OutboxMessage).filter(OutboxMessage.idempotency_key == key).one()
+        if predicate(message) or time.monotonic() > deadline:
+            return message
+        time.sleep(0.05)
+
+
+def test_register_sends_confirmation_through_outbox(client, db):
+    email = f"u{uuid.uuid4().hex[:12]}@example.com"
+    r = client.post(
+        "/auth/register",
+        json={"full_name": "Гость", "email": email, "password": "abcdefg1", "password_confirm": "abcdefg1"},
+    )
+    assert r.status_code == 200, r.text
+    message = db.query(OutboxMessage).filter(OutboxMessage.payload.contains(email)).one()
+    assert message.kind == "email"
+    message = _wait(db, message.idempotency_key, lambda m: m.status == "done")
+    assert message.status == "done"
+    assert any(to == email for to, _ in sent_emails)
+
+
+def test_failed_delivery_is_retried(db, monkeypatch):
+    email = f"u{uuid.uuid4().hex[:12]}@example.com"
+    key = f"test:{email}"
+    outbox_service.enqueue_email(db, "welcome", email, {"full_name": "Гость"}, key=key)
+    outbox_service.enqueue_email(db, "welcome", email, {"full_name": "Дубль"}, key=key)
+    db.commit()
+    assert db.query(OutboxMessage).filter(OutboxMessage.idempotency_key == key).count() == 1
+
+    monkeypatch.setattr(email_utils, "send_payloads", lambda payloads: list(range(len(payloads))))
+    message = _wait(db, key, lambda m: m.attempts >= 1)
+    assert message.status == "pending" and message.last_error.startswith("smtp")
+    assert message.available_at > datetime.utcnow()
+
+    monkeypatch.undo()
+    message.available_at = datetime.utcnow()
+    db.commit()
+    assert _wait(db, key, lambda m: m.status == "done").status == "done"
@@ -0,0 +1,35 @@
+from conftest import create_event, make_user
+
+
+def test_participants_keyset_pages_and_etag(client, admin):
+    users = [make_user(client) for _ in range(5)]
+    event = create_event(client, admin, participant_ids=[str(u.id) for u in users])
+    url = f"/auth/events/{event['id']}/participants"
+
+    seen, params = [], {"limit": 2}
+    while True:
+        r = client.get(url, params=params)
+        assert r.status_code == 200, r.text
+        assert r.headers["X-Total-Count"] == "5"
+        seen += [p["id"] for p in r.json()]
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["after"] = r.headers["X-Next-Cursor"]
+    assert sorted(seen) == sorted(str(u.id) for u in users)
+    assert len(seen) == len(set(seen))
+
+    first = client.get(url, params={"limit": 2})
+    etag = first.headers["ETag"]
+    r = client.get(url, params={"limit": 2}, headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    newcomer = make_user(client)
+    client.post(f"/auth/events/{event['id']}/join", headers=newcomer.headers)
+    r = client.get(url, params={"limit": 2}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag and r.headers["X-Total-Count"] == "6"
+
+
+def test_participants_of_missing_event(client):
+    r = client.get("/auth/events/00000000-0000-0000-0000-000000000001/participants")
+    assert r.status_code == 404
@@ -0,0 +1,50 @@
+import uuid
+
+from app.core.recommendations import RecommendationIndex
+
+from conftest import create_event, make_user
+
+
+def test_index_put_and_remove_keep_popularity_order():
+    index = RecommendationIndex(refresh_interval=300)
+    a, b, c = (uuid.uuid4() for _ in range(3))
+    index.put(a, "Москва", "концерт", 5)  # до загрузки — no-op
+    assert index.top(10) == []
+
+    index.load([(a, "Москва", "концерт", 5), (b, "Казань", "лекция", 1)])
+    index.put(c, "Казань", "лекция", 9)
+    assert index.top(3) == [c, a, b]
+    assert index.top(1, city="казань", exclude={c}) == [b]
+
+    index.put(c, "Москва", "концерт", 0)
+    assert index.top(3) == [a, b, c]
+    index.remove(a)
+    index.remove(a)
+    assert index.top(3) == [b, c]
+    assert index.top(3, city="Москва") == [c, b]
+
+
+def test_recommended_follows_writes_without_refresh(client, admin):
+    city = f"Город-{uuid.uuid4().hex[:8]}"
+    user = make_user(client)
+
+    def recommended():
+        r = client.get("/auth/events/recommended", params={"city": city, "limit": 1}, headers=user.headers)
+        assert r.status_code == 200, r.text
+        return [e["id"] for e in r.json()]
+
+    recommended()  # индекс загружен
+    event = create_event(client, admin, city=city)
+    assert recommended() == [event["id"]]
+
+    client.put(
+        f"/auth/events/{event['id']}",
+        json={"start_date": "2020-01-01T10:00:00", "end_date": "2020-01-02T10:00:00"},
+        headers=admin.headers,
+    )
+    assert recommended() != [event["id"]]
+
+    other = create_event(client, admin, city=city)
+    assert recommended() == [other["id"]]
+    client.delete(f"/auth/events/{other['id']}", headers=admin.headers)
+    assert recommended() != [other["id"]]
@@ -0,0 +1,28 @@
+import uuid
+
+from conftest import create_event
+
+
+def test_search_ranks_title_over_description_and_follows_updates(client, admin):
+    word = f"кварк{uuid.uuid4().hex[:6]}"
+    in_title = create_event(client, admin, title=f"Лекция {word}ах")["id"]
+    in_text = create_event(client, admin, description=f"Расскажем о {word}е подробно")["id"]
+    create_event(client, admin, title="Совсем другое")
+
+    r = client.get("/auth/events/search", params={"q": word})
+    assert r.status_code == 200, r.text
+    assert [e["id"] for e in r.json()] == [in_title, in_text]
+    assert r.headers["X-Total-Count"] == "2"
+
+    page = client.get("/auth/events/search", params={"q": word, "limit": 1, "offset": 1}).json()
+    assert [e["id"] for e in page] == [in_text]
+
+    client.put(f"/auth/events/{in_text}", json={"description": "Ни слова о физике"}, headers=admin.headers)
+    client.delete(f"/auth/events/{in_title}", headers=admin.headers)
+    r = client.get("/auth/events/search", params={"q": word})
+    assert r.json() == [] and r.headers["X-Total-Count"] == "0"
+
+
+def test_search_ignores_query_syntax(client):
+    r = client.get("/auth/events/search", params={"q": 'NEAR("a" OR *) -'})
+    assert r.status_code == 200
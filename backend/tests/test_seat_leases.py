@@ -0,0 +1,181 @@
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+from app.db.base import SessionLocal, transaction
+from app.db.models import Event, EventSeatLease, User
+from app.repositories import event_repo
+from app.services import event_service
+from conftest import create_event, make_user
+
+
+@pytest.fixture(autouse=True)
+def paused_keeper(client):
+    # фоновый keeper забрал бы «упавшие» аренды раньше, чем их проверит тест
+    event_service.seat_lease_keeper.stop()
+    yield
+    event_service.seat_lease_keeper.start()
+
+
+def _seats(db, event_id):
+    db.expire_all()
+    event = db.get(Event, event_id)
+    count, _ = event_repo.counter_shards(db, event_id)
+    return event.seats_reserved, count
+
+
+def _crashed_worker(db, event_id, seats, expired=True):
+    """Резерв воркера, упавшего без release_seats."""
+    until = datetime.utcnow() + (timedelta(seconds=-1) if expired else timedelta(minutes=5))
+    with transaction(db):
+        return event_repo.reserve_seats(db, event_id, seats, "dead-host:1:0", until)
+
+
+def test_crashed_worker_seats_are_reclaimed(client, admin, db):
+    event = create_event(client, admin, high_demand=True, max_participants=3)
+    event_id = UUID(event["id"])
+    assert _crashed_worker(db, event_id, 3) == 3
+    user = make_user(client)
+    # все места висят в пуле мёртвого воркера
+    with pytest.raises(HTTPException):
+        event_service.join_event(db, event_id, SimpleNamespace(id=user.id))
+
+    assert event_service.keep_seat_leases(db) == {event_id: 3}
+    assert _seats(db, event_id)[0] == 0
+    assert db.query(EventSeatLease).filter(EventSeatLease.event_id == event_id).count() == 0
+    event_service.join_event(db, event_id, SimpleNamespace(id=user.id))
+    assert event_repo.is_participant(db, event_id, user.id)
+
+
+def test_live_lease_is_renewed_not_reclaimed(client, admin, db):
+    event = create_event(client, admin, high_demand=True, max_participants=5)
+    event_id = UUID(event["id"])
+    user = make_user(client)
+    event_service.join_event(db, event_id, SimpleNamespace(id=user.id))
+    lease = db.get(EventSeatLease, (event_id, event_service.seat_pool.owner))
+    # одно место ушло участнику, остаток партии — в аренде
+    assert lease.seats == 4
+    assert event_service.keep_seat_leases(db) == {}
+    db.expire_all()
+    assert db.get(EventSeatLease, (event_id, event_service.seat_pool.owner)).expires_at > datetime.utcnow()
+
+
+def test_lost_lease_drops_stale_pool(client, admin, db):
+    event = create_event(client, admin, high_demand=True, max_participants=4)
+    event_id = UUID(event["id"])
+    first, second = make_user(client), make_user(client)
+    event_service.join_event(db, event_id, SimpleNamespace(id=first.id))
+    # воркер «завис»: другой воркер забрал его аренду, а пул в памяти ещё полон
+    with transaction(db):
+        db.query(EventSeatLease).filter(EventSeatLease.event_id == event_id).update(
+            {"expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        assert event_repo.reclaim_expired_leases(db, datetime.utcnow()) == {event_id: 3}
+    assert _crashed_worker(db, event_id, 3, expired=False) == 3
+    # мест в лимите нет: недействительный пул не даёт записаться сверх max
+    with pytest.raises(HTTPException):
+        event_service.join_event(db, event_id, SimpleNamespace(id=second.id))
+    assert event_service.seat_pool.take(event_id) is False
+    with transaction(db):
+        event_repo.release_leases(db, "dead-host:1:0", event_id)
+
+
+def test_concurrent_joins_never_exceed_limit(client, admin, monkeypatch):
+    limit = 4
+    event = create_event(client, admin, high_demand=True, max_participants=limit)
+    event_id = UUID(event["id"])
+    users = [make_user(client) for _ in range(12)]
+    session = SessionLocal()
+    try:
+        # мёртвый воркер держит часть мест, аренды истекают прямо во время записи
+        _crashed_worker(session, event_id, 2)
+    finally:
+        session.close()
+    monkeypatch.setattr(event_service.settings, "SEAT_LEASE_SECONDS", 0)
+    monkeypatch.setattr(event_service.seat_pool, "batch", 2)
+    start = threading.Barrier(len(users) + 1)
+
+    def join(user):
+        session = SessionLocal()
+        start.wait()
+        try:
+            for _ in range(20):
+                try:
+                    event_service.join_event(session, event_id, SimpleNamespace(id=user.id))
+                    return
+                except HTTPException:
+                    return
+                except OperationalError:
+                    session.rollback()  # SQLite: database is locked — повторяем
+        finally:
+            session.close()
+
+    def reclaim():
+        session = SessionLocal()
+        start.wait()
+        try:
+            for _ in range(10):
+                try:
+                    event_service.keep_seat_leases(session)
+                except OperationalError:
+                    session.rollback()
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=join, args=(user,)) for user in users]
+    threads.append(threading.Thread(target=reclaim))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    session = SessionLocal()
+    try:
+        joined = len(event_repo.get_participant_ids(session, event_id))
+        seats_reserved, shards = _seats(session, event_id)
+        leased = sum(
+            lease.seats for lease in session.query(EventSeatLease).filter(EventSeatLease.event_id == event_id)
+        )
+    finally:
+        session.close()
+    assert 0 < joined <= limit
+    assert shards == joined
+    # в seats_reserved — занятые места и ещё не выданные места аренд
+    assert seats_reserved == joined + leased
+    assert seats_reserved <= limit
+    event_service.seat_pool.drain(event_id)
+
+
+def test_cold_join_rechecks_limit_in_transaction(client, admin, db):
+    event = create_event(client, admin, max_participants=1)
+    event_id = UUID(event["id"])
+    first, second = make_user(client), make_user(client)
+    # строка события прочитана до того, как последнее место занял другой запрос
+    assert db.get(Event, event_id).participants_count == 0
+    other = SessionLocal()
+    try:
+        event_service.join_event(other, event_id, other.get(User, first.id))
+    finally:
+        other.close()
+    with pytest.raises(HTTPException):
+        event_service.join_event(db, event_id, db.get(User, second.id))
+    assert event_repo.get_participant_ids(db, event_id) == {first.id}
+
+
+def test_update_releases_seats_only_when_event_cools_down(client, admin, db, monkeypatch):
+    released = []
+    monkeypatch.setattr(event_service, "release_seats", lambda db, event_id=None: released.append(event_id))
+    cold = create_event(client, admin)
+    hot = create_event(client, admin, high_demand=True)
+    for event in (cold, hot):
+        r = client.put(f"/auth/events/{event['id']}", json={"title": "Новое название"}, headers=admin.headers)
+        assert r.status_code == 200, r.text
+    assert released == []
+    r = client.put(f"/auth/events/{hot['id']}", json={"high_demand": False}, headers=admin.headers)
+    assert r.status_code == 200, r.text
+    assert released == [UUID(hot["id"])]
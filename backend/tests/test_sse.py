@@ -0,0 +1,89 @@
+import asyncio
+import json
+import uuid
+
+from app.core.ws_manager import ws_manager
+
+# TestClient дочитывает ответ до конца, поэтому бесконечный поток
+# /auth/events/stream проверяем через генератор, который отдаёт роут
+
+
+def _participant(event_id: str, n: int) -> str:
+    return json.dumps(
+        {
+            "type": "participant",
+            "action": "join",
+            "event_id": event_id,
+            "user_id": str(uuid.uuid4()),
+            "id": f"participant:{n}",
+        }
+    )
+
+
+def _parse(frame: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+async def _read(frames, n: int) -> list:
+    return [_parse(await asyncio.wait_for(anext(frames), 2)) for _ in range(n)]
+
+
+def test_stream_frames_and_last_event_id(client):
+    event_id, other = str(uuid.uuid4()), str(uuid.uuid4())
+
+    async def run():
+        conn = ws_manager.sse_subscribe(event_id)
+        frames = ws_manager.sse_frames(conn)
+        assert await anext(frames) == b"retry: 3000\n\n"
+        (hello,) = await _read(frames, 1)
+        assert hello["data"]["type"] == "hello"
+        assert hello["id"] == f"{ws_manager.stream}:{ws_manager.replay.seq}"
+        # рассылки других событий подписчику не уходят
+        for message in (_participant(other, 1), _participant(event_id, 2)):
+            await ws_manager.broadcast(message)
+        (frame,) = await _read(frames, 1)
+        assert frame["data"]["id"] == "participant:2"
+        assert frame["id"] == f"{ws_manager.stream}:{frame['data']['seq']}"
+        assert ws_manager.stats()["sse"] >= 1
+        await frames.aclose()
+        assert conn not in ws_manager.sse.get(event_id, ())
+
+        # переподключение с Last-Event-ID — только пропущенное по этому событию
+        for n, target in enumerate((event_id, other, event_id), start=3):
+            await ws_manager.broadcast(_participant(target, n))
+        conn = ws_manager.sse_subscribe(event_id, frame["id"])
+        frames = ws_manager.sse_frames(conn)
+        await anext(frames)
+        missed = await _read(frames, 2)
+        assert [f["data"]["id"] for f in missed] == ["participant:3", "participant:5"]
+        await frames.aclose()
+
+    client.portal.call(run)
+
+
+def test_resync_and_keepalive(client):
+    event_id = str(uuid.uuid4())
+
+    async def run():
+        conn = ws_manager.sse_subscribe(event_id, "0000000000000000:1")
+        frames = ws_manager.sse_frames(conn)
+        await anext(frames)
+        (resync,) = await _read(frames, 1)
+        assert resync["data"]["type"] == "resync_required"
+        # keep-alive — кадр без data, сдвигает Last-Event-ID
+        ws_manager._sse_beat()
+        (beat,) = await _read(frames, 1)
+        assert "data" not in beat and beat["id"] == f"{ws_manager.stream}:{ws_manager.replay.seq}"
+        await frames.aclose()
+
+    client.portal.call(run)
+
+
+def test_stream_limit_and_validation(client, monkeypatch):
+    monkeypatch.setattr("app.core.ws_manager.settings.SSE_MAX_CONNECTIONS", 0)
+    r = client.get(f"/auth/events/stream?event_id={uuid.uuid4()}")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "5"
+    assert client.get("/auth/events/stream?event_id=bad").status_code == 422
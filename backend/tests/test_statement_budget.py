@@ -0,0 +1,79 @@
+"""
+Бюджет SQL-запросов на горячие эндпоинты. Число берётся из заголовка
+X-DB-Statements (middleware DB_STATEMENT_BUDGET, включён в conftest);
+кэши сбрасываются, чтобы мерить холодный путь, а периодический перевод
+прошедших событий в past откладывается — это не стоимость запроса. Бюджет не должен зависеть
+от числа событий и участников — N+1 сразу выйдет за предел.
+"""
+import time
+
+import pytest
+
+from app.services import event_service
+
+from conftest import create_event, make_user
+
+BUDGETS = {
+    "list": 8,
+    "my": 4,
+    "page": 6,
+    "join": 10,
+    "leave": 10,
+}
+
+
+def _statements(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-DB-Statements"])
+
+
+def _cold() -> None:
+    event_service._last_sweep = time.monotonic()
+    event_service.my_events_cache.clear()
+    event_service.event_page_cache.clear()
+    event_service.catalog.mark_dirty()
+
+
+@pytest.fixture(scope="module")
+def crowd(client, admin):
+    users = [make_user(client) for _ in range(12)]
+    ids = [str(u.id) for u in users]
+    events = [create_event(client, admin, participant_ids=ids) for _ in range(6)]
+    return users, events
+
+
+def test_list_events_within_budget(client, crowd):
+    _cold()
+    assert _statements(client.get("/auth/events")) <= BUDGETS["list"]
+    _cold()
+    assert _statements(client.get("/auth/events", params={"city": "Москва", "status": "upcoming"})) <= BUDGETS["list"]
+
+
+def test_my_events_does_not_grow_with_participation(client, admin, crowd):
+    users, _ = crowd
+    newcomer = make_user(client)
+    create_event(client, admin, participant_ids=[str(newcomer.id)])
+    counts = []
+    for user in (newcomer, users[0]):  # одно событие против шести
+        _cold()
+        counts.append(_statements(client.get("/auth/events/my", headers=user.headers)))
+    assert counts[0] == counts[1] <= BUDGETS["my"]
+
+
+def test_event_page_within_budget(client, crowd):
+    users, events = crowd
+    event_id = events[0]["id"]
+    _cold()
+    assert _statements(client.get(f"/auth/events/{event_id}/page")) <= BUDGETS["page"]
+    _cold()
+    assert _statements(client.get(f"/auth/events/{event_id}/page", headers=users[0].headers)) <= BUDGETS["page"]
+
+
+def test_join_and_leave_within_budget(client, crowd):
+    _, events = crowd
+    user = make_user(client)
+    event_id = events[1]["id"]
+    _cold()
+    assert _statements(client.post(f"/auth/events/{event_id}/join", headers=user.headers)) <= BUDGETS["join"]
+    _cold()
+    assert _statements(client.post(f"/auth/events/{event_id}/leave", headers=user.headers)) <= BUDGETS["leave"]
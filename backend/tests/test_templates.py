@@ -0,0 +1,33 @@
+import pytest
+
+from app.core.templates import Template, email_templates
+
+
+def test_template_slots_escaping_partials_and_subject():
+    template = Template(
+        "t",
+        "Subject: Привет, {{ name }}!\n\n{{> head }}<p>{{ name }}</p>{{{ block }}}",
+        {"head": "<h1>{{ title }}</h1>"},
+    )
+    assert template.slots == {"title", "name", "block"}
+    body = template.render(title="A&B", name="<Иван>", block="<b>raw</b>")
+    assert body.decode() == "<h1>A&amp;B</h1><p>&lt;Иван&gt;</p><b>raw</b>"
+    assert template.subject(name="O'Neil & Co") == "Привет, O'Neil & Co!"
+    with pytest.raises(KeyError):
+        template.render(title="x", name="y")
+
+
+def test_missing_partial_fails_at_compile_time():
+    with pytest.raises(ValueError):
+        Template("t", "{{> nope }}", {})
+
+
+def test_email_templates_render_with_their_slots():
+    assert len(email_templates) >= 6
+    for name in ("confirmation_code", "reset_code", "welcome", "password_changed", "event_invitation"):
+        template = email_templates.get(name)
+        values = {slot: f"<{slot}>" for slot in template.slots}
+        body = template.render(**values).decode()
+        assert template.subject(**values)
+        for slot in template.slots:
+            assert f"<{slot}>" in body or f"&lt;{slot}&gt;" in body
@@ -0,0 +1,70 @@
+import sqlite3
+import uuid
+from uuid import UUID
+
+from app.db.base import transaction
+from app.db.models import EventParticipantLog
+from app.repositories import event_repo
+
+from conftest import create_event, make_user
+
+
+def _participants(client, event_id):
+    return set(client.get(f"/auth/events/{event_id}").json()["participants"])
+
+
+def test_update_event_applies_participant_delta(client, admin, db):
+    a, b, c = (make_user(client) for _ in range(3))
+    event = create_event(client, admin, participant_ids=[str(a.id), str(b.id)])
+
+    r = client.put(
+        f"/auth/events/{event['id']}",
+        json={"add_participant_ids": [str(c.id)], "remove_participant_ids": [str(a.id)]},
+        headers=admin.headers,
+    )
+    assert r.status_code == 200, r.text
+    assert set(r.json()["participants"]) == {str(b.id), str(c.id)}
+
+    # полный список превращается в ту же дельту
+    r = client.put(f"/auth/events/{event['id']}", json={"participant_ids": [str(a.id)]}, headers=admin.headers)
+    assert set(r.json()["participants"]) == {str(a.id)}
+    assert _participants(client, event["id"]) == {str(a.id)}
+
+    log = client.get(f"/auth/events/{event['id']}/participation-log", headers=admin.headers).json()
+    assert {u["id"] for u in log["active"]} == {str(a.id)}
+    assert {u["id"] for u in log["declined"]} == {str(b.id), str(c.id)}
+
+
+def test_update_event_skips_unknown_and_repeated_ids(client, admin, db):
+    a = make_user(client)
+    event = create_event(client, admin, participant_ids=[str(a.id)])
+    logs = db.query(EventParticipantLog).filter(EventParticipantLog.event_id == UUID(event["id"]))
+    before = logs.count()
+    missing = "00000000-0000-0000-0000-000000000001"
+    r = client.put(
+        f"/auth/events/{event['id']}",
+        json={"add_participant_ids": [str(a.id), missing]},
+        headers=admin.headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["participants"] == [str(a.id)]
+    # повторное добавление уже записанного участника не пишет лог
+    assert logs.count() == before
+
+
+def test_large_change_set_fits_sqlite_parameter_limit(client, admin, db):
+    event = create_event(client, admin)
+    event_id = UUID(event["id"])
+    # лимит старых SQLite: запрос не больше чем с 999 параметрами
+    db.connection().connection.dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    user_ids = {uuid.uuid4() for _ in range(1500)}
+    try:
+        with transaction(db):
+            added, removed = event_repo.apply_participant_changes(db, event_id, user_ids, set())
+        assert set(added) == user_ids and removed == []
+        with transaction(db):
+            added, removed = event_repo.apply_participant_changes(db, event_id, set(), user_ids)
+        assert added == [] and set(removed) == user_ids
+        assert event_repo.get_participant_ids(db, event_id) == set()
+    finally:
+        db.connection().connection.dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 32766)
@@ -0,0 +1,84 @@
+import json
+import uuid
+
+import pytest
+
+from app.core import ws_codec
+from app.core.ws_manager import ws_manager
+
+
+def _participant(event_id: str, n: int, action: str = "join") -> str:
+    return json.dumps(
+        {
+            "type": "participant",
+            "action": action,
+            "event_id": event_id,
+            "user_id": str(uuid.uuid4()),
+            "id": f"participant:{n}",
+        }
+    )
+
+
+def test_batch_roundtrip():
+    event_id = str(uuid.uuid4())
+    messages = [
+        _participant(event_id, 7),
+        _participant(event_id, 8, "leave"),
+        json.dumps({"type": "event.updated", "x": "ё"}),
+    ]
+    records = [ws_codec.encode_record(message) for message in messages]
+    # participant — фиксированные 42 байта вместо JSON
+    assert len(records[0]) == 42 < len(messages[0])
+    assert records[2][0] == ws_codec.RECORD_JSON
+    stream, decoded = ws_codec.decode_batch(ws_codec.encode_batch("0123456789abcdef", 41, records))
+    assert stream == "0123456789abcdef"
+    assert [m["seq"] for m in decoded] == [41, 42, 43]
+    for original, message in zip(messages, decoded):
+        assert {k: v for k, v in message.items() if k not in ("seq", "stream")} == json.loads(original)
+
+
+def test_non_standard_participant_falls_back_to_json():
+    message = json.dumps(
+        {"type": "participant", "action": "join", "event_id": "nope", "user_id": "x", "id": "participant:1"}
+    )
+    record = ws_codec.encode_record(message)
+    assert record[0] == ws_codec.RECORD_JSON
+    _, decoded = ws_codec.decode_batch(ws_codec.encode_batch("00" * 8, 1, [record]))
+    assert decoded[0]["event_id"] == "nope"
+
+
+def test_unknown_frame_is_rejected():
+    frame = bytearray(ws_codec.encode_batch("00" * 8, 1, []))
+    frame[0] = 2
+    with pytest.raises(ValueError):
+        ws_codec.decode_batch(bytes(frame))
+
+
+def test_binary_subprotocol(client, admin, monkeypatch):
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_BINARY_BATCH_INTERVAL", 0)
+    event_id = str(uuid.uuid4())
+    with client.websocket_connect("/ws/events", subprotocols=[ws_codec.SUBPROTOCOL]) as ws:
+        assert ws.accepted_subprotocol == ws_codec.SUBPROTOCOL
+        # служебные сообщения — текстом
+        hello = json.loads(ws.receive_text())
+        assert hello["type"] == "hello"
+        assert client.get("/auth/admin/ws", headers=admin.headers).json()["binary"] == 1
+        for n in (1, 2):
+            client.portal.call(ws_manager.broadcast, _participant(event_id, n))
+        received = []
+        while len(received) < 2:
+            _, messages = ws_codec.decode_batch(ws.receive_bytes())
+            received += [m for m in messages if m.get("event_id") == event_id]
+    assert [m["id"] for m in received] == ["participant:1", "participant:2"]
+    assert received[1]["seq"] == received[0]["seq"] + 1
+    # бинарный клиент догоняет пропущенное тоже пачкой
+    url = f"/ws/events?stream={hello['stream']}&since={received[0]['seq']}"
+    with client.websocket_connect(url, subprotocols=[ws_codec.SUBPROTOCOL]) as ws:
+        _, messages = ws_codec.decode_batch(ws.receive_bytes())
+    assert messages[0]["id"] == "participant:2"
+
+
+def test_text_client_without_subprotocol(client):
+    with client.websocket_connect("/ws/events") as ws:
+        assert ws.accepted_subprotocol is None
+        assert json.loads(ws.receive_text())["type"] == "hello"
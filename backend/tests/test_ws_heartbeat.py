@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.ws_manager import CLOSE_IDLE, CLOSE_POLICY, CLOSE_TRY_LATER, ws_manager
+
+
+def _stats(client, admin) -> dict:
+    r = client.get("/auth/admin/ws", headers=admin.headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _next(ws) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data.get("type") != "participant":
+            return data
+
+
+def test_ping_keeps_connection_alive(client, admin, monkeypatch):
+    monkeypatch.setattr(ws_manager.wheel, "tick", 0.1)
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_PING_INTERVAL", 0.2)
+    pings = _stats(client, admin)["pings"]
+    with client.websocket_connect("/ws/events") as ws:
+        assert _next(ws)["type"] == "hello"
+        assert _stats(client, admin)["timers"] >= 1
+        assert _next(ws)["type"] == "ping"
+        ws.send_text(json.dumps({"type": "pong"}))
+        assert _next(ws)["type"] == "ping"
+    assert _stats(client, admin)["pings"] >= pings + 2
+
+
+def test_silent_client_is_reaped(client, admin, monkeypatch):
+    monkeypatch.setattr(ws_manager.wheel, "tick", 0.1)
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_PING_INTERVAL", 0.2)
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_IDLE_TIMEOUT", 0.1)
+    reaped = _stats(client, admin)["reaped_idle"]
+    with client.websocket_connect("/ws/events") as ws:
+        assert _next(ws)["type"] == "hello"
+        with pytest.raises(WebSocketDisconnect) as exc:
+            while True:
+                _next(ws)
+    assert exc.value.code == CLOSE_IDLE
+    stats = _stats(client, admin)
+    assert stats["reaped_idle"] == reaped + 1
+    assert stats["connections"] == 0
+
+
+def test_connection_caps(client, admin, monkeypatch):
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_MAX_CONNECTIONS_PER_IP", 1)
+    before = _stats(client, admin)
+    with client.websocket_connect("/ws/events") as ws:
+        assert _next(ws)["type"] == "hello"
+        # второе соединение с того же IP отклоняется до accept
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/ws/events"):
+                pass
+        assert exc.value.code == CLOSE_TRY_LATER
+        stats = _stats(client, admin)
+        assert stats["connections"] == 1 and stats["ips"] == 1
+    monkeypatch.setattr("app.core.ws_manager.settings.WS_MAX_CONNECTIONS", 0)
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws/events"):
+            pass
+    stats = _stats(client, admin)
+    assert stats["rejected_ip"] == before["rejected_ip"] + 1
+    assert stats["rejected_worker"] == before["rejected_worker"] + 1
+
+
+def test_token_is_checked(client, admin, user):
+    rejected = _stats(client, admin)["rejected_token"]
+    with client.websocket_connect("/ws/events?token=garbage") as ws:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_text()
+    assert exc.value.code == CLOSE_POLICY
+    assert _stats(client, admin)["rejected_token"] == rejected + 1
+
+    token = user.headers["Authorization"].split()[1]
+    with client.websocket_connect(f"/ws/events?token={token}") as ws:
+        assert _next(ws)["type"] == "hello"
+        assert _stats(client, admin)["authenticated"] == 1
@@ -0,0 +1,59 @@
+import json
+import uuid
+
+from app.core.ws_manager import ReplayBuffer, ws_manager
+
+
+def _broadcast(client, event_id: str, n: int) -> None:
+    message = {
+        "type": "participant",
+        "action": "join",
+        "event_id": event_id,
+        "user_id": str(uuid.uuid4()),
+        "id": f"participant:{n}",
+    }
+    client.portal.call(ws_manager.broadcast, json.dumps(message))
+
+
+def _receive_for(ws, event_id: str) -> dict:
+    # рассылки других тестов (outbox) пропускаем
+    while True:
+        data = json.loads(ws.receive_text())
+        if data.get("event_id") == event_id:
+            return data
+
+
+def test_resume_sends_only_missed_messages(client):
+    event_id = str(uuid.uuid4())
+    with client.websocket_connect("/ws/events") as ws:
+        hello = json.loads(ws.receive_text())
+        assert hello["type"] == "hello" and hello["stream"] == ws_manager.stream
+        _broadcast(client, event_id, 1)
+        last = _receive_for(ws, event_id)
+        assert last["seq"] == hello["seq"] + 1 and last["id"] == "participant:1"
+    _broadcast(client, event_id, 2)
+    _broadcast(client, event_id, 3)
+    url = f"/ws/events?stream={last['stream']}&since={last['seq']}"
+    with client.websocket_connect(url) as ws:
+        missed = [_receive_for(ws, event_id) for _ in range(2)]
+    assert [m["id"] for m in missed] == ["participant:2", "participant:3"]
+    assert [m["seq"] for m in missed] == [last["seq"] + 1, last["seq"] + 2]
+
+
+def test_unknown_stream_requires_resync(client):
+    with client.websocket_connect("/ws/events?stream=0000000000000000&since=1") as ws:
+        data = json.loads(ws.receive_text())
+    assert data["type"] == "resync_required"
+    assert data["stream"] == ws_manager.stream and data["seq"] == ws_manager.replay.seq
+
+
+def test_replay_buffer_window():
+    buffer = ReplayBuffer(3)
+    for n in range(1, 6):
+        buffer.append(f"t{n}", f"m{n}")
+    assert buffer.seq == 5
+    assert [seq for seq, _, _ in buffer.since(3)] == [4, 5]
+    assert buffer.since(2) == [(3, "t3", "m3"), (4, "t4", "m4"), (5, "t5", "m5")]
+    assert buffer.since(5) == []
+    # seq 2 уже вытеснен — клиенту нужен resync
+    assert buffer.since(1) is None
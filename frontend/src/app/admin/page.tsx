@@ -27,6 +27,7 @@ import {
   FiGlobe,
   FiArrowLeft
 } from "react-icons/fi";
+import { connectEventsSocket } from "@/shared/api/eventsSocket";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000";
 
@@ -889,15 +890,10 @@ const EventsBlock: React.FC<{
   // WebSocket для живых обновлений участников
   useEffect(() => {
     if (disabled) return;
-    const wsUrl = (process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000").replace(
-      /^http/,
-      "ws"
-    );
-    const socket = new WebSocket(`${wsUrl}/ws/events`);
-
-    socket.onmessage = (ev) => {
-      try {
-        const data = JSON.parse(ev.data);
+    return connectEventsSocket({
+      // пропущенное при обрыве досылает сервер; если не может — перечитываем список
+      onResync: loadEvents,
+      onMessage: (data) => {
         if (data.type === "participant" && data.event_id) {
           setEvents((prev) =>
             prev.map((e) =>
@@ -913,12 +909,9 @@ const EventsBlock: React.FC<{
             )
           );
         }
-      } catch {
-        /* ignore ws parse errors */
-      }
-    };
-
-    return () => socket.close();
+      },
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [disabled]);
 
   const filteredEvents = events.filter(event => 
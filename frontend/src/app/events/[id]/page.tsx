@@ -36,6 +36,7 @@ import {
   FiLogOut
 } from "react-icons/fi";
 import LightRays from "@/shared/ui/LightRays";
+import { connectEventStream } from "@/shared/api/eventStream";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000";
 
@@ -80,9 +81,9 @@ export default function EventPage() {
   const [participantsCount, setParticipantsCount] = useState(0);
   const [participants, setParticipants] = useState<any[]>([]);
   const [actionLoading, setActionLoading] = useState(false);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [showShareModal, setShowShareModal] = useState(false);
   const [isFavorite, setIsFavorite] = useState(false);
-  const [allEvents, setAllEvents] = useState<EventDto[]>([]);
   const [similarEvents, setSimilarEvents] = useState<EventDto[]>([]);
   const [ratingAvg, setRatingAvg] = useState<number | null>(null);
   const [ratingCount, setRatingCount] = useState<number>(0);
@@ -111,21 +112,6 @@ export default function EventPage() {
     loadProfile();
   }, [accessToken]);
 
-  // Загружаем все события (для блока "Похожие")
-  useEffect(() => {
-    const loadAll = async () => {
-      try {
-        const res = await fetch(`${API_URL}/auth/events`);
-        if (!res.ok) return;
-        const data: EventDto[] = await res.json();
-        setAllEvents(data);
-      } catch {
-        setAllEvents([]);
-      }
-    };
-    loadAll();
-  }, []);
-
   // Рейтинг из localStorage
   const loadRatings = (id: string) => {
     const map = JSON.parse(localStorage.getItem("eventRatings") || "{}") as Record<
@@ -154,38 +140,26 @@ export default function EventPage() {
       setLoading(true);
       setError(null);
       try {
-        const res = await fetch(`${API_URL}/auth/events/${eventId}`);
+        // Событие, участие, первые участники и похожие события — одним запросом
+        const res = await fetch(`${API_URL}/auth/events/${eventId}/page?participants_limit=10`, {
+          headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {}
+        });
         if (!res.ok) throw new Error("Событие не найдено");
         
-        const data: EventDto = await res.json();
+        const page = await res.json();
+        const data: EventDto = page.event;
         setEvent({
           ...data,
           image_url: data.image_url || "/events.png",
         });
-        setParticipantsCount(data.participants?.length || 0);
+        setParticipantsCount(page.participants_total);
+        setParticipants(page.participants);
+        setSimilarEvents(page.related);
+        setIsParticipating(page.is_participant);
         loadRatings(data.id);
         
-        if (profile && data.participants?.includes(profile.id)) {
-          setIsParticipating(true);
-        }
         const favIds = JSON.parse(localStorage.getItem("favoriteEvents") || "[]") as string[];
         setIsFavorite(favIds.includes(data.id));
-        
-        // Загрузка информации об участниках
-        if (data.participants?.length > 0) {
-          try {
-            const participantsRes = await fetch(`${API_URL}/auth/events/${eventId}/participants`, {
-              headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {}
-            });
-            
-            if (participantsRes.ok) {
-              const participantsData = await participantsRes.json();
-              setParticipants(participantsData.slice(0, 10));
-            }
-          } catch (err) {
-            console.error("Не удалось загрузить участников", err);
-          }
-        }
       } catch (err: any) {
         setError(err?.message || "Не удалось загрузить событие");
       } finally {
@@ -194,19 +168,18 @@ export default function EventPage() {
     };
     
     loadEvent();
-  }, [eventId, profile?.id]);
+  }, [eventId, accessToken]);
+
+  // Оценка пользователя зависит от профиля, который грузится параллельно
+  useEffect(() => {
+    if (event?.id) loadRatings(event.id);
+  }, [event?.id, profile?.id]);
 
-  // WebSocket обновления участников для карточки события
+  // Обновления участников для карточки события (SSE: страница только слушает)
   useEffect(() => {
     if (!eventId) return;
-    const wsUrl = (process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000").replace(
-      /^http/,
-      "ws"
-    );
-    const socket = new WebSocket(`${wsUrl}/ws/events`);
-    socket.onmessage = (ev) => {
-      try {
-        const data = JSON.parse(ev.data);
+    return connectEventStream(eventId, {
+      onMessage: (data) => {
         if (data.type === "participant" && data.event_id === eventId) {
           setParticipantsCount((prev) =>
             data.action === "join" ? prev + 1 : Math.max(0, prev - 1)
@@ -220,12 +193,20 @@ export default function EventPage() {
             }
           }
         }
-      } catch {
-        /* ignore */
-      }
-    };
-    return () => socket.close();
-  }, [eventId, profile?.id]);
+      },
+      onResync: async () => {
+        // пропущенные обновления потеряны — берём актуальный счётчик
+        const res = await fetch(`${API_URL}/auth/events/${eventId}/page?participants_limit=10`, {
+          headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
+        });
+        if (!res.ok) return;
+        const page = await res.json();
+        setParticipantsCount(page.participants_total);
+        setParticipants(page.participants);
+        setIsParticipating(page.is_participant);
+      },
+    });
+  }, [eventId, profile?.id, accessToken]);
 
   const handleRate = (value: number) => {
     if (!eventId || userRating) return; // уже оценил
@@ -313,6 +294,28 @@ export default function EventPage() {
     });
   };
 
+  const waitForAdmission = async (ticket: { ticket: string; position: number | null }): Promise<EventDto> => {
+    setQueuePosition(ticket.position);
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const res = await fetch(`${API_URL}/auth/events/${eventId}/queue/${ticket.ticket}`, {
+        headers: { Authorization: `Bearer ${accessToken}` },
+      });
+      if (!res.ok) throw new Error("Не удалось узнать статус очереди");
+      const state = await res.json();
+      if (state.status === "rejected") {
+        throw new Error(state.detail || "Не удалось подтвердить участие");
+      }
+      if (state.status === "joined") break;
+      setQueuePosition(state.position);
+    }
+    const eventRes = await fetch(`${API_URL}/auth/events/${eventId}`, {
+      headers: { Authorization: `Bearer ${accessToken}` },
+    });
+    if (!eventRes.ok) throw new Error("Не удалось загрузить событие");
+    return eventRes.json();
+  };
+
   const handleJoin = async () => {
     if (!profile) {
       router.push("/auth");
@@ -338,13 +341,19 @@ export default function EventPage() {
         throw new Error(msg?.detail || "Не удалось подтвердить участие");
       }
       
-      const updated: EventDto = await res.json();
+      let updated: EventDto;
+      if (res.status === 202) {
+        // событие с высоким спросом: запрос встал в очередь, ждём допуска
+        updated = await waitForAdmission(await res.json());
+      } else {
+        updated = await res.json();
+      }
       setEvent(updated);
       setParticipantsCount(updated.participants.length);
       setIsParticipating(true);
       
       // Обновляем список участников
-      const participantsRes = await fetch(`${API_URL}/auth/events/${eventId}/participants`, {
+      const participantsRes = await fetch(`${API_URL}/auth/events/${eventId}/participants?limit=10`, {
         headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {}
       });
       
@@ -356,6 +365,7 @@ export default function EventPage() {
     } catch (err: any) {
       alert(err?.message || "Ошибка подтверждения участия");
     } finally {
+      setQueuePosition(null);
       setActionLoading(false);
     }
   };
@@ -389,7 +399,7 @@ export default function EventPage() {
       setIsParticipating(false);
       
       // Обновляем список участников
-      const participantsRes = await fetch(`${API_URL}/auth/events/${eventId}/participants`, {
+      const participantsRes = await fetch(`${API_URL}/auth/events/${eventId}/participants?limit=10`, {
         headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {}
       });
       
@@ -457,21 +467,6 @@ export default function EventPage() {
            "https://images.unsplash.com/photo-1501281668745-f6f2616ba0a5?w=800&h=500&fit=crop";
   };
 
-  useEffect(() => {
-    if (!event || !allEvents.length) {
-      setSimilarEvents([]);
-      return;
-    }
-    const sameCity = allEvents.filter(
-      (ev) => ev.id !== event.id && ev.city?.toLowerCase() === event.city?.toLowerCase()
-    );
-    const sameCat = sameCity.filter(
-      (ev) => ev.category && event.category && ev.category.toLowerCase() === event.category.toLowerCase()
-    );
-    const picked = (sameCat.length ? sameCat : sameCity).slice(0, 3);
-    setSimilarEvents(picked);
-  }, [event, allEvents]);
-
   if (loading) {
     return (
       <main className="relative min-h-screen w-full bg-[#020616] text-slate-50 overflow-hidden">
@@ -718,10 +713,10 @@ export default function EventPage() {
                         <div className="flex flex-wrap gap-2 mb-4">
                           {participants.slice(0, 5).map((participant, index) => (
                             <div key={index} className="flex items-center gap-2 px-3 py-2 rounded-lg bg-white/5">
-                              {participant.user?.avatar_url ? (
+                              {participant.avatar_url ? (
                                 <img 
-                                  src={participant.user.avatar_url} 
-                                  alt={participant.user.full_name}
+                                  src={participant.avatar_url} 
+                                  alt={participant.full_name}
                                   className="w-6 h-6 rounded-full"
                                 />
                               ) : (
@@ -729,7 +724,7 @@ export default function EventPage() {
                                   <FiUser className="w-3 h-3 text-white" />
                                 </div>
                               )}
-                              <span className="text-sm">{participant.user?.full_name || "Участник"}</span>
+                              <span className="text-sm">{participant.full_name || "Участник"}</span>
                             </div>
                           ))}
                           {participantsCount > 5 && (
@@ -826,6 +821,11 @@ export default function EventPage() {
                         {actionLoading ? (
                           <div className="flex items-center justify-center py-4">
                             <FiLoader className="animate-spin w-6 h-6 text-blue-500" />
+                            {queuePosition !== null && (
+                              <span className="ml-3 text-sm text-white/70">
+                                Вы в очереди: {queuePosition}
+                              </span>
+                            )}
                           </div>
                         ) : (
                           <>
@@ -23,6 +23,7 @@ import {
   FiMessageSquare
 } from "react-icons/fi";
 import { useRouter } from "next/navigation";
+import { connectEventsSocket } from "@/shared/api/eventsSocket";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000";
 
@@ -259,14 +260,8 @@ const MyEventsPage: React.FC = () => {
     });
   };
   useEffect(() => {
-    const wsUrl = (process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000").replace(
-      /^http/,
-      "ws"
-    );
-    const socket = new WebSocket(`${wsUrl}/ws/events`);
-    socket.onmessage = (ev) => {
-      try {
-        const data = JSON.parse(ev.data);
+    return connectEventsSocket({
+      onMessage: (data) => {
         if (data.type === "participant" && data.event_id) {
           setEvents((prev) =>
             prev.map((e) =>
@@ -295,11 +290,8 @@ const MyEventsPage: React.FC = () => {
             )
           );
         }
-      } catch {
-        /* ignore */
-      }
-    };
-    return () => socket.close();
+      },
+    });
   }, []);
 
   // Получение статуса события для отображения
@@ -3,6 +3,8 @@
 import React, { useEffect, useState, useRef } from "react";
 import Prism from "@/shared/ui/Prism";
 import { getAddressFromYandex, getLocationByIP } from "@/shared/lib/geocoder";
+import { syncEvents } from "@/shared/api/eventsFeed";
+import { connectEventsSocket } from "@/shared/api/eventsSocket";
 import Header from "./components/Header";
 import CitySelector from "./components/CitySelector";
 import CategorySelector from "./components/CategorySelector";
@@ -309,9 +311,7 @@ const HomePage: React.FC = () => {
       setEventsLoading(true);
       setEventsError(null);
       try {
-        const res = await fetch(`${API_URL}/auth/events`);
-        if (!res.ok) throw new Error("Не удалось загрузить события");
-        const data: ApiEvent[] = await res.json();
+        const data = await syncEvents<ApiEvent>();
         const mapped: CardEvent[] = data.map((e) => {
           const rating = ratingsCache[e.id];
           const isFull = e.max_participants ? e.participants.length >= e.max_participants : false;
@@ -359,9 +359,8 @@ const HomePage: React.FC = () => {
 
     const refresh = async () => {
       try {
-        const res = await fetch(`${API_URL}/auth/events`, { signal: controller.signal });
-        if (!res.ok) return;
-        const data: ApiEvent[] = await res.json();
+        // после первой загрузки приходят только изменения с прошлого опроса
+        const data = await syncEvents<ApiEvent>(controller.signal);
         if (stop) return;
         const mapped: CardEvent[] = data.map((e) => {
           const rating = ratingsCache[e.id];
@@ -410,15 +409,9 @@ const HomePage: React.FC = () => {
   }, []);
 
   useEffect(() => {
-    const wsUrl = (process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000").replace(
-      /^http/,
-      "ws"
-    );
-    const socket = new WebSocket(`${wsUrl}/ws/events`);
-
-    socket.onmessage = (ev) => {
-      try {
-        const data = JSON.parse(ev.data);
+    // при невосстановимом обрыве догонит опрос ленты изменений
+    return connectEventsSocket({
+      onMessage: (data) => {
         if (data.type === "participant" && data.event_id) {
           setEvents((prev) =>
             prev.map((e) =>
@@ -440,12 +433,8 @@ const HomePage: React.FC = () => {
             )
           );
         }
-      } catch {
-        /* ignore */
-      }
-    };
-
-    return () => socket.close();
+      },
+    });
   }, []);
 
   useEffect(() => {
@@ -0,0 +1,61 @@
+const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:8000';
+
+type EventStreamHandlers = {
+  onMessage: (data: any) => void;
+  // пропущенное уже не восстановить — нужно перечитать данные целиком
+  onResync?: () => void;
+};
+
+/**
+ * Обновления участников одного события через SSE (/auth/events/stream):
+ * легче WebSocket для страниц, которые только слушают. EventSource сам
+ * переподключается с Last-Event-ID; если сервер отказал (503), открываем
+ * поток заново с разбросом задержки и перечитываем данные. Возвращает
+ * функцию закрытия.
+ */
+export const connectEventStream = (eventId: string, { onMessage, onResync }: EventStreamHandlers) => {
+  let source: EventSource | null = null;
+  let retry = 0;
+  let timer: ReturnType<typeof setTimeout> | undefined;
+  let closed = false;
+
+  const open = () => {
+    source = new EventSource(`${API_URL}/auth/events/stream?event_id=${encodeURIComponent(eventId)}`);
+
+    source.onmessage = (ev) => {
+      let data: any;
+      try {
+        data = JSON.parse(ev.data);
+      } catch {
+        return;
+      }
+      if (data.type === 'hello') {
+        // hello после нашего повторного открытия — между потоками могли быть обновления
+        if (retry > 0) onResync?.();
+        retry = 0;
+        return;
+      }
+      if (data.type === 'resync_required') {
+        onResync?.();
+        return;
+      }
+      onMessage(data);
+    };
+
+    source.onerror = () => {
+      // CONNECTING — браузер переподключается сам, CLOSED — сдался
+      if (closed || source?.readyState !== EventSource.CLOSED) return;
+      const delay = Math.min(1000 * 2 ** retry, 30000) * (0.5 + Math.random() / 2);
+      retry += 1;
+      timer = setTimeout(open, delay);
+    };
+  };
+
+  open();
+
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    source?.close();
+  };
+};
@@ -0,0 +1,56 @@
+const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:8000';
+
+type FeedEvent = { id: string; is_deleted?: boolean };
+
+type ChangesResponse<T> = {
+  changes: { seq: number; event_id: string; deleted: boolean; event: T | null }[];
+  next_since: number;
+  has_more: boolean;
+};
+
+// Локальная копия каталога: один раз полный GET /auth/events, дальше только
+// /auth/events/changes?since=... — трафик пропорционален числу изменений.
+const replica = {
+  events: new Map<string, unknown>(),
+  since: null as number | null,
+  // одновременные вызовы (первая загрузка и опрос) ждут один запрос
+  pending: null as Promise<void> | null,
+};
+
+const loadFull = async (signal?: AbortSignal) => {
+  const res = await fetch(`${API_URL}/auth/events`, { signal });
+  if (!res.ok) throw new Error('Не удалось загрузить события');
+  const data: FeedEvent[] = await res.json();
+  replica.events = new Map(data.map((e) => [e.id, e]));
+  replica.since = Number(res.headers.get('X-Change-Cursor') ?? 0);
+};
+
+const applyChanges = async (signal?: AbortSignal) => {
+  for (;;) {
+    const res = await fetch(`${API_URL}/auth/events/changes?since=${replica.since}`, { signal });
+    if (res.status === 410) {
+      // журнал очищен дальше нашего курсора — перезагружаем целиком
+      await loadFull(signal);
+      return;
+    }
+    if (!res.ok) throw new Error('Не удалось обновить события');
+    const data: ChangesResponse<FeedEvent> = await res.json();
+    for (const change of data.changes) {
+      if (change.deleted || !change.event) replica.events.delete(change.event_id);
+      else replica.events.set(change.event_id, change.event);
+    }
+    replica.since = data.next_since;
+    if (!data.has_more) return;
+  }
+};
+
+/** Актуальный список событий (без удалённых); после первой загрузки — только дельта. */
+export const syncEvents = async <T>(signal?: AbortSignal): Promise<T[]> => {
+  if (!replica.pending) {
+    replica.pending = (replica.since === null ? loadFull(signal) : applyChanges(signal)).finally(() => {
+      replica.pending = null;
+    });
+  }
+  await replica.pending;
+  return Array.from(replica.events.values()) as T[];
+};
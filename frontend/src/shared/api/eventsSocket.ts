@@ -0,0 +1,134 @@
+const WS_URL = (process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:8000').replace(/^http/, 'ws');
+
+// компактный бинарный протокол (см. backend/app/core/ws_codec.py); если
+// сервер его не выбрал, всё приходит JSON-текстом
+const BINARY_PROTOCOL = 'events.bin.v1';
+const ACTIONS = ['', 'join', 'leave'];
+
+const hex = (bytes: Uint8Array) => Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+
+const uuid = (bytes: Uint8Array) => {
+  const h = hex(bytes);
+  return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20)}`;
+};
+
+/** Кадр-пачка: заголовок !BB8sIH, затем записи participant (!B16s16sQ) или json (!I + UTF-8). */
+const decodeBatch = (buffer: ArrayBuffer): any[] => {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  if (view.getUint8(0) !== 1 || view.getUint8(1) !== 1) return [];
+  const stream = hex(bytes.subarray(2, 10));
+  let seq = view.getUint32(10);
+  const count = view.getUint16(14);
+  let offset = 16;
+  const messages: any[] = [];
+  for (let i = 0; i < count; i += 1) {
+    let message: any;
+    if (view.getUint8(offset) === 1) {
+      message = {
+        type: 'participant',
+        action: ACTIONS[view.getUint8(offset + 1)],
+        event_id: uuid(bytes.subarray(offset + 2, offset + 18)),
+        user_id: uuid(bytes.subarray(offset + 18, offset + 34)),
+        id: `participant:${view.getBigUint64(offset + 34).toString()}`,
+      };
+      offset += 42;
+    } else {
+      const length = view.getUint32(offset + 1);
+      message = JSON.parse(new TextDecoder().decode(bytes.subarray(offset + 5, offset + 5 + length)));
+      offset += 5 + length;
+    }
+    messages.push({ ...message, seq, stream });
+    seq += 1;
+  }
+  return messages;
+};
+
+type EventsSocketHandlers = {
+  onMessage: (data: any) => void;
+  // пропущенное уже не восстановить — нужно перечитать данные целиком
+  onResync?: () => void;
+};
+
+/**
+ * /ws/events с переподключением: после обрыва сервер получает stream и
+ * последний seq и досылает только пропущенные сообщения (или resync_required).
+ * На ping сервера отвечает pong. Предлагает бинарный подпротокол: рассылки
+ * тогда приходят пачками, onMessage вызывается для каждой. Возвращает
+ * функцию закрытия.
+ */
+export const connectEventsSocket = ({ onMessage, onResync }: EventsSocketHandlers) => {
+  let stream: string | null = null;
+  let seq = 0;
+  let socket: WebSocket | null = null;
+  let retry = 0;
+  let timer: ReturnType<typeof setTimeout> | undefined;
+  let closed = false;
+  let withToken = true;
+
+  const open = () => {
+    const params = new URLSearchParams();
+    if (stream) {
+      params.set('stream', stream);
+      params.set('since', String(seq));
+    }
+    // с токеном сервер привязывает подписки соединения к пользователю
+    const token = withToken && typeof window !== 'undefined' ? localStorage.getItem('access_token') : null;
+    if (token) params.set('token', token);
+    const query = params.toString();
+    socket = new WebSocket(`${WS_URL}/ws/events${query ? `?${query}` : ''}`, [BINARY_PROTOCOL]);
+    socket.binaryType = 'arraybuffer';
+
+    socket.onopen = () => {
+      retry = 0;
+    };
+
+    const handle = (data: any) => {
+      if (data.type === 'ping') {
+        // молчащее соединение сервер закрывает по таймауту простоя
+        socket?.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
+      if (data.type === 'hello' || data.type === 'resync_required') {
+        stream = data.stream;
+        seq = data.seq;
+        if (data.type === 'resync_required') onResync?.();
+        return;
+      }
+      if (typeof data.seq === 'number' && data.stream === stream) {
+        // повтор уже полученного при досылке
+        if (data.seq <= seq) return;
+        seq = data.seq;
+      }
+      onMessage(data);
+    };
+
+    socket.onmessage = (ev) => {
+      let messages: any[];
+      try {
+        messages = ev.data instanceof ArrayBuffer ? decodeBatch(ev.data) : [JSON.parse(ev.data)];
+      } catch {
+        return;
+      }
+      messages.forEach(handle);
+    };
+
+    socket.onclose = (ev) => {
+      if (closed) return;
+      // 1008 — токен отклонён (истёк): дальше подключаемся анонимно
+      if (ev.code === 1008) withToken = false;
+      // экспонента с разбросом: после деплоя клиенты не приходят все разом
+      const delay = Math.min(1000 * 2 ** retry, 30000) * (0.5 + Math.random() / 2);
+      retry += 1;
+      timer = setTimeout(open, delay);
+    };
+  };
+
+  open();
+
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    socket?.close();
+  };
+};